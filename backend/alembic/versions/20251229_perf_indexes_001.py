@@ -0,0 +1,65 @@
+"""Add performance indexes for hot query shapes
+
+Revision ID: perf_indexes_001
+Revises: follow_001
+Create Date: 2024-12-29
+
+Indexes are built CONCURRENTLY (outside the migration transaction) so the
+tables stay writable while they build. IF NOT EXISTS makes this a no-op for
+indexes already present (idx_drivers_current_location from the initial
+schema, or any created by Base.metadata.create_all). user_follows
+(follower_id) and (followed_id) already exist from follow_001.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'perf_indexes_001'
+down_revision = 'follow_001'
+branch_labels = None
+depends_on = None
+
+
+# (name, table, columns, extra create_index kwargs)
+INDEXES = [
+    # GET /rides/ - rides of one passenger / driver, newest first
+    ('ix_rides_passenger_requested_at', 'rides', ['passenger_id', sa.text('requested_at DESC')], {}),
+    ('ix_rides_driver_requested_at', 'rides', ['driver_id', sa.text('requested_at DESC')], {}),
+    # GET /incidents/feed - only active incidents, newest first
+    ('ix_incidents_active_created_at', 'incidents', [sa.text('created_at DESC')],
+     {'postgresql_where': sa.text("status = 'active'")}),
+    # latitude/longitude BETWEEN bounding boxes
+    ('ix_incidents_lat_lng', 'incidents', ['latitude', 'longitude'], {}),
+    # Spatial lookups (names match the geoalchemy2 / initial schema indexes)
+    ('idx_incidents_location', 'incidents', ['location'], {'postgresql_using': 'gist'}),
+    ('idx_drivers_current_location', 'drivers', ['current_location'], {'postgresql_using': 'gist'}),
+    # Room history pages
+    ('ix_chat_messages_room_created_at', 'chat_messages', ['room_id', 'created_at'], {}),
+    # Verification tallies per incident and type
+    ('ix_incident_verifications_incident_type', 'incident_verifications', ['incident_id', 'verification_type'], {}),
+    # Leaderboards
+    ('ix_users_points', 'users', [sa.text('points DESC')], {}),
+]
+
+
+def upgrade():
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        for name, table, columns, kwargs in INDEXES:
+            op.create_index(
+                name, table, columns,
+                postgresql_concurrently=True,
+                if_not_exists=True,
+                **kwargs
+            )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, columns, kwargs in reversed(INDEXES):
+            # Created by the initial schema, not by this migration
+            if name == 'idx_drivers_current_location':
+                continue
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
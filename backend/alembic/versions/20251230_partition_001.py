@@ -0,0 +1,179 @@
+"""Partition incidents, chat_messages and rides by month
+
+Revision ID: partition_001
+Revises: perf_indexes_001
+Create Date: 2024-12-30
+
+Each table is rebuilt as a RANGE-partitioned parent with one partition per
+month plus a DEFAULT catch-all, and its rows are copied across. Every
+unique constraint on a partitioned table must contain the partition key, so
+primary keys become (id, <key>) and foreign keys *into* incidents and rides
+are dropped (ids are app-generated UUIDs; archiving a partition archives
+and deletes the rows pointing into it, see DEPENDENT_ROWS in
+app/services/partitioning.py). Indexes and foreign keys *out of*
+the tables are recreated on the parent and cascade to every partition.
+
+Upcoming partitions and archival of old ones: app/services/partitioning.py
+(run scripts/maintain_partitions.py daily).
+
+"""
+from datetime import date
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'partition_001'
+down_revision = 'perf_indexes_001'
+branch_labels = None
+depends_on = None
+
+
+# table -> partition key
+PARTITIONED_TABLES = {
+    'incidents': 'created_at',
+    'chat_messages': 'created_at',
+    'rides': 'requested_at',
+}
+MONTHS_AHEAD = 3
+
+# Foreign keys into the partitioned tables, restored on downgrade
+# (child table, column, parent table, ondelete)
+INBOUND_FKS = [
+    ('incident_verifications', 'incident_id', 'incidents', None),
+    ('incident_thanks', 'incident_id', 'incidents', None),
+    ('incident_comments', 'incident_id', 'incidents', None),
+    ('incident_rewards', 'incident_id', 'incidents', 'CASCADE'),
+    ('payments', 'ride_id', 'rides', None),
+    ('driver_ratings', 'ride_id', 'rides', 'CASCADE'),
+    ('passenger_ratings', 'ride_id', 'rides', 'CASCADE'),
+]
+
+
+def _add_months(month, n):
+    index = month.year * 12 + month.month - 1 + n
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _bound(month):
+    # Explicit UTC offset; ignored for columns without a time zone
+    return f"'{month:%Y-%m-%d} 00:00:00+00'"
+
+
+def _table_ddl(conn, table):
+    """Secondary index definitions and outgoing FK definitions of `table`"""
+    params = {'t': table}
+    indexes = conn.execute(sa.text(
+        "SELECT indexdef FROM pg_indexes "
+        "WHERE schemaname = current_schema() AND tablename = :t "
+        "AND indexname NOT IN ("
+        "  SELECT conname FROM pg_constraint WHERE conrelid = CAST(:t AS regclass) AND contype = 'p'"
+        ")"
+    ), params).scalars().all()
+    foreign_keys = conn.execute(sa.text(
+        "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+        "WHERE conrelid = CAST(:t AS regclass) AND contype = 'f'"
+    ), params).all()
+    return indexes, foreign_keys
+
+
+def _restore_ddl(table, indexes, foreign_keys):
+    for name, definition in foreign_keys:
+        op.execute(f"ALTER TABLE {table} ADD CONSTRAINT {name} {definition}")
+    for indexdef in indexes:
+        op.execute(indexdef)
+
+
+def _partition(conn, table, key):
+    indexes, foreign_keys = _table_ddl(conn, table)
+    inbound = conn.execute(sa.text(
+        "SELECT conrelid::regclass::text, conname FROM pg_constraint "
+        "WHERE confrelid = CAST(:t AS regclass) AND contype = 'f'"
+    ), {'t': table}).all()
+    for child, name in inbound:
+        op.drop_constraint(name, child, type_='foreignkey')
+
+    op.execute(f"UPDATE {table} SET {key} = now() WHERE {key} IS NULL")
+    first = conn.execute(sa.text(f"SELECT min({key}) FROM {table}")).scalar()
+    this_month = date.today().replace(day=1)
+    month = date(first.year, first.month, 1) if first else this_month
+
+    legacy = f"{table}_unpartitioned"
+    op.rename_table(table, legacy)
+    op.execute(f"CREATE TABLE {table} (LIKE {legacy} INCLUDING DEFAULTS) PARTITION BY RANGE ({key})")
+    op.execute(f"ALTER TABLE {table} ALTER COLUMN {key} SET NOT NULL")
+
+    last = _add_months(this_month, MONTHS_AHEAD)
+    while month <= last:
+        following = _add_months(month, 1)
+        op.execute(
+            f"CREATE TABLE {table}_p{month:%Y%m} PARTITION OF {table} "
+            f"FOR VALUES FROM ({_bound(month)}) TO ({_bound(following)})"
+        )
+        month = following
+    op.execute(f"CREATE TABLE {table}_default PARTITION OF {table} DEFAULT")
+
+    op.execute(f"INSERT INTO {table} SELECT * FROM {legacy}")
+    op.drop_table(legacy)
+
+    op.execute(f"ALTER TABLE {table} ADD CONSTRAINT {table}_pkey PRIMARY KEY (id, {key})")
+    _restore_ddl(table, indexes, foreign_keys)
+
+
+def _unpartition(conn, table):
+    indexes, foreign_keys = _table_ddl(conn, table)
+
+    partitioned = f"{table}_partitioned"
+    op.rename_table(table, partitioned)
+    op.execute(f"CREATE TABLE {table} (LIKE {partitioned} INCLUDING DEFAULTS)")
+    op.execute(f"INSERT INTO {table} SELECT * FROM {partitioned}")
+    op.execute(f"DROP TABLE {partitioned} CASCADE")  # and its partitions
+
+    op.execute(f"ALTER TABLE {table} ADD CONSTRAINT {table}_pkey PRIMARY KEY (id)")
+    _restore_ddl(table, indexes, foreign_keys)
+
+
+def upgrade():
+    conn = op.get_bind()
+    for table, key in PARTITIONED_TABLES.items():
+        _partition(conn, table, key)
+
+    # Cold storage for detached partitions: rows as JSONB chunks (TOAST-compressed)
+    op.create_table(
+        'partition_archive',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('table_name', sa.String(63), nullable=False),
+        sa.Column('range_start', sa.DateTime(), nullable=False),
+        sa.Column('range_end', sa.DateTime(), nullable=False),
+        sa.Column('chunk', sa.Integer(), nullable=False),
+        sa.Column('row_count', sa.Integer(), nullable=False),
+        sa.Column('rows', postgresql.JSONB(), nullable=False),
+        sa.Column('archived_at', sa.DateTime(), server_default=sa.func.now()),
+        sa.UniqueConstraint('table_name', 'range_start', 'chunk', name='uq_partition_archive_chunk')
+    )
+    # lz4 (PostgreSQL 14+, when built with it) beats the default pglz on JSON
+    op.execute("""
+        DO $$
+        BEGIN
+            IF current_setting('server_version_num')::int >= 140000 THEN
+                EXECUTE 'ALTER TABLE partition_archive ALTER COLUMN rows SET COMPRESSION lz4';
+            END IF;
+        EXCEPTION WHEN others THEN
+            RAISE NOTICE 'lz4 unavailable, partition_archive keeps pglz compression';
+        END $$;
+    """)
+
+
+def downgrade():
+    op.drop_table('partition_archive')
+
+    conn = op.get_bind()
+    for table in reversed(list(PARTITIONED_TABLES)):
+        _unpartition(conn, table)
+
+    for child, column, parent, ondelete in INBOUND_FKS:
+        op.create_foreign_key(
+            f"{child}_{column}_fkey", child, parent, [column], ['id'], ondelete=ondelete
+        )
@@ -0,0 +1,32 @@
+"""Backfill incidents.location from latitude/longitude
+
+Revision ID: incident_location_001
+Revises: partition_001
+Create Date: 2024-12-31
+
+Incidents reported through POST /incidents/ only stored latitude/longitude,
+so the GIST-indexed location column was NULL and invisible to ST_DWithin.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'incident_location_001'
+down_revision = 'partition_001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute(
+        "UPDATE incidents "
+        "SET location = ST_SetSRID(ST_MakePoint(longitude, latitude), 4326)::geography "
+        "WHERE location IS NULL"
+    )
+
+
+def downgrade():
+    # Nothing to undo: the backfilled points match latitude/longitude
+    pass
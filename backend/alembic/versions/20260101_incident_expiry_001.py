@@ -0,0 +1,51 @@
+"""Stamp expires_at on active incidents and index the expiry sweep
+
+Revision ID: incident_expiry_001
+Revises: incident_location_001
+Create Date: 2025-01-01
+
+New incidents get expires_at from their type at report time
+(app/services/incident_expiry.py). Active rows reported before that get the
+same lifetimes (default settings) counted from created_at.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'incident_expiry_001'
+down_revision = 'incident_location_001'
+branch_labels = None
+depends_on = None
+
+
+# Seconds per type, matching the INCIDENT_EXPIRY_* defaults
+LIFETIMES = {
+    'traffic': 1800,
+    'traffic_jam': 1800,
+    'accident': 14400,
+    'hazard': 86400,
+    'road_hazard': 86400,
+    'flood': 86400,
+    'construction': 86400,
+}
+DEFAULT_LIFETIME = 7200
+
+
+def upgrade():
+    cases = " ".join(f"WHEN '{t}' THEN {s}" for t, s in LIFETIMES.items())
+    op.execute(
+        "UPDATE incidents "
+        # created_at is timestamptz, expires_at naive UTC
+        f"SET expires_at = (created_at AT TIME ZONE 'UTC') + make_interval(secs => CASE lower(type) {cases} ELSE {DEFAULT_LIFETIME} END) "
+        "WHERE status = 'active' AND expires_at IS NULL"
+    )
+    op.create_index(
+        'ix_incidents_active_expires_at', 'incidents', ['expires_at'],
+        postgresql_where=sa.text("status = 'active'"), if_not_exists=True
+    )
+
+
+def downgrade():
+    op.drop_index('ix_incidents_active_expires_at', table_name='incidents', if_exists=True)
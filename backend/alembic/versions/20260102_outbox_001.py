@@ -0,0 +1,44 @@
+"""Add the outbox_events table
+
+Revision ID: outbox_001
+Revises: incident_expiry_001
+Create Date: 2025-01-02
+
+Side effects of a request (gamification, alerts, pushes) are written here in
+the request's transaction and carried out by the outbox worker
+(app/services/outbox.py). The partial index covers the worker's claim query.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'outbox_001'
+down_revision = 'incident_expiry_001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'outbox_events',
+        sa.Column('id', sa.BigInteger(), primary_key=True),
+        sa.Column('topic', sa.String(50), nullable=False),
+        sa.Column('payload', postgresql.JSONB(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('available_at', sa.DateTime(), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('last_error', sa.Text()),
+        sa.Column('processed_at', sa.DateTime()),
+    )
+    op.create_index(
+        'ix_outbox_events_pending', 'outbox_events', ['available_at'],
+        postgresql_where=sa.text('processed_at IS NULL')
+    )
+
+
+def downgrade():
+    op.drop_index('ix_outbox_events_pending', table_name='outbox_events')
+    op.drop_table('outbox_events')
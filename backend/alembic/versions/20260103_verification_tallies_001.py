@@ -0,0 +1,59 @@
+"""Keep verification tallies on incidents, one vote per user
+
+Revision ID: verification_tallies_001
+Revises: outbox_001
+Create Date: 2025-01-03
+
+Votes update incidents.confirmations / confirmation_weight / all_clear_count
+in place (app/services/verification.py) instead of aggregating
+incident_verifications on every vote. Existing tallies are backfilled from
+the votes; where a user voted more than once only their latest vote is kept.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'verification_tallies_001'
+down_revision = 'outbox_001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('incidents', sa.Column('confirmation_weight', sa.Float(), server_default='0'))
+    op.add_column('incidents', sa.Column('all_clear_count', sa.Integer(), server_default='0'))
+
+    op.execute("""
+        DELETE FROM incident_verifications v
+        USING incident_verifications newer
+        WHERE newer.incident_id = v.incident_id
+          AND newer.user_id = v.user_id
+          AND (coalesce(newer.created_at, '-infinity'), newer.id) > (coalesce(v.created_at, '-infinity'), v.id)
+    """)
+    op.create_unique_constraint(
+        'uq_incident_verifications_incident_user', 'incident_verifications', ['incident_id', 'user_id']
+    )
+
+    op.execute("""
+        UPDATE incidents i
+        SET confirmations = t.confirmations,
+            confirmation_weight = t.confirmation_weight,
+            all_clear_count = t.all_clear_count
+        FROM (
+            SELECT incident_id,
+                   count(*) FILTER (WHERE verification_type = 'still_there') AS confirmations,
+                   coalesce(sum(weight) FILTER (WHERE verification_type = 'still_there'), 0) AS confirmation_weight,
+                   count(*) FILTER (WHERE verification_type = 'all_clear') AS all_clear_count
+            FROM incident_verifications
+            GROUP BY incident_id
+        ) t
+        WHERE i.id = t.incident_id
+    """)
+
+
+def downgrade():
+    op.drop_constraint('uq_incident_verifications_incident_user', 'incident_verifications', type_='unique')
+    op.drop_column('incidents', 'all_clear_count')
+    op.drop_column('incidents', 'confirmation_weight')
@@ -0,0 +1,38 @@
+"""Stamp and index incidents.updated_at for delta sync
+
+Revision ID: incident_changes_001
+Revises: verification_tallies_001
+Create Date: 2025-01-04
+
+GET /incidents/changes returns incidents changed since a cursor using
+updated_at (app/services/incident_changes.py). It is now set by the
+database on insert as well as on update; rows never updated get their
+created_at.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'incident_changes_001'
+down_revision = 'verification_tallies_001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("UPDATE incidents SET updated_at = created_at WHERE updated_at IS NULL")
+    op.alter_column(
+        'incidents', 'updated_at',
+        server_default=sa.text('now()'), nullable=False, existing_type=sa.DateTime(timezone=True)
+    )
+    op.create_index('ix_incidents_updated_at', 'incidents', ['updated_at'], if_not_exists=True)
+
+
+def downgrade():
+    op.drop_index('ix_incidents_updated_at', table_name='incidents', if_exists=True)
+    op.alter_column(
+        'incidents', 'updated_at',
+        server_default=None, nullable=True, existing_type=sa.DateTime(timezone=True)
+    )
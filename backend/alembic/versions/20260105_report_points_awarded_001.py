@@ -0,0 +1,29 @@
+"""Record when an incident's report points were awarded
+
+Revision ID: report_points_awarded_001
+Revises: incident_changes_001
+Create Date: 2025-01-05
+
+The outbox delivers INCIDENT_REPORT_POINTS at least once; the handler sets
+incidents.report_points_awarded_at in the same transaction as the points
+and skips incidents that already have it. Events already processed are
+never delivered again, so existing rows need no backfill.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'report_points_awarded_001'
+down_revision = 'incident_changes_001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('incidents', sa.Column('report_points_awarded_at', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    op.drop_column('incidents', 'report_points_awarded_at')
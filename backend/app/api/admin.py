@@ -10,7 +10,7 @@ from typing import Optional, List
 from datetime import datetime
 import logging
 
-from app.core.database import get_db
+from app.core.database import get_db, get_read_db
 from app.core.auth import get_current_user
 from app.models.user import User
 from app.models.driver import Driver
@@ -199,7 +199,7 @@ async def get_verified_drivers(
 @router.get("/stats")
 async def get_platform_stats(
     admin: User = Depends(verify_admin),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """
     Get platform statistics
@@ -2,7 +2,7 @@
 Chat API endpoints for Neighborhood Chat
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from sqlalchemy.orm import Session
 from sqlalchemy import desc, func
 from typing import List, Optional
@@ -11,6 +11,7 @@ from datetime import datetime
 
 from app.core.database import get_db
 from app.core.auth import get_current_user
+from app.core.pagination import keyset_paginate
 from app.models.user import User
 from app.models.chat import ChatRoom, ChatMessage, ChatRoomMember
 from app.models.community import Neighborhood, UserNeighborhood
@@ -168,12 +169,16 @@ async def get_room_details(
 @router.get("/rooms/{room_id}/messages")
 async def get_messages(
     room_id: str,
-    limit: int = 50,
-    before: Optional[str] = None,
+    response: Response,
+    limit: int = Query(50, ge=1, le=100),
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ) -> List[dict]:
-    """Get messages from a chat room."""
+    """
+    Get messages from a chat room, oldest first within the page.
+    Older pages: pass the X-Next-Cursor response header back as `cursor`.
+    """
     
     # Check membership
     member = db.query(ChatRoomMember).filter(
@@ -190,13 +195,9 @@ async def get_messages(
         ChatMessage.is_deleted == False
     )
     
-    if before:
-        # Pagination: get messages before this message
-        before_msg = db.query(ChatMessage).filter(ChatMessage.id == before).first()
-        if before_msg:
-            query = query.filter(ChatMessage.created_at < before_msg.created_at)
-    
-    messages = query.order_by(desc(ChatMessage.created_at)).limit(limit).all()
+    messages, next_cursor = keyset_paginate(query, ChatMessage.created_at, ChatMessage.id, limit, cursor)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     
     # Mark as read
     member.last_read_at = datetime.utcnow()
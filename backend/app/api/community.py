@@ -4,17 +4,18 @@ Community API endpoints - Verification, Leaderboards, Neighborhoods
 
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import desc, func
 from typing import List, Optional
 from pydantic import BaseModel
-from datetime import datetime
 
-from app.core.database import get_db
-from app.core.auth import get_current_user
+from app.core.database import get_db, get_async_db
+from app.core.auth import get_current_user, get_current_user_async
 from app.models.user import User
 from app.models.incident import Incident
-from app.models.community import City, Neighborhood, IncidentVerification
-from app.services.gamification import gamification_service
+from app.models.community import City, Neighborhood
+from app.services.partitioning import active_incidents_since
+from app.services.verification import VERIFICATION_TYPES, verification_service
 
 router = APIRouter(prefix="/community", tags=["Community"])
 
@@ -48,8 +49,8 @@ class LeaderboardEntry(BaseModel):
 async def verify_incident(
     incident_id: str,
     request: VerifyRequest,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
 ) -> VerificationResponse:
     """
     Verify an incident with 'still_there' or 'all_clear'.
@@ -65,87 +66,35 @@ async def verify_incident(
             detail=f"Trust Score must be at least {MIN_TRUST_TO_VERIFY} to verify incidents."
         )
     
+    # Validate verification type
+    if request.verification_type not in VERIFICATION_TYPES:
+        raise HTTPException(status_code=400, detail="Invalid verification type")
+    
     # Get incident
-    incident = db.query(Incident).filter(Incident.id == incident_id).first()
+    incident = await db.get(Incident, incident_id)
     if not incident:
         raise HTTPException(status_code=404, detail="Incident not found")
     
-    if incident.status != 'active':
+    # Record the vote; tallies and thresholds are applied in one UPDATE
+    result = await verification_service.vote(db, incident, current_user, request.verification_type)
+    if result is None:
         raise HTTPException(status_code=400, detail="Can only verify active incidents")
-    
-    # Check if user already verified this incident
-    existing = db.query(IncidentVerification).filter(
-        IncidentVerification.incident_id == incident_id,
-        IncidentVerification.user_id == current_user.id
-    ).first()
-    
-    if existing:
+    if not result.recorded:
         raise HTTPException(status_code=400, detail="You have already verified this incident")
     
-    # Validate verification type
-    if request.verification_type not in ['still_there', 'all_clear']:
-        raise HTTPException(status_code=400, detail="Invalid verification type")
-    
-    # Calculate verification weight based on trust score
-    weight = max(0.1, user_trust / 100.0)
-    
-    # Create verification
-    verification = IncidentVerification(
-        incident_id=incident_id,
-        user_id=current_user.id,
-        verification_type=request.verification_type,
-        weight=weight
-    )
-    db.add(verification)
+    await verification_service.announce(incident, request.verification_type)
     
-    # Update incident based on verifications
     if request.verification_type == 'still_there':
-        incident.confirmations = (incident.confirmations or 0) + 1
-        
-        # Check if incident should become verified
-        # Sum weights of 'still_there' verifications
-        total_weight = db.query(func.sum(IncidentVerification.weight)).filter(
-            IncidentVerification.incident_id == incident_id,
-            IncidentVerification.verification_type == 'still_there'
-        ).scalar() or 0
-        total_weight += weight  # Include current
-        
-        if total_weight >= 3.0 and not incident.is_verified:
-            incident.is_verified = True
-            incident.verified_at = datetime.utcnow()
-            
-            # Award bonus points to original reporter
-            if incident.user_id:
-                reporter = db.query(User).filter(User.id == incident.user_id).first()
-                if reporter:
-                    reporter.trust_score = min(1000, (reporter.trust_score or 0) + 10)
-                    gamification_service.award_points(db, incident.user_id, 10, "report_verified")
-        
-        message = "Thanks for confirming! Report verified." if incident.is_verified else "Thanks for confirming!"
-        
-    else:  # all_clear
-        # Count 'all_clear' verifications
-        clear_count = db.query(func.count(IncidentVerification.id)).filter(
-            IncidentVerification.incident_id == incident_id,
-            IncidentVerification.verification_type == 'all_clear'
-        ).scalar() or 0
-        clear_count += 1  # Include current
-        
-        if clear_count >= 3:
-            incident.status = 'resolved'
-            message = "Incident marked as resolved. Thanks!"
-        else:
-            message = "Thanks for the update!"
-    
-    db.commit()
-    
-    # Award points to verifier
-    gamification_service.award_points(db, current_user.id, 2, "incident_verification")
+        message = "Thanks for confirming! Report verified." if result.is_verified else "Thanks for confirming!"
+    elif result.resolved_now:
+        message = "Incident marked as resolved. Thanks!"
+    else:
+        message = "Thanks for the update!"
     
     return VerificationResponse(
         success=True,
         message=message,
-        new_status=incident.status
+        new_status=result.status
     )
 
 
@@ -229,7 +178,8 @@ async def get_community_stats(
     
     total_reports = db.query(func.count(Incident.id)).scalar() or 0
     active_reports = db.query(func.count(Incident.id)).filter(
-        Incident.status == 'active'
+        Incident.status == 'active',
+        Incident.created_at >= active_incidents_since()
     ).scalar() or 0
     verified_reports = db.query(func.count(Incident.id)).filter(
         Incident.is_verified == True
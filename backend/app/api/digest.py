@@ -7,7 +7,7 @@ from sqlalchemy.orm import Session
 from sqlalchemy import func
 from datetime import datetime, timedelta
 
-from app.core.database import get_db
+from app.core.database import get_read_db
 from app.core.auth import get_current_user
 from app.models.user import User
 from app.models.incident import Incident
@@ -18,7 +18,7 @@ router = APIRouter(prefix="/digest", tags=["Digest"])
 
 @router.get("/weekly")
 async def get_weekly_digest(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ) -> dict:
     """Get this week's personalized digest for the user."""
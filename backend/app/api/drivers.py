@@ -4,8 +4,9 @@ Driver registration, location updates, and availability management
 """
 
 from fastapi import APIRouter, Depends, HTTPException, status, Query
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_
+from sqlalchemy import func, and_, select
 from pydantic import BaseModel, Field
 from typing import Optional, List
 from datetime import datetime
@@ -13,8 +14,12 @@ from geoalchemy2.functions import ST_DWithin, ST_Distance
 from geoalchemy2.elements import WKTElement
 import logging
 
-from app.core.database import get_db
-from app.core.auth import get_current_user, get_current_driver
+from app.core.database import get_db, get_async_db
+from app.core.auth import (
+    get_current_user, get_current_driver, get_current_user_async, get_current_driver_async,
+    get_identity, get_identity_async
+)
+from app.core.identity import Identity
 from app.models.user import User
 from app.models.driver import Driver
 
@@ -158,14 +163,14 @@ async def register_driver(
 @router.get("/me", response_model=DriverResponse)
 async def get_driver_profile(
     current_user: User = Depends(get_current_driver),
-    db: Session = Depends(get_db)
+    identity: Identity = Depends(get_identity)
 ):
     """
     Get current driver's profile
     
     **Requires:** User must be registered as a driver
     """
-    driver = db.query(Driver).filter(Driver.user_id == current_user.id).first()
+    driver = identity.driver
     
     if not driver:
         raise HTTPException(
@@ -179,8 +184,8 @@ async def get_driver_profile(
 @router.patch("/status")
 async def update_driver_status(
     status_update: DriverStatusUpdate,
-    current_user: User = Depends(get_current_driver),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_driver_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Update driver online/available status
@@ -189,7 +194,7 @@ async def update_driver_status(
     - `is_online`: Driver is online and can receive requests
     - `is_available`: Driver is available for new rides (not currently on a ride)
     """
-    driver = db.query(Driver).filter(Driver.user_id == current_user.id).first()
+    driver = (await db.execute(select(Driver).where(Driver.user_id == current_user.id))).scalar_one_or_none()
     
     if not driver:
         raise HTTPException(
@@ -209,8 +214,7 @@ async def update_driver_status(
     if status_update.is_available is not None:
         driver.is_available = status_update.is_available
     
-    db.commit()
-    db.refresh(driver)
+    await db.commit()
     
     # Update status in Redis
     from app.services.redis_service import redis_service
@@ -229,8 +233,9 @@ async def update_driver_status(
 @router.post("/location")
 async def update_location(
     location: LocationUpdate,
-    current_user: User = Depends(get_current_driver),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_driver_async),
+    identity: Identity = Depends(get_identity_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Update driver's current location
@@ -240,7 +245,9 @@ async def update_location(
     - Location is stored in PostgreSQL (PostGIS) and Redis (geospatial index)
     - Used for nearby driver search
     """
-    driver = db.query(Driver).filter(Driver.user_id == current_user.id).first()
+    # Cached profile: the location columns are write-only here, so the
+    # snapshot never needs them and these updates don't invalidate it
+    driver = identity.driver
     
     if not driver:
         raise HTTPException(
@@ -255,7 +262,7 @@ async def update_location(
     driver.current_longitude = location.longitude
     driver.last_location_update = datetime.utcnow()
     
-    db.commit()
+    await db.commit()
     
     # Update location in Redis for fast geospatial queries
     from app.services.redis_service import redis_service
@@ -267,6 +274,9 @@ async def update_location(
             ttl_seconds=60  # 1 minute TTL
         )
     
+    from app.services.push_registry import push_registry
+    push_registry.update_location(current_user.id, current_user.device_token, location.latitude, location.longitude)
+    
     logger.info(f"📍 Driver location updated: {driver.id} ({location.latitude}, {location.longitude})")
     
     return {
@@ -285,8 +295,8 @@ async def find_nearby_drivers(
     radius_km: float = Query(5.0, ge=0.1, le=50, description="Search radius in kilometers"),
     vehicle_type: Optional[str] = Query(None, description="Filter by vehicle type (moto/car)"),
     limit: int = Query(10, ge=1, le=50, description="Maximum number of drivers to return"),
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Find nearby available drivers using geospatial search
@@ -306,16 +316,18 @@ async def find_nearby_drivers(
     pickup_point = WKTElement(f'POINT({longitude} {latitude})', srid=4326)
     
     # Build query with geospatial filter
-    query = db.query(
+    distance = func.ST_Distance(
+        Driver.current_location,
+        pickup_point
+    ).label('distance_meters')
+    
+    query = select(
         Driver,
         User,
-        func.ST_Distance(
-            Driver.current_location,
-            pickup_point
-        ).label('distance_meters')
+        distance
     ).join(
         User, Driver.user_id == User.id
-    ).filter(
+    ).where(
         and_(
             Driver.is_online == True,
             Driver.is_available == True,
@@ -336,10 +348,10 @@ async def find_nearby_drivers(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Vehicle type must be 'moto' or 'car'"
             )
-        query = query.filter(Driver.vehicle_type == vehicle_type)
+        query = query.where(Driver.vehicle_type == vehicle_type)
     
     # Order by distance and limit results
-    results = query.order_by('distance_meters').limit(limit).all()
+    results = (await db.execute(query.order_by(distance).limit(limit))).all()
     
     # Format response
     nearby_drivers = []
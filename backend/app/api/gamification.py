@@ -1,6 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from app.core.database import get_db
+from app.core.database import get_db, get_read_db
 from app.services.gamification import gamification_service
 from app.api import auth
 from app.core.auth import get_current_user
@@ -11,7 +11,7 @@ from typing import List, Dict, Any
 router = APIRouter()
 
 @router.get("/leaderboard")
-def get_leaderboard(db: Session = Depends(get_db)):
+def get_leaderboard(db: Session = Depends(get_read_db)):
     users = gamification_service.get_leaderboard(db)
     return [
         {
@@ -11,6 +11,7 @@ import redis
 
 from app.core.database import get_db, check_db_connection
 from app.core.config import settings
+from app.core.metrics import metrics
 
 router = APIRouter()
 
@@ -54,3 +55,55 @@ async def ping():
     """Simple ping endpoint"""
     return {"message": "pong", "timestamp": datetime.utcnow().isoformat()}
 
+
+
+@router.get("/metrics")
+async def get_metrics(prefix: str = ""):
+    """
+    In-process counters and latency histograms for this worker
+    (e.g. `?prefix=db.` for per-route statement counts and DB time)
+    """
+    return metrics.snapshot(prefix=prefix)
+
+
+@router.get("/metrics/incident-index")
+async def get_incident_index_stats():
+    """
+    In-process incident index of this worker: size, approximate resident
+    memory, time since the last load and change, pub/sub refresh lag and
+    hit ratio
+    """
+    from app.services.incident_index import incident_index
+    return incident_index.stats()
+
+
+@router.get("/metrics/push")
+async def get_push_stats():
+    """
+    Push dispatcher of this worker: queue depth, receipts awaiting a poll,
+    sent/failed/retried/pruned counts, throughput and request latency
+    """
+    from app.services.push_dispatcher import push_dispatcher
+    return push_dispatcher.stats()
+
+
+@router.get("/metrics/outbox")
+async def get_outbox_stats():
+    """
+    Transactional outbox: pending events and the age of the oldest, events
+    given up on, and this worker's processed/retry counters and
+    commit-to-done lag
+    """
+    from app.services.outbox import outbox
+    return await outbox.stats()
+
+
+@router.get("/metrics/routes")
+async def get_route_cache_stats():
+    """
+    Route analysis cache of this worker: base route hits (local and Redis)
+    and misses, incident overlay hits, misses and invalidations, hit ratios,
+    average cost of a miss and the total time hits saved
+    """
+    from app.services.route_cache import route_cache
+    return route_cache.stats()
@@ -1,12 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from geoalchemy2.elements import WKTElement
+from typing import List, Literal, Optional
 from pydantic import BaseModel
 from datetime import datetime
 
-from app.core.database import get_db
+from app.core.database import get_async_db, get_read_db, get_async_read_db
+from app.core.pagination import TotalMode, count_total, keyset_paginate
 from app.models.incident import Incident
-from app.core.auth import get_current_user
+from app.core.auth import get_current_user, get_current_user_async
 from app.models.user import User
 
 router = APIRouter(prefix="/incidents", tags=["Incidents"])
@@ -30,14 +34,31 @@ class IncidentResponse(BaseModel):
     class Config:
         orm_mode = True
 
+class IncidentCluster(BaseModel):
+    latitude: float  # Centroid
+    longitude: float
+    count: int
+    latest_at: datetime
+
 @router.post("/", response_model=IncidentResponse, status_code=status.HTTP_201_CREATED)
 async def report_incident(
     incident: IncidentCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
 ):
+    """
+    Report an incident. A report matching an active incident of the same
+    type nearby and recently is merged into it as a confirmation: the
+    existing incident is returned with 200 and no new alert or push is sent.
+    Points, the map alert and pushes for a new incident are sent after the
+    response, by the outbox worker.
+    """
     from datetime import timedelta
-    from app.services.gamification import gamification_service
+    from app.services.incident_expiry import expires_at_for
+    from app.services.incident_index import incident_index
+    from app.services.incident_ingest import incident_ingest_service
+    from app.services.outbox import INCIDENT_REPORT_ALERT, INCIDENT_REPORT_POINTS, outbox
     
     # Permission Check for Sensitive Types - use trust_score
     SENSITIVE_TYPES = ['police', 'checkpoint', 'military']
@@ -51,13 +72,27 @@ async def report_incident(
                 detail=f"Trust Score must be at least {REQUIRED_SCORE} to report {incident.type}."
             )
 
+    # Held until commit: a concurrent report of the same thing waits, then merges
+    await incident_ingest_service.lock_area(db, incident.type, incident.latitude, incident.longitude)
+    duplicate = await incident_ingest_service.find_duplicate(
+        db, incident.type, incident.latitude, incident.longitude
+    )
+    if duplicate is not None:
+        if await incident_ingest_service.merge(db, duplicate, current_user):
+            incident_index.publish(duplicate)
+            incident_ingest_service.schedule_broadcast(duplicate)
+        response.status_code = status.HTTP_200_OK
+        return duplicate
+
     new_incident = Incident(
         user_id=current_user.id,
         type=incident.type,
         description=incident.description,
         latitude=incident.latitude,
         longitude=incident.longitude,
-        media_url=incident.media_url
+        location=WKTElement(f'POINT({incident.longitude} {incident.latitude})', srid=4326),
+        media_url=incident.media_url,
+        expires_at=expires_at_for(incident.type)
     )
     db.add(new_incident)
     
@@ -87,162 +122,195 @@ async def report_incident(
     # Award trust score for report (10 per report, capped at 500 until verification)
     current_user.trust_score = min(500, (current_user.trust_score or 0) + 10)
     
-    db.commit()
-    db.refresh(new_incident)
+    # Points, alert and push go out from the outbox worker once this commits
+    await db.flush()  # new_incident.id
+    outbox.add(db, INCIDENT_REPORT_POINTS, {"user_id": current_user.id, "incident_id": new_incident.id})
+    outbox.add(db, INCIDENT_REPORT_ALERT, {"incident_id": new_incident.id})
+    await db.commit()
+    outbox.notify()
+    await db.refresh(new_incident)  # server-side created_at
     
-    # Award points and check for badges
-    gamification_service.award_points(db, current_user.id, 5, reason="incident_report")
-    gamification_service.check_badges(db, current_user.id)
+    # Every worker's incident index (so the reporter's next map read has it)
+    incident_index.publish(new_incident)
     
-    # Broadcast Alert
-    try:
-        import pygeohash as pgh
-        from app.core.websocket import manager, create_event
-        
-        gh = pgh.encode(new_incident.latitude, new_incident.longitude, precision=6)
-        
-        alert_data = {
-            "id": new_incident.id,
-            "type": new_incident.type,
-            "latitude": new_incident.latitude,
-            "longitude": new_incident.longitude,
-            "description": new_incident.description,
-            "created_at": new_incident.created_at.isoformat()
-        }
-        
-        # Run async broadcast
-        await manager.broadcast_to_area(
-            center_geohash=gh,
-            message=create_event(event_type="incident_alert", data=alert_data),
-            include_neighbors=True
-        )
-
-        # --- Push Notification (MVP: Send to all other users) ---
-        from app.services.notifications import notification_service
-        
-        # Get all device tokens except current user
-        # In production, query geospatial index or topic subscription
-        tokens_query = db.query(User.device_token).filter(
-            User.device_token.isnot(None),
-            User.id != current_user.id
-        ).all()
-        
-        device_tokens = [t[0] for t in tokens_query if t[0]]
-        
-        if device_tokens:
-            await notification_service.send_push_notification(
-                to=device_tokens,
-                title=f"New {new_incident.type} reported!",
-                body=f"Near you: {new_incident.description or 'Check map for details'}",
-                data={"incident_id": new_incident.id}
-            )
-            
-    except Exception as e:
-        # Don't fail the request if WS/Push fails
-        print(f"Failed to broadcast incident: {e}")
-        pass
-        
     return new_incident
 
 @router.get("/", response_model=List[IncidentResponse])
 async def get_nearby_incidents(
     latitude: float,
     longitude: float,
-    radius_km: float = 5.0,
-    db: Session = Depends(get_db)
+    radius_km: float = Query(5.0, gt=0, le=50),
+    order_by: Literal["distance", "recent"] = "distance",
+    limit: int = Query(100, ge=1, le=500),
+    db: AsyncSession = Depends(get_async_read_db)
 ):
-    # Simple bounding box approximation or just all recent incidents for MVP
-    # For MVP: Return all incidents created in last 24h (to keep map clean)
-    # Refinement: Add geospatial query logic if needed later
+    """
+    Active, unexpired incidents within `radius_km`, nearest (or newest) first,
+    at most `limit` of them. At low zoom levels use /incidents/clusters.
+    Served from the in-process incident index once it is loaded.
+    """
+    from app.core.config import settings
+    from app.core.metrics import metrics
+    from app.services.incident_index import active_near, incident_index
     
-    # Filter by time (last 24 hours) - omitted for simplicity in demo
+    if settings.INCIDENT_INDEX_ENABLED:
+        if incident_index.ready:
+            metrics.inc("incident_index.hit")
+            return incident_index.nearby(latitude, longitude, radius_km, order_by, limit)
+        metrics.inc("incident_index.miss")
     
-    # Basic lat/long filtering (approximate)
-    # 1 deg lat ~= 111 km
-    deg_radius = radius_km / 111.0
+    conditions, distance = active_near(latitude, longitude, radius_km)
+    order = distance if order_by == "distance" else Incident.created_at.desc()
     
-    incidents = db.query(Incident).filter(
-        Incident.latitude.between(latitude - deg_radius, latitude + deg_radius),
-        Incident.longitude.between(longitude - deg_radius, longitude + deg_radius)
-    ).all()
+    result = await db.execute(
+        select(Incident).where(*conditions).order_by(order).limit(limit)
+    )
+    incidents = result.scalars().all()
     
     return incidents
 
 
-@router.get("/feed")
-async def get_incident_feed(
-    page: int = 1,
-    limit: int = 20,
-    latitude: Optional[float] = None,
-    longitude: Optional[float] = None,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+@router.get("/clusters", response_model=List[IncidentCluster])
+async def get_incident_clusters(
+    latitude: float,
+    longitude: float,
+    zoom: int = Query(..., ge=0, le=20),
+    radius_km: float = Query(50.0, gt=0, le=500),
+    limit: int = Query(200, ge=1, le=1000),
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """
-    Get incidents as a social feed with reporter info.
-    Returns paginated list of incidents with reporter profile data.
+    Active incidents within `radius_km` grouped on a grid sized for the map
+    `zoom` (about a quarter of a map tile per cell). Returns each cluster's
+    centroid and incident count, largest clusters first.
     """
-    from sqlalchemy import desc, func
-    from app.models.gamification import Badge, UserBadge
-    from app.models.community import IncidentVerification
+    from sqlalchemy import func
+    from app.services.incident_index import active_near
     
-    offset = (page - 1) * limit
+    conditions, _ = active_near(latitude, longitude, radius_km)
+    cell_deg = 360.0 / (2 ** zoom) / 4
+    cell_lat = func.floor(Incident.latitude / cell_deg)
+    cell_lng = func.floor(Incident.longitude / cell_deg)
+    count = func.count(Incident.id)
     
-    # Base query - recent incidents first
-    query = db.query(Incident).filter(
-        Incident.status == 'active'
-    ).order_by(desc(Incident.created_at))
+    result = await db.execute(
+        select(
+            func.avg(Incident.latitude),
+            func.avg(Incident.longitude),
+            count,
+            func.max(Incident.created_at)
+        ).where(*conditions).group_by(cell_lat, cell_lng).order_by(count.desc()).limit(limit)
+    )
     
-    # Optional geo-filtering
-    if latitude and longitude:
-        deg_radius = 10 / 111.0  # ~10km radius
-        query = query.filter(
-            Incident.latitude.between(latitude - deg_radius, latitude + deg_radius),
-            Incident.longitude.between(longitude - deg_radius, longitude + deg_radius)
-        )
+    return [
+        IncidentCluster(latitude=lat, longitude=lng, count=n, latest_at=latest)
+        for lat, lng, n, latest in result.all()
+    ]
+
+
+class IncidentChange(IncidentResponse):
+    status: str
+    is_verified: bool
+    expires_at: Optional[datetime]
+    updated_at: datetime
+
+class IncidentChanges(BaseModel):
+    full: bool  # True: replace the incidents you hold; False: upsert these, drop the ones no longer active
+    cursor: str
+    incidents: List[IncidentChange]
+
+@router.get("/changes", response_model=IncidentChanges, responses={304: {"description": "No changes since the cursor"}})
+async def get_incident_changes(
+    response: Response,
+    latitude: float,
+    longitude: float,
+    radius_km: float = Query(5.0, gt=0, le=50),
+    since: Optional[str] = Query(None, description="`cursor` from the previous poll"),
+    limit: int = Query(500, ge=1, le=500),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Incidents within `radius_km` created or changed (verified, resolved,
+    expired) since the `since` cursor, in any status. Without a cursor, or
+    with one older than INCIDENT_CHANGES_MAX_AGE_SECONDS, or when more than
+    `limit` incidents changed, returns a snapshot of the active incidents
+    instead (`full: true`).
+
+    Nothing changed: 304 with the next cursor in X-Next-Cursor. Changes show
+    up here INCIDENT_CHANGES_LAG_SECONDS late; keep the same area between
+    polls or drop the cursor. Reads the primary: a lagging replica would
+    hide changes from the cursor for good.
+    """
+    from app.services.incident_changes import decode_cursor, incident_changes_service
+
+    since_at = None
+    if since:
+        try:
+            since_at = decode_cursor(since)
+        except (ValueError, OverflowError):
+            raise HTTPException(status_code=400, detail="Invalid changes cursor")
+
+    changes = await incident_changes_service.changes(db, latitude, longitude, radius_km, since_at, limit)
+    response.headers["X-Next-Cursor"] = changes.cursor
+    if not changes.full and not changes.incidents:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"X-Next-Cursor": changes.cursor})
+
+    return IncidentChanges(full=changes.full, cursor=changes.cursor, incidents=changes.incidents)
+
+
+def _trust_level(score: int) -> dict:
+    if score >= 500: return {"name": "Legend", "icon": "👑"}
+    if score >= 300: return {"name": "Elder", "icon": "🦁"}
+    if score >= 150: return {"name": "Guardian", "icon": "🛡️"}
+    if score >= 50: return {"name": "Trusted", "icon": "✅"}
+    return {"name": "Newcomer", "icon": "🌱"}
+
+
+def _build_feed_items(db: Session, incidents: List[Incident]) -> List[dict]:
+    """
+    Feed items for a page of incidents in one batched query (reporters with
+    their highest badge); verification counts are the incidents' tallies
+    """
+    from sqlalchemy import and_, func
+    from app.models.gamification import Badge, UserBadge
     
-    total = query.count()
-    incidents = query.offset(offset).limit(limit).all()
+    if not incidents:
+        return []
+    
+    reporter_ids = {inc.user_id for inc in incidents if inc.user_id}
+    
+    # Reporters + highest badge (by requirement_value) in one query
+    reporters = {}
+    if reporter_ids:
+        ranked_badges = db.query(
+            UserBadge.user_id,
+            Badge.name,
+            Badge.icon_url,
+            func.row_number().over(
+                partition_by=UserBadge.user_id,
+                order_by=func.coalesce(Badge.requirement_value, 0).desc()
+            ).label("rank")
+        ).join(Badge, Badge.id == UserBadge.badge_id).filter(
+            UserBadge.user_id.in_(reporter_ids)
+        ).subquery()
+        
+        rows = db.query(
+            User.id,
+            User.full_name,
+            User.profile_photo_url,
+            User.trust_score,
+            ranked_badges.c.name.label("badge_name"),
+            ranked_badges.c.icon_url.label("badge_icon")
+        ).outerjoin(
+            ranked_badges, and_(ranked_badges.c.user_id == User.id, ranked_badges.c.rank == 1)
+        ).filter(User.id.in_(reporter_ids)).all()
+        reporters = {row.id: row for row in rows}
     
-    # Build feed items with reporter info
     feed_items = []
     for inc in incidents:
-        # Get reporter
-        reporter = db.query(User).filter(User.id == inc.user_id).first()
-        
-        # Get reporter's highest badge
-        highest_badge = None
-        if reporter:
-            user_badges = db.query(UserBadge).filter(
-                UserBadge.user_id == reporter.id
-            ).all()
-            if user_badges:
-                badge_ids = [ub.badge_id for ub in user_badges]
-                badges = db.query(Badge).filter(Badge.id.in_(badge_ids)).all()
-                # Find badge with highest requirement_value
-                if badges:
-                    highest_badge = max(badges, key=lambda b: b.requirement_value or 0)
-        
-        # Get verification counts
-        still_there_count = db.query(func.count(IncidentVerification.id)).filter(
-            IncidentVerification.incident_id == inc.id,
-            IncidentVerification.verification_type == 'still_there'
-        ).scalar() or 0
-        
-        all_clear_count = db.query(func.count(IncidentVerification.id)).filter(
-            IncidentVerification.incident_id == inc.id,
-            IncidentVerification.verification_type == 'all_clear'
-        ).scalar() or 0
-        
-        # Calculate trust level
-        def get_trust_level(score):
-            if score >= 500: return {"name": "Legend", "icon": "👑"}
-            if score >= 300: return {"name": "Elder", "icon": "🦁"}
-            if score >= 150: return {"name": "Guardian", "icon": "🛡️"}
-            if score >= 50: return {"name": "Trusted", "icon": "✅"}
-            return {"name": "Newcomer", "icon": "🌱"}
-        
-        reporter_trust = get_trust_level(reporter.trust_score or 0) if reporter else None
+        reporter = reporters.get(inc.user_id)
+        still_there_count = inc.confirmations or 0  # 'still_there' votes
+        all_clear_count = inc.all_clear_count or 0
         
         feed_items.append({
             "id": inc.id,
@@ -260,11 +328,11 @@ async def get_incident_feed(
                 "name": reporter.full_name if reporter else "Anonymous",
                 "profile_photo_url": reporter.profile_photo_url if reporter else None,
                 "trust_score": reporter.trust_score if reporter else 0,
-                "trust_level": reporter_trust,
+                "trust_level": _trust_level(reporter.trust_score or 0) if reporter else None,
                 "badge": {
-                    "name": highest_badge.name,
-                    "icon": highest_badge.icon_url
-                } if highest_badge else None
+                    "name": reporter.badge_name,
+                    "icon": reporter.badge_icon
+                } if reporter and reporter.badge_name else None
             },
             "verifications": {
                 "still_there": still_there_count,
@@ -275,13 +343,89 @@ async def get_incident_feed(
             }
         })
     
-    return {
-        "items": feed_items,
-        "page": page,
+    return feed_items
+
+
+@router.get("/feed")
+async def get_incident_feed(
+    cursor: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=50),
+    latitude: Optional[float] = None,
+    longitude: Optional[float] = None,
+    total: Optional[TotalMode] = None,
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Get incidents as a social feed with reporter info.
+    Newest first; pass `next_cursor` back as `cursor` for the next page.
+    `total=exact|estimate` adds a total count (omitted by default).
+    
+    Pages are shared by everyone in the same geohash cell (FEED_CACHE_PRECISION)
+    and cached for FEED_CACHE_TTL seconds. Incidents come from the in-process
+    incident index once it is loaded.
+    """
+    from sqlalchemy import or_
+    from app.core import geohash as geohash_utils
+    from app.core.config import settings
+    from app.core.metrics import metrics
+    from app.services.incident_index import incident_index
+    from app.services.partitioning import active_incidents_since
+    from app.services.redis_service import redis_service
+    
+    cell = "global"
+    if latitude and longitude:
+        # Filter around the cell centre so the page depends only on the cell
+        cell = geohash_utils.encode(latitude, longitude, settings.FEED_CACHE_PRECISION)
+        latitude, longitude = geohash_utils.decode(cell)
+    
+    cache_key = f"{cell}:{limit}:{cursor or ''}:{total or ''}"
+    if settings.FEED_CACHE_TTL > 0:
+        cached = redis_service.get_feed_page(cache_key)
+        if cached is not None:
+            metrics.inc("feed.cache.hit")
+            return cached
+        metrics.inc("feed.cache.miss")
+    
+    if settings.INCIDENT_INDEX_ENABLED and incident_index.ready:
+        metrics.inc("incident_index.hit")
+        (incidents, next_cursor), total_count = incident_index.feed_page(limit, cursor, latitude, longitude)
+        if total is None:
+            total_count = None
+    else:
+        if settings.INCIDENT_INDEX_ENABLED:
+            metrics.inc("incident_index.miss")
+        
+        # Base query - active, unexpired incidents only (recent partitions)
+        query = db.query(Incident).filter(
+            Incident.status == 'active',
+            or_(Incident.expires_at.is_(None), Incident.expires_at > datetime.utcnow()),
+            Incident.created_at >= active_incidents_since()
+        )
+        
+        # Optional geo-filtering
+        if latitude and longitude:
+            deg_radius = 10 / 111.0  # ~10km radius
+            query = query.filter(
+                Incident.latitude.between(latitude - deg_radius, latitude + deg_radius),
+                Incident.longitude.between(longitude - deg_radius, longitude + deg_radius)
+            )
+        
+        total_count = count_total(db, query, total)
+        incidents, next_cursor = keyset_paginate(query, Incident.created_at, Incident.id, limit, cursor)
+    
+    page = {
+        "items": _build_feed_items(db, incidents),
         "limit": limit,
-        "total": total,
-        "has_more": (page * limit) < total
+        "total": total_count,
+        "next_cursor": next_cursor,
+        "has_more": next_cursor is not None
     }
+    
+    if settings.FEED_CACHE_TTL > 0:
+        redis_service.cache_feed_page(cache_key, page, settings.FEED_CACHE_TTL)
+    
+    return page
 
 class VerificationRequest(BaseModel):
     verification_type: str  # 'still_there' or 'all_clear'
@@ -290,65 +434,28 @@ class VerificationRequest(BaseModel):
 async def verify_incident(
     incident_id: str,
     verification: VerificationRequest,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
 ):
-    from app.models.community import IncidentVerification
-    from app.services.gamification import gamification_service
+    """
+    Vote 'still_there' or 'all_clear'. Voting the other way later replaces
+    the earlier vote.
+    """
+    from app.services.verification import VERIFICATION_TYPES, verification_service
+    
+    if verification.verification_type not in VERIFICATION_TYPES:
+        raise HTTPException(status_code=400, detail="Invalid verification type")
     
-    # 1. Check if incident exists
-    incident = db.query(Incident).filter(Incident.id == incident_id).first()
+    incident = await db.get(Incident, incident_id)
     if not incident:
         raise HTTPException(status_code=404, detail="Incident not found")
-        
-    # 2. Check if user already verified
-    existing_verification = db.query(IncidentVerification).filter(
-        IncidentVerification.incident_id == incident_id,
-        IncidentVerification.user_id == current_user.id
-    ).first()
-    
-    if existing_verification:
-        # Update existing verification
-        existing_verification.verification_type = verification.verification_type
-        # In a real app, we might check if they changed their mind and adjust counts accordingly
-    else:
-        # Create new verification
-        new_verification = IncidentVerification(
-            incident_id=incident_id,
-            user_id=current_user.id,
-            verification_type=verification.verification_type
-        )
-        db.add(new_verification)
-        
-        # Award points for first-time verification
-        gamification_service.award_points(db, current_user.id, 2, "incident_verification")
-        
-    # 3. Update cached counts
-    if verification.verification_type == 'still_there':
-        incident.confirmations = (incident.confirmations or 0) + 1
-    
-    db.commit()
-    
-    # 4. Determine if incident should be cleared
-    # Simple logic: If 'all_clear' votes > threshold or 'still_there', handle auto-resolve (future task)
     
-    # 5. Broadcast update
-    import pygeohash as pgh
-    from app.core.websocket import manager, create_event
+    result = await verification_service.vote(db, incident, current_user, verification.verification_type)
+    if result is None:
+        raise HTTPException(status_code=400, detail="Can only verify active incidents")
+    if not result.recorded:
+        raise HTTPException(status_code=400, detail="You have already verified this incident")
     
-    gh = pgh.encode(incident.latitude, incident.longitude, precision=6)
+    await verification_service.announce(incident, verification.verification_type)
     
-    await manager.broadcast_to_area(
-        center_geohash=gh,
-        message=create_event(
-            event_type="incident_verified", 
-            data={
-                "incident_id": incident_id,
-                "verification_type": verification.verification_type,
-                "confirmations": incident.confirmations
-            }
-        ),
-        include_neighbors=True
-    )
-
     return {"success": True, "message": "Verification recorded"}
@@ -160,7 +160,8 @@ async def verify_payment(
                             "id": payment.ride_id,
                             "payment_status": "paid",
                             "amount": float(payment.amount)
-                        }
+                        },
+                        participant_ids=[payment.ride.passenger_id]
                     )
             
             db.commit()
@@ -219,7 +220,8 @@ async def payment_webhook(
                          "id": payment.ride_id,
                          "payment_status": "paid",
                          "amount": float(payment.amount)
-                     }
+                     },
+                     participant_ids=[payment.ride.passenger_id]
                  )
              db.commit()
 
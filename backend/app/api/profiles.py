@@ -6,7 +6,7 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from sqlalchemy import func, desc
 
-from app.core.database import get_db
+from app.core.database import get_read_db
 from app.core.auth import get_current_user
 from app.models.user import User
 from app.models.incident import Incident
@@ -35,7 +35,7 @@ def get_trust_level(trust_score: int) -> dict:
 @router.get("/{user_id}")
 async def get_user_profile(
     user_id: str,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ) -> dict:
     """Get mini profile for a user."""
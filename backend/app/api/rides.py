@@ -3,17 +3,23 @@ Ehreezoh - Rides API
 Ride requests, tracking, and lifecycle management
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, func
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy import and_, or_, func, select
 import sqlalchemy
 from pydantic import BaseModel, Field
 from typing import Optional, List
 from datetime import datetime
 from geoalchemy2.elements import WKTElement
 import logging
-from app.core.database import get_db
-from app.core.auth import get_current_user, get_current_driver
+from app.core.database import get_db, get_async_db
+from app.core.auth import (
+    get_current_user, get_current_user_async, get_current_driver_async,
+    get_identity, get_identity_async
+)
+from app.core.identity import Identity
+from app.core.pagination import keyset_paginate
 from app.core.websocket import broadcast_ride_update, EventType, notify_passenger, notify_driver
 from app.models.user import User
 from app.models.ride import Ride
@@ -73,11 +79,34 @@ class RatingRequest(BaseModel):
     review: Optional[str] = Field(None, description="Optional review comment")
 
 
+def _ride_participant_ids(ride: Ride) -> List[str]:
+    """User IDs of the passenger and the assigned driver (for resumable event logs)"""
+    ids = [ride.passenger_id]
+    if ride.driver:
+        ids.append(ride.driver.user_id)
+    return [uid for uid in ids if uid]
+
+
+async def _get_ride(db: AsyncSession, ride_id: str) -> Ride:
+    """Load a ride with its driver (no lazy loading on AsyncSession) or 404"""
+    result = await db.execute(
+        select(Ride).options(selectinload(Ride.driver)).where(Ride.id == ride_id)
+    )
+    ride = result.scalar_one_or_none()
+    
+    if not ride:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Ride not found"
+        )
+    return ride
+
+
 @router.post("/request", response_model=RideResponse, status_code=status.HTTP_201_CREATED)
 async def request_ride(
     ride_request: RideRequest,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Request a new ride
@@ -145,17 +174,18 @@ async def request_ride(
     )
     
     db.add(new_ride)
-    db.commit()
-    db.refresh(new_ride)
+    await db.commit()
     
     logger.info(f"🚕 New ride requested: {new_ride.id} by {current_user.phone_number} ({ride_request.ride_type})")
     
     # Find and match nearby drivers
     from app.services.matching_service import matching_service
-    matched_drivers = matching_service.match_ride_to_drivers(
-        db=db,
-        ride=new_ride,
-        max_drivers=5
+    matched_drivers = await db.run_sync(
+        lambda session: matching_service.match_ride_to_drivers(
+            db=session,
+            ride=new_ride,
+            max_drivers=5
+        )
     )
     
     if matched_drivers:
@@ -189,8 +219,9 @@ async def request_ride(
 @router.get("/{ride_id}", response_model=RideResponse)
 async def get_ride(
     ride_id: str,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user_async),
+    identity: Identity = Depends(get_identity_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Get ride details
@@ -199,16 +230,10 @@ async def get_ride(
     - Passenger who requested the ride
     - Driver assigned to the ride
     """
-    ride = db.query(Ride).filter(Ride.id == ride_id).first()
-    
-    if not ride:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Ride not found"
-        )
+    ride = await _get_ride(db, ride_id)
     
     # Check if user has access to this ride
-    driver = db.query(Driver).filter(Driver.user_id == current_user.id).first()
+    driver = identity.driver
     driver_id = driver.id if driver else None
     
     if ride.passenger_id != current_user.id and ride.driver_id != driver_id:
@@ -223,8 +248,9 @@ async def get_ride(
 @router.patch("/{ride_id}/accept")
 async def accept_ride(
     ride_id: str,
-    current_user: User = Depends(get_current_driver),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_driver_async),
+    identity: Identity = Depends(get_identity_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Driver accepts a ride request
@@ -235,7 +261,7 @@ async def accept_ride(
     - Ride must be in 'requested' status
     """
     # Get driver
-    driver = db.query(Driver).filter(Driver.user_id == current_user.id).first()
+    driver = identity.driver
     
     if not driver or not driver.is_verified:
         raise HTTPException(
@@ -250,13 +276,7 @@ async def accept_ride(
         )
     
     # Get ride
-    ride = db.query(Ride).filter(Ride.id == ride_id).first()
-    
-    if not ride:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Ride not found"
-        )
+    ride = await _get_ride(db, ride_id)
     
     if ride.status != "requested":
         raise HTTPException(
@@ -264,16 +284,15 @@ async def accept_ride(
             detail=f"Ride cannot be accepted (current status: {ride.status})"
         )
     
-    # Accept ride
-    ride.driver_id = driver.id
+    # Accept ride (assigning the relationship also sets driver_id)
+    ride.driver = driver
     ride.status = "accepted"
     ride.accepted_at = datetime.utcnow()
     
     # Mark driver as unavailable
     driver.is_available = False
     
-    db.commit()
-    db.refresh(ride)
+    await db.commit()
     
     # Update Redis with active ride so location updates are broadcasted
     redis_service.set_driver_current_ride(str(driver.user_id), str(ride.id))
@@ -288,11 +307,12 @@ async def accept_ride(
             "id": str(ride.id),
             "status": ride.status,
             "driver": {
-                "full_name": driver.user.full_name if driver.user else "Driver",
-                "phone_number": driver.user.phone_number if driver.user else None,
+                "full_name": current_user.full_name or "Driver",
+                "phone_number": current_user.phone_number,
                 "vehicle_type": driver.vehicle_type,
             }
-        }
+        },
+        participant_ids=_ride_participant_ids(ride)
     )
     
     return ride.to_dict()
@@ -301,8 +321,9 @@ async def accept_ride(
 @router.patch("/{ride_id}/start")
 async def start_ride(
     ride_id: str,
-    current_user: User = Depends(get_current_driver),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_driver_async),
+    identity: Identity = Depends(get_identity_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Driver starts the ride (passenger picked up)
@@ -311,16 +332,10 @@ async def start_ride(
     - Driver must be assigned to this ride
     - Ride must be in 'accepted' status
     """
-    driver = db.query(Driver).filter(Driver.user_id == current_user.id).first()
-    ride = db.query(Ride).filter(Ride.id == ride_id).first()
+    driver = identity.driver
+    ride = await _get_ride(db, ride_id)
     
-    if not ride:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Ride not found"
-        )
-    
-    if ride.driver_id != driver.id:
+    if not driver or ride.driver_id != driver.id:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="You are not assigned to this ride"
@@ -335,8 +350,7 @@ async def start_ride(
     ride.status = "started"
     ride.started_at = datetime.utcnow()
     
-    db.commit()
-    db.refresh(ride)
+    await db.commit()
     
     logger.info(f"🏁 Ride started: {ride.id}")
     
@@ -348,7 +362,8 @@ async def start_ride(
             "id": str(ride.id),
             "status": ride.status,
             "started_at": ride.started_at.isoformat() if ride.started_at else None
-        }
+        },
+        participant_ids=_ride_participant_ids(ride)
     )
     
     return ride.to_dict()
@@ -358,8 +373,9 @@ async def start_ride(
 async def complete_ride(
     ride_id: str,
     final_fare: Optional[float] = Query(None, description="Final fare amount (XAF)"),
-    current_user: User = Depends(get_current_driver),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_driver_async),
+    identity: Identity = Depends(get_identity_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Driver completes the ride (passenger dropped off)
@@ -368,16 +384,10 @@ async def complete_ride(
     - Driver must be assigned to this ride
     - Ride must be in 'started' status
     """
-    driver = db.query(Driver).filter(Driver.user_id == current_user.id).first()
-    ride = db.query(Ride).filter(Ride.id == ride_id).first()
+    driver = identity.driver
+    ride = await _get_ride(db, ride_id)
     
-    if not ride:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Ride not found"
-        )
-    
-    if ride.driver_id != driver.id:
+    if not driver or ride.driver_id != driver.id:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="You are not assigned to this ride"
@@ -398,8 +408,7 @@ async def complete_ride(
     driver.total_rides += 1
     driver.completed_rides += 1
     
-    db.commit()
-    db.refresh(ride)
+    await db.commit()
     
     logger.info(f"🎉 Ride completed: {ride.id}")
     
@@ -412,7 +421,8 @@ async def complete_ride(
             "status": ride.status,
             "final_fare": ride.final_fare,
             "completed_at": ride.completed_at.isoformat() if ride.completed_at else None
-        }
+        },
+        participant_ids=_ride_participant_ids(ride)
     )
     
     return ride.to_dict()
@@ -422,8 +432,9 @@ async def complete_ride(
 async def cancel_ride(
     ride_id: str,
     action: RideAction,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user_async),
+    identity: Identity = Depends(get_identity_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Cancel a ride
@@ -434,16 +445,10 @@ async def cancel_ride(
     
     **Cancellation fees may apply**
     """
-    ride = db.query(Ride).filter(Ride.id == ride_id).first()
-    
-    if not ride:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Ride not found"
-        )
+    ride = await _get_ride(db, ride_id)
     
     # Check if user can cancel
-    driver = db.query(Driver).filter(Driver.user_id == current_user.id).first()
+    driver = identity.driver
     driver_id = driver.id if driver else None
     
     can_cancel = (
@@ -473,8 +478,7 @@ async def cancel_ride(
         driver.is_available = True
         driver.cancelled_rides += 1
     
-    db.commit()
-    db.refresh(ride)
+    await db.commit()
     
     logger.info(f"❌ Ride cancelled: {ride.id} by {ride.cancelled_by}")
     
@@ -487,7 +491,8 @@ async def cancel_ride(
             "status": ride.status,
             "cancelled_by": ride.cancelled_by,
             "cancellation_reason": ride.cancellation_reason
-        }
+        },
+        participant_ids=_ride_participant_ids(ride)
     )
     
     return ride.to_dict()
@@ -495,9 +500,12 @@ async def cancel_ride(
 
 @router.get("/", response_model=List[RideResponse])
 async def get_my_rides(
+    response: Response,
     status: Optional[str] = Query(None, description="Filter by status"),
     limit: int = Query(10, ge=1, le=50),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor from the previous page"),
     current_user: User = Depends(get_current_user),
+    identity: Identity = Depends(get_identity),
     db: Session = Depends(get_db)
 ):
     """
@@ -509,10 +517,12 @@ async def get_my_rides(
     
     **Filter by status:**
     - requested, accepted, started, completed, cancelled
+    
+    **Pagination:**
+    - Newest first; when more rides exist the `X-Next-Cursor` header is set
     """
-    # Get driver if user is a driver
-    driver = db.query(Driver).filter(Driver.user_id == current_user.id).first()
-    driver_id = driver.id if driver else None
+    # Driver profile if user is a driver
+    driver_id = identity.driver.id if identity.driver else None
     
     # Build query
     query = db.query(Ride).filter(
@@ -526,7 +536,9 @@ async def get_my_rides(
     if status:
         query = query.filter(Ride.status == status)
     
-    rides = query.order_by(Ride.requested_at.desc()).limit(limit).all()
+    rides, next_cursor = keyset_paginate(query, Ride.requested_at, Ride.id, limit, cursor)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     
     return [ride.to_dict() for ride in rides]
 
@@ -536,6 +548,7 @@ async def rate_ride(
     ride_id: str,
     rating: RatingRequest,
     current_user: User = Depends(get_current_user),
+    identity: Identity = Depends(get_identity),
     db: Session = Depends(get_db)
 ):
     """
@@ -553,7 +566,7 @@ async def rate_ride(
     is_passenger = ride.passenger_id == current_user.id
     
     # Check if driver
-    driver = db.query(Driver).filter(Driver.user_id == current_user.id).first()
+    driver = identity.driver
     is_driver = driver and ride.driver_id == driver.id
 
     if not is_passenger and not is_driver:
@@ -2,7 +2,7 @@
 Social API endpoints - Thanks and Comments
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
 from sqlalchemy import desc, func
 from typing import List, Optional
@@ -11,6 +11,7 @@ from datetime import datetime
 
 from app.core.database import get_db
 from app.core.auth import get_current_user
+from app.core.pagination import TotalMode, count_total, keyset_paginate
 from app.models.user import User
 from app.models.incident import Incident
 from app.models.social import IncidentThanks, IncidentComment, CommentUpvote, UserFollow
@@ -424,28 +425,43 @@ async def get_following(
 
 @router.get("/followers")
 async def get_followers(
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=100),
+    total: Optional[TotalMode] = None,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ) -> dict:
-    """Get list of users following the current user."""
+    """
+    Get users following the current user, most recent follows first.
+    Pass `next_cursor` back as `cursor` for the next page.
+    """
     
-    follows = db.query(UserFollow).filter(
+    query = db.query(UserFollow, User).join(
+        User, User.id == UserFollow.follower_id
+    ).filter(
         UserFollow.followed_id == current_user.id
-    ).all()
+    )
     
-    followers_list = []
-    for f in follows:
-        user = db.query(User).filter(User.id == f.follower_id).first()
-        if user:
-            followers_list.append({
-                "id": user.id,
-                "name": user.full_name or "Anonymous",
-                "profile_photo_url": user.profile_photo_url,
-                "trust_score": user.trust_score or 0
-            })
+    total_count = count_total(db, query, total)
+    rows, next_cursor = keyset_paginate(
+        query, UserFollow.created_at, UserFollow.id, limit, cursor,
+        row_key=lambda row: (row.UserFollow.created_at, row.UserFollow.id)
+    )
+    
+    followers_list = [
+        {
+            "id": user.id,
+            "name": user.full_name or "Anonymous",
+            "profile_photo_url": user.profile_photo_url,
+            "trust_score": user.trust_score or 0
+        }
+        for _, user in rows
+    ]
     
     return {
         "count": len(followers_list),
-        "followers": followers_list
+        "total": total_count,
+        "followers": followers_list,
+        "next_cursor": next_cursor
     }
 
@@ -0,0 +1,41 @@
+"""
+Ehreezoh - Vector Tiles API
+Incidents and driver density as Mapbox vector tiles for the map
+"""
+
+from fastapi import APIRouter, Depends, HTTPException, Path, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import get_async_read_db
+from app.services.tiles import MAX_ZOOM, tile_service
+
+router = APIRouter(prefix="/tiles", tags=["Tiles"])
+
+MVT_MEDIA_TYPE = "application/vnd.mapbox-vector-tile"
+
+
+@router.get("/{z}/{x}/{y}.mvt")
+async def get_tile(
+    z: int = Path(..., ge=0, le=MAX_ZOOM),
+    x: int = Path(..., ge=0),
+    y: int = Path(..., ge=0),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """
+    One map tile with two layers:
+    - `incidents`: active incidents (id, type, confirmations, is_verified,
+      created_at as epoch seconds), newest first up to TILE_MAX_INCIDENTS
+    - `drivers`: online, available drivers counted per grid cell
+      (`drivers` = count; no individual positions)
+
+    Empty tiles are returned as 204.
+    """
+    if x >= 2 ** z or y >= 2 ** z:
+        raise HTTPException(status_code=400, detail="Tile out of range for this zoom")
+
+    tile = await tile_service.get_tile(db, z, x, y)
+    headers = {"Cache-Control": f"public, max-age={settings.TILE_CACHE_TTL}"}
+    if not tile:
+        return Response(status_code=204, headers=headers)
+    return Response(content=tile, media_type=MVT_MEDIA_TYPE, headers=headers)
@@ -4,7 +4,7 @@ User endpoints
 
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional
 
 from app.core.database import get_db
@@ -26,11 +26,34 @@ async def update_device_token(
     current_user: User = Depends(get_current_user)
 ):
     """Update user's device push token"""
+    from app.services.push_registry import push_registry
+    
     current_user.device_token = request.token
     db.commit()
+    push_registry.update_token(current_user.id, request.token)
     return {"success": True, "message": "Device token updated"}
 
 
+class LastLocationRequest(BaseModel):
+    latitude: float = Field(..., ge=-90, le=90)
+    longitude: float = Field(..., ge=-180, le=180)
+
+
+@router.post("/location")
+async def update_last_location(
+    request: LastLocationRequest,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Report where the app is (call when it comes to the foreground) so
+    incident pushes reach this device. Nothing is stored in the database.
+    """
+    from app.services.push_registry import push_registry
+    
+    push_registry.update_location(current_user.id, current_user.device_token, request.latitude, request.longitude)
+    return {"success": True}
+
+
 class UserProfileResponse(BaseModel):
     """User profile response"""
     user_id: str
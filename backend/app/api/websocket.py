@@ -5,14 +5,25 @@ Real-time communication endpoints
 
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends, Query
 from sqlalchemy.orm import Session
+from pydantic import BaseModel, Field
+from typing import Optional
 import json
 import logging
 
+from app.core.config import settings
 from app.core.database import get_db
-from app.core.websocket import manager, EventType, create_event
+from app.core.metrics import metrics
+from app.core.websocket import manager, EventType, create_event, user_stream_key, ride_stream_key
+from app.core.ws_router import ws_router, ConnectionContext
+from app.core.ws_rate_limit import ConnectionRateLimiter, RateLimitVerdict
+from app.core import geohash as geohash_utils
+from app.core.debug import debug_log
+from app.services.redis_service import redis_service
+from app.services.push_registry import push_registry
 from app.core.auth import decode_access_token
 from app.models.user import User
 from app.models.driver import Driver
+from app.models.ride import Ride
 
 logger = logging.getLogger(__name__)
 
@@ -55,10 +66,187 @@ async def get_user_from_token(token: str, db: Session) -> User:
         raise
 
 
+
+# ===== INBOUND MESSAGE SCHEMAS =====
+
+class PingPayload(BaseModel):
+    timestamp: Optional[str] = None
+
+
+class RideRoomPayload(BaseModel):
+    ride_id: str
+    last_seq: Optional[int] = None
+
+
+class LocationPayload(BaseModel):
+    latitude: float = Field(..., ge=-90, le=90)
+    longitude: float = Field(..., ge=-180, le=180)
+
+
+class ChatRoomPayload(BaseModel):
+    room_id: str
+
+
+class TypingPayload(BaseModel):
+    room_id: str
+    is_typing: bool = False
+
+
+def is_ride_participant(db: Session, ride_id: str, user_id: str) -> bool:
+    """True if the user is the ride's passenger or its driver"""
+    row = db.query(Ride.passenger_id, Driver.user_id).outerjoin(
+        Driver, Driver.id == Ride.driver_id
+    ).filter(Ride.id == ride_id).first()
+    return row is not None and user_id in (row[0], row[1])
+
+
+# ===== INBOUND MESSAGE HANDLERS =====
+
+@ws_router.route(EventType.PING, PingPayload)
+async def handle_ping(ctx: ConnectionContext, payload: PingPayload):
+    await ctx.websocket.send_json(create_event(
+        event_type=EventType.PONG,
+        data={"timestamp": payload.timestamp}
+    ))
+
+
+@ws_router.route("join_ride", RideRoomPayload)
+async def handle_join_ride(ctx: ConnectionContext, payload: RideRoomPayload):
+    # Ride rooms and their event history are for the passenger and driver only
+    if not is_ride_participant(ctx.db, payload.ride_id, ctx.user.id):
+        metrics.inc("ws.join_ride.refused")
+        await ctx.websocket.send_json(create_event(
+            event_type=EventType.ERROR,
+            data={"message": "Not a participant of this ride", "ride_id": payload.ride_id}
+        ))
+        return
+    
+    manager.join_ride_room(payload.ride_id, ctx.user.id)
+    await ctx.websocket.send_json(create_event(
+        event_type="joined_ride",
+        data={"ride_id": payload.ride_id}
+    ))
+    
+    # Replay ride events missed while disconnected
+    if payload.last_seq is not None:
+        events, truncated = redis_service.get_events_since(
+            ride_stream_key(payload.ride_id), payload.last_seq, settings.EVENT_REPLAY_MAX
+        )
+        await ctx.websocket.send_json(create_event(
+            event_type=EventType.EVENTS_REPLAY,
+            data={"ride_id": payload.ride_id, "events": events, "truncated": truncated}
+        ))
+
+
+@ws_router.route("leave_ride", RideRoomPayload)
+async def handle_leave_ride(ctx: ConnectionContext, payload: RideRoomPayload):
+    manager.leave_ride_room(payload.ride_id, ctx.user.id)
+    await ctx.websocket.send_json(create_event(
+        event_type="left_ride",
+        data={"ride_id": payload.ride_id}
+    ))
+
+
+async def _set_driver_online(ctx: ConnectionContext, online: bool):
+    """Mark driver online/offline in memory and in the DB"""
+    if online:
+        manager.mark_driver_online(ctx.user.id)
+    else:
+        manager.mark_driver_offline(ctx.user.id)
+    
+    driver = ctx.db.query(Driver).filter(Driver.user_id == ctx.user.id).first()
+    if driver:
+        driver.is_online = online
+        ctx.db.commit()
+    
+    await ctx.websocket.send_json(create_event(
+        event_type="driver_status",
+        data={"online": online}
+    ))
+
+
+@ws_router.route("driver_online")
+async def handle_driver_online(ctx: ConnectionContext, payload: dict):
+    if ctx.user.is_driver:
+        await _set_driver_online(ctx, True)
+
+
+@ws_router.route("driver_offline")
+async def handle_driver_offline(ctx: ConnectionContext, payload: dict):
+    if ctx.user.is_driver:
+        await _set_driver_online(ctx, False)
+
+
+@ws_router.route(EventType.DRIVER_LOCATION_UPDATE, LocationPayload)
+async def handle_driver_location_update(ctx: ConnectionContext, payload: LocationPayload):
+    if not ctx.user.is_driver:
+        debug_log("WS: Not a driver")
+        return
+    
+    # 1. Update Redis
+    manager.update_driver_location(ctx.user.id, payload.latitude, payload.longitude)
+    push_registry.update_location(ctx.user.id, ctx.user.device_token, payload.latitude, payload.longitude)
+    
+    # 2. Check if driver is in an active ride
+    current_ride_id = redis_service.get_driver_current_ride(ctx.user.id)
+    
+    if current_ride_id:
+        # 3. Broadcast to ride participants (Passenger)
+        await manager.broadcast_to_ride(
+            ride_id=current_ride_id,
+            message=create_event(
+                event_type=EventType.DRIVER_LOCATION_UPDATE,
+                data={
+                    "latitude": payload.latitude,
+                    "longitude": payload.longitude,
+                    "ride_id": current_ride_id
+                }
+            )
+        )
+
+
+@ws_router.route("subscribe_geohash", LocationPayload)
+async def handle_subscribe_geohash(ctx: ConnectionContext, payload: LocationPayload):
+    # Encode at the finest precision; coarser rooms are its prefixes
+    gh = geohash_utils.encode(payload.latitude, payload.longitude)
+    manager.update_geohash_subscription(ctx.user.id, gh)
+    push_registry.update_location(ctx.user.id, ctx.user.device_token, payload.latitude, payload.longitude)
+
+
+# --- CHAT HANDLERS ---
+
+@ws_router.route("join_chat", ChatRoomPayload)
+async def handle_join_chat(ctx: ConnectionContext, payload: ChatRoomPayload):
+    manager.join_chat_room(payload.room_id, ctx.user.id)
+
+
+@ws_router.route("leave_chat", ChatRoomPayload)
+async def handle_leave_chat(ctx: ConnectionContext, payload: ChatRoomPayload):
+    manager.leave_chat_room(payload.room_id, ctx.user.id)
+
+
+@ws_router.route("typing", TypingPayload)
+async def handle_typing(ctx: ConnectionContext, payload: TypingPayload):
+    await manager.broadcast_to_chat_room(
+        payload.room_id,
+        create_event(
+            event_type="typing", 
+            data={
+                "user_id": ctx.user.id,
+                "room_id": payload.room_id,
+                "is_typing": payload.is_typing,
+                "user_name": ctx.user.full_name
+            }
+        ),
+        exclude_user_id=ctx.user.id
+    )
+
+
 @router.websocket("/connect")
 async def websocket_endpoint(
     websocket: WebSocket,
     token: str = Query(..., description="JWT authentication token"),
+    last_seq: Optional[int] = Query(None, description="Last event sequence number received (resume)"),
     db: Session = Depends(get_db)
 ):
     """
@@ -67,6 +255,12 @@ async def websocket_endpoint(
     **Authentication:**
     - Pass JWT token as query parameter: `/ws/connect?token=YOUR_JWT_TOKEN`
     
+    **Resuming:**
+    - Ride and personal events carry a monotonic `seq`
+    - Reconnect with `/ws/connect?token=...&last_seq=N` to receive missed events
+      in a single `events_replay` message (`truncated: true` means some were
+      dropped and the client should refetch state once)
+    
     **Message Format:**
     ```json
     {
@@ -88,10 +282,14 @@ async def websocket_endpoint(
     
     **Client Messages:**
     - `{"type": "ping"}` - Keep connection alive
-    - `{"type": "join_ride", "ride_id": "..."}` - Join ride room
+    - `{"type": "join_ride", "ride_id": "...", "last_seq": N}` - Join ride room (optionally replay its events)
     - `{"type": "leave_ride", "ride_id": "..."}` - Leave ride room
+    
+    Inbound messages are rate limited per connection and message type
+    (`WS_RATE_LIMITS`); sustained flooding closes the socket with code 1008.
     """
     user = None
+    limiter = None
     
     try:
         # Authenticate user
@@ -106,156 +304,44 @@ async def websocket_endpoint(
             data={
                 "user_id": user.id,
                 "phone_number": user.phone_number,
-                "is_driver": user.is_driver
+                "is_driver": user.is_driver,
+                "last_seq": redis_service.get_current_event_seq()
             }
         ))
         
-        # Message handling loop
+        # Replay events missed while disconnected
+        if last_seq is not None:
+            events, truncated = redis_service.get_events_since(
+                user_stream_key(user.id), last_seq, settings.EVENT_REPLAY_MAX
+            )
+            await websocket.send_json(create_event(
+                event_type=EventType.EVENTS_REPLAY,
+                data={"events": events, "truncated": truncated}
+            ))
+        
+        # Message handling loop (handlers registered on ws_router above)
+        ctx = ConnectionContext(websocket=websocket, user=user, db=db)
+        limiter = ConnectionRateLimiter()
         while True:
             # Receive message from client
             data = await websocket.receive_text()
             message = json.loads(data)
+            message_type = message.get("type") if isinstance(message, dict) else None
+            if not isinstance(message_type, str):
+                message_type = None
             
-            message_type = message.get("type")
-            
-            # Handle ping/pong
-            if message_type == EventType.PING:
-                await websocket.send_json(create_event(
-                    event_type=EventType.PONG,
-                    data={"timestamp": message.get("timestamp")}
-                ))
-            
-            # Handle join ride room
-            elif message_type == "join_ride":
-                ride_id = message.get("ride_id") or (message.get("data") and message.get("data").get("ride_id"))
-                if ride_id:
-                    manager.join_ride_room(ride_id, user.id)
-                    await websocket.send_json(create_event(
-                        event_type="joined_ride",
-                        data={"ride_id": ride_id}
-                    ))
-            
-            # Handle leave ride room
-            elif message_type == "leave_ride":
-                ride_id = message.get("ride_id") or (message.get("data") and message.get("data").get("ride_id"))
-                if ride_id:
-                    manager.leave_ride_room(ride_id, user.id)
-                    await websocket.send_json(create_event(
-                        event_type="left_ride",
-                        data={"ride_id": ride_id}
-                    ))
+            verdict = limiter.check(message_type)
+            if verdict == RateLimitVerdict.ALLOW:
+                await ws_router.dispatch(ctx, message)
+            elif verdict == RateLimitVerdict.COALESCE:
+                limiter.defer(message_type, message, lambda m: ws_router.dispatch(ctx, m))
             
-            # Handle driver going online
-            elif message_type == "driver_online":
-                if user.is_driver:
-                    manager.mark_driver_online(user.id)
-                    
-                    # Update DB
-                    driver = db.query(Driver).filter(Driver.user_id == user.id).first()
-                    if driver:
-                        driver.is_online = True
-                        db.commit()
-                    
-                    await websocket.send_json(create_event(
-                        event_type="driver_status",
-                        data={"online": True}
-                    ))
-            
-            # Handle driver location update
-            elif message_type == "driver_location_update":
-                from app.core.debug import debug_log
-                data = message.get("data")
-                
-                debug_log(f"WS: Location Update. User: {user.id}, IsDriver: {user.is_driver}, Data: {data}")
-                
-                if data and user.is_driver:
-                    latitude = data.get("latitude")
-                    longitude = data.get("longitude")
-                    if latitude is not None and longitude is not None:
-                        # 1. Update Redis
-                        manager.update_driver_location(user.id, float(latitude), float(longitude))
-                        
-                        # 2. Check if driver is in an active ride
-                        from app.services.redis_service import redis_service
-                        current_ride_id = redis_service.get_driver_current_ride(user.id)
-                        
-                        if current_ride_id:
-                            # 3. Broadcast to ride participants (Passenger)
-                            await manager.broadcast_to_ride(
-                                ride_id=current_ride_id,
-                                message=create_event(
-                                    event_type=EventType.DRIVER_LOCATION_UPDATE,
-                                    data={
-                                        "latitude": float(latitude),
-                                        "longitude": float(longitude),
-                                        "ride_id": current_ride_id
-                                    }
-                                )
-                            )
-                            # debug_log(f"WS: Forwarded location to ride {current_ride_id}")
-                    else:
-                        debug_log("WS: Lat/Lng missing")
-                else:
-                    debug_log("WS: Not a driver or no data")
-
-            # Handle driver leaving offline (existing code)
-            elif message_type == "driver_offline":
-                if user.is_driver:
-                    manager.mark_driver_offline(user.id)
-                    
-                    # Update DB
-                    driver = db.query(Driver).filter(Driver.user_id == user.id).first()
-                    if driver:
-                        driver.is_online = False
-                        db.commit()
-
-                    await websocket.send_json(create_event(
-                        event_type="driver_status",
-                        data={"online": False}
-                    ))
-
-            # Handle Geohash Subscription for Incidents
-            elif message_type == "subscribe_geohash":
-                data = message.get("data")
-                if data and "latitude" in data and "longitude" in data:
-                    try:
-                        import pygeohash as pgh
-                        lat = float(data["latitude"])
-                        lon = float(data["longitude"])
-                        # Precision 6 is approx 1.2km x 0.6km. Good for local alerts.
-                        gh = pgh.encode(lat, lon, precision=6) 
-                        
-                        manager.update_geohash_subscription(user.id, gh)
-                    except Exception as e:
-                        logger.error(f"Geohash error: {e}")
-            
-            # --- CHAT HANDLERS ---
-            elif message_type == "join_chat":
-                room_id = message.get("room_id") or (message.get("data") and message.get("data").get("room_id"))
-                if room_id:
-                    manager.join_chat_room(room_id, user.id)
-            
-            elif message_type == "leave_chat":
-                room_id = message.get("room_id") or (message.get("data") and message.get("data").get("room_id"))
-                if room_id:
-                    manager.leave_chat_room(room_id, user.id)
-                    
-            elif message_type == "typing":
-                data = message.get("data") or {}
-                room_id = data.get("room_id")
-                is_typing = data.get("is_typing", False)
-                if room_id:
-                    await manager.broadcast_to_chat_room(
-                        room_id,
-                        create_event(
-                            event_type="typing", 
-                            data={"user_id": user.id, "room_id": room_id, "is_typing": is_typing, "user_name": user.full_name}
-                        ),
-                        exclude_user_id=user.id
-                    )
-
-            else:
-                logger.warning(f"Unknown message type: {message_type}")
+            if limiter.is_abusive:
+                metrics.inc("ws.ratelimit.closed")
+                logger.warning(f"🚫 Closing WebSocket for {user.id}: message rate limit exceeded")
+                manager.disconnect(user.id)
+                await websocket.close(code=1008, reason="Message rate limit exceeded")
+                break
     
     except WebSocketDisconnect:
         if user:
@@ -279,6 +365,10 @@ async def websocket_endpoint(
                 await websocket.close(code=1008)
             except:
                 pass
+    
+    finally:
+        if limiter:
+            limiter.close()
 
 
 @router.get("/stats")
@@ -294,6 +384,15 @@ async def get_websocket_stats():
     return manager.get_connection_stats()
 
 
+@router.get("/metrics")
+async def get_websocket_metrics():
+    """
+    Get per-message-type handler latency histograms and message counters
+    for this worker
+    """
+    return metrics.snapshot(prefix="ws.")
+
+
 @router.get("/debug/rooms")
 async def get_room_details():
     """Debug endpoint to see active rooms and their members"""
@@ -5,16 +5,18 @@ Firebase token verification, JWT generation, and auth dependencies
 
 from datetime import datetime, timedelta
 from typing import Optional
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import JWTError, jwt
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 import firebase_admin
 from firebase_admin import credentials, auth as firebase_auth
 import logging
 
 from app.core.config import settings
-from app.core.database import get_db
+from app.core.database import get_db, get_async_db
+from app.core.identity import Identity, load_identity, load_identity_async
 from app.models.user import User
 
 logger = logging.getLogger(__name__)
@@ -135,34 +137,25 @@ def decode_access_token(token: str) -> dict:
         )
 
 
-async def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> User:
+def user_id_from_request(request: Request) -> Optional[str]:
     """
-    Get current authenticated user from JWT token
-    
-    This is a FastAPI dependency that can be used to protect routes
-    
-    Usage:
-        @app.get("/protected")
-        def protected_route(current_user: User = Depends(get_current_user)):
-            return {"user_id": current_user.id}
-    
-    Args:
-        credentials: HTTP Bearer token from Authorization header
-        db: Database session
-    
-    Returns:
-        Current authenticated user
-    
-    Raises:
-        HTTPException: If token is invalid or user not found
+    Subject of the request's bearer token, without a DB lookup.
+    Returns None for missing or invalid tokens (routing hints only, not auth).
     """
-    token = credentials.credentials
-    
-    # Decode JWT token
-    payload = decode_access_token(token)
+    authorization = request.headers.get("Authorization", "")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        payload = jwt.decode(token, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
+    except JWTError:
+        return None
+    return payload.get("sub")
+
+
+def _user_id_from_credentials(credentials: HTTPAuthorizationCredentials) -> str:
+    """Decode the bearer token and return its subject (user ID)"""
+    payload = decode_access_token(credentials.credentials)
     
     user_id: str = payload.get("sub")
     if user_id is None:
@@ -171,10 +164,11 @@ async def get_current_user(
             detail="Could not validate credentials",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    
-    # Get user from database
-    user = db.query(User).filter(User.id == user_id).first()
-    
+    return user_id
+
+
+def _ensure_user_allowed(user: Optional[User]) -> User:
+    """Reject missing, inactive and banned users"""
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -196,6 +190,77 @@ async def get_current_user(
     return user
 
 
+async def get_identity(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db)
+) -> Identity:
+    """
+    Current user and their driver profile (None for passengers), attached
+    to the request's session. Served from the identity cache when possible,
+    and resolved once per request however many dependencies ask for it.
+    
+    Usage:
+        @app.get("/rides/{ride_id}")
+        def get_ride(identity: Identity = Depends(get_identity)):
+            driver_id = identity.driver.id if identity.driver else None
+    """
+    user_id = _user_id_from_credentials(credentials)
+    
+    identity = load_identity(db, user_id)
+    _ensure_user_allowed(identity.user if identity else None)
+    
+    return identity
+
+
+async def get_identity_async(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_async_db)
+) -> Identity:
+    """Async variant of get_identity for routes using get_async_db"""
+    user_id = _user_id_from_credentials(credentials)
+    
+    identity = await load_identity_async(db, user_id)
+    _ensure_user_allowed(identity.user if identity else None)
+    
+    return identity
+
+
+async def get_current_user(
+    identity: Identity = Depends(get_identity)
+) -> User:
+    """
+    Get current authenticated user from JWT token
+    
+    This is a FastAPI dependency that can be used to protect routes
+    
+    Usage:
+        @app.get("/protected")
+        def protected_route(current_user: User = Depends(get_current_user)):
+            return {"user_id": current_user.id}
+    
+    Args:
+        identity: Current identity from get_identity
+    
+    Returns:
+        Current authenticated user
+    
+    Raises:
+        HTTPException: If token is invalid or user not found
+    """
+    return identity.user
+
+
+async def get_current_user_async(
+    identity: Identity = Depends(get_identity_async)
+) -> User:
+    """
+    Async variant of get_current_user for routes using get_async_db.
+    The user is attached to the request's AsyncSession, so routes can
+    modify and commit it through the same session.
+    """
+    return identity.user
+
+
 async def get_current_active_user(
     current_user: User = Depends(get_current_user)
 ) -> User:
@@ -235,6 +300,19 @@ async def get_current_driver(
     return current_user
 
 
+async def get_current_driver_async(
+    current_user: User = Depends(get_current_user_async)
+) -> User:
+    """Async variant of get_current_driver (for routes using get_async_db)"""
+    if not current_user.is_driver:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="User is not registered as a driver"
+        )
+    
+    return current_user
+
+
 def hash_phone_number(phone_number: str) -> str:
     """
     Hash phone number for privacy
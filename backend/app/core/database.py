@@ -4,12 +4,17 @@ PostgreSQL + PostGIS connection and session management
 """
 
 from sqlalchemy import create_engine, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
-from typing import Generator
+from fastapi import Request
+from typing import AsyncGenerator, Generator, Optional
 import logging
+import time
 
 from app.core.config import settings
+from app.core.metrics import metrics
 
 logger = logging.getLogger(__name__)
 
@@ -25,6 +30,31 @@ engine = create_engine(
 # Create SessionLocal class
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+
+def get_async_database_url(url: str) -> str:
+    """
+    Convert a psycopg2 DATABASE_URL to its asyncpg equivalent.
+    asyncpg takes `ssl` instead of libpq's `sslmode`.
+    """
+    async_url = make_url(url).set(drivername="postgresql+asyncpg")
+    query = dict(async_url.query)
+    if "sslmode" in query:
+        query["ssl"] = query.pop("sslmode")
+    return async_url.set(query=query).render_as_string(hide_password=False)
+
+
+# Async engine (asyncpg) for routes that must not block the event loop
+async_engine = create_async_engine(
+    get_async_database_url(settings.DATABASE_URL),
+    pool_size=settings.DATABASE_POOL_SIZE,
+    max_overflow=settings.DATABASE_MAX_OVERFLOW,
+    pool_pre_ping=True,
+    echo=settings.DEBUG,
+)
+
+# Objects stay usable after commit: async sessions cannot lazy-load expired attributes
+AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False, autoflush=False)
+
 # Create Base class for models
 Base = declarative_base()
 
@@ -41,6 +71,154 @@ def get_db() -> Generator[Session, None, None]:
         db.close()
 
 
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Dependency function to get an async database session
+    Usage: db: AsyncSession = Depends(get_async_db)
+    
+    Relationships are not lazy-loaded on AsyncSession: load them up front
+    (selectinload) and run sync-only services via `await db.run_sync(...)`.
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+# ===== READ REPLICA =====
+
+# Seconds the replica is behind; 0 when fully caught up (or when pointed at a primary)
+REPLICA_LAG_SQL = text("""
+    SELECT COALESCE(
+        CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+             ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+        END, 0)
+""")
+
+replica_engine = None
+ReadSessionLocal = None
+async_replica_engine = None
+AsyncReadSessionLocal = None
+
+if settings.DATABASE_REPLICA_URL:
+    replica_engine = create_engine(
+        settings.DATABASE_REPLICA_URL,
+        pool_size=settings.DATABASE_POOL_SIZE,
+        max_overflow=settings.DATABASE_MAX_OVERFLOW,
+        pool_pre_ping=True,
+        echo=settings.DEBUG,
+    )
+    ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=replica_engine)
+    
+    async_replica_engine = create_async_engine(
+        get_async_database_url(settings.DATABASE_REPLICA_URL),
+        pool_size=settings.DATABASE_POOL_SIZE,
+        max_overflow=settings.DATABASE_MAX_OVERFLOW,
+        pool_pre_ping=True,
+        echo=settings.DEBUG,
+    )
+    AsyncReadSessionLocal = async_sessionmaker(async_replica_engine, expire_on_commit=False, autoflush=False)
+
+
+class ReplicaHealth:
+    """Replication lag of the read replica, re-checked at most every REPLICA_LAG_CHECK_INTERVAL"""
+    
+    def __init__(self):
+        self.lag_seconds: Optional[float] = None  # None = unreachable / unknown
+        self.checked_at = 0.0
+    
+    @property
+    def stale(self) -> bool:
+        return time.monotonic() - self.checked_at > settings.REPLICA_LAG_CHECK_INTERVAL
+    
+    @property
+    def usable(self) -> bool:
+        return self.lag_seconds is not None and self.lag_seconds <= settings.REPLICA_MAX_LAG_SECONDS
+    
+    def update(self, lag_seconds: Optional[float]):
+        if lag_seconds is not None and lag_seconds > settings.REPLICA_MAX_LAG_SECONDS:
+            logger.warning(f"⚠️ Read replica lagging {lag_seconds:.1f}s, reads fall back to primary")
+        self.lag_seconds = float(lag_seconds) if lag_seconds is not None else None
+        self.checked_at = time.monotonic()
+
+
+replica_health = ReplicaHealth()
+
+
+def _replica_usable() -> bool:
+    if replica_health.stale:
+        try:
+            with replica_engine.connect() as conn:
+                replica_health.update(conn.execute(REPLICA_LAG_SQL).scalar())
+        except Exception as e:
+            logger.error(f"Read replica health check failed: {e}")
+            replica_health.update(None)
+    return replica_health.usable
+
+
+async def _replica_usable_async() -> bool:
+    if replica_health.stale:
+        try:
+            async with async_replica_engine.connect() as conn:
+                replica_health.update((await conn.execute(REPLICA_LAG_SQL)).scalar())
+        except Exception as e:
+            logger.error(f"Read replica health check failed: {e}")
+            replica_health.update(None)
+    return replica_health.usable
+
+
+def _needs_primary(request: Request) -> bool:
+    """
+    Read-your-writes escape hatch: clients can demand the primary with
+    `X-Read-Consistency: primary`, and users who wrote within
+    READ_YOUR_WRITES_SECONDS are kept on the primary automatically.
+    """
+    if request.headers.get("X-Read-Consistency", "").lower() == "primary":
+        return True
+    
+    from app.core.auth import user_id_from_request
+    from app.services.redis_service import redis_service
+    user_id = user_id_from_request(request)
+    return bool(user_id) and redis_service.has_recent_write(user_id)
+
+
+def get_read_db(request: Request) -> Generator[Session, None, None]:
+    """
+    Dependency for read-only routes that tolerate replication lag
+    Usage: db: Session = Depends(get_read_db)
+    
+    Uses the read replica when one is configured, caught up within
+    REPLICA_MAX_LAG_SECONDS and the caller has not just written; otherwise
+    the primary. Never use it for reads that drive writes (e.g. accept_ride).
+    """
+    if ReadSessionLocal is None or _needs_primary(request):
+        metrics.inc("db.read.primary")
+        db = SessionLocal()
+    elif _replica_usable():
+        metrics.inc("db.read.replica")
+        db = ReadSessionLocal()
+    else:
+        metrics.inc("db.read.lag_fallback")
+        db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_read_db(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    """Async variant of get_read_db"""
+    if AsyncReadSessionLocal is None or _needs_primary(request):
+        metrics.inc("db.read.primary")
+        session_factory = AsyncSessionLocal
+    elif await _replica_usable_async():
+        metrics.inc("db.read.replica")
+        session_factory = AsyncReadSessionLocal
+    else:
+        metrics.inc("db.read.lag_fallback")
+        session_factory = AsyncSessionLocal
+    async with session_factory() as db:
+        yield db
+
+
 def init_db():
     """Initialize database (create tables)"""
     logger.info("Initializing database...")
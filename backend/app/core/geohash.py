@@ -0,0 +1,117 @@
+"""
+Ehreezoh - Geohash Utilities
+Multi-resolution geohash cells and cached neighbour lookups for geo rooms
+"""
+
+from functools import lru_cache
+from typing import List, Tuple
+
+import pygeohash as pgh
+
+from app.core.config import settings
+
+
+# Approximate cell size (width_m, height_m) at the equator for each precision.
+# Used to pick the resolution whose 3x3 block covers a given alert radius.
+CELL_SIZE_METERS = {
+    1: (5_009_400, 4_992_600),
+    2: (1_252_300, 624_100),
+    3: (156_500, 156_000),
+    4: (39_100, 19_500),
+    5: (4_900, 4_900),
+    6: (1_200, 609),
+    7: (153, 152),
+    8: (38, 19),
+    9: (4.8, 4.8),
+}
+
+
+def subscription_precisions() -> List[int]:
+    """Precisions that geo rooms are indexed at, coarsest first"""
+    return sorted(set(settings.GEO_ROOM_PRECISIONS))
+
+
+def encode(latitude: float, longitude: float, precision: int = None) -> str:
+    """Encode a coordinate at the given precision (default: finest geo room precision)"""
+    if precision is None:
+        precision = max(settings.GEO_ROOM_PRECISIONS)
+    return pgh.encode(latitude, longitude, precision=precision)
+
+
+def decode(geohash: str) -> Tuple[float, float]:
+    """Centre (latitude, longitude) of a cell"""
+    lat, lon, _, _ = pgh.decode_exactly(geohash)
+    return lat, lon
+
+
+def subscription_cells(geohash: str) -> List[str]:
+    """
+    Cells a subscriber at `geohash` belongs to, one per indexed precision.
+    A coarser cell is always a prefix of a finer one, so no re-encoding is needed.
+    """
+    return [geohash[:p] for p in subscription_precisions() if p <= len(geohash)]
+
+
+@lru_cache(maxsize=65536)
+def neighbors(geohash: str) -> Tuple[str, ...]:
+    """
+    Return the 8 neighbouring cells of a geohash (N, NE, E, SE, S, SW, W, NW).
+
+    Cached: the same few thousand cells are hit repeatedly by alerts in a city.
+    """
+    lat, lon, lat_err, lon_err = pgh.decode_exactly(geohash)
+    precision = len(geohash)
+    dlat, dlon = lat_err * 2, lon_err * 2
+
+    cells = []
+    for step_lat, step_lon in (
+        (1, 0), (1, 1), (0, 1), (-1, 1),
+        (-1, 0), (-1, -1), (0, -1), (1, -1),
+    ):
+        n_lat = lat + step_lat * dlat
+        if n_lat > 90 or n_lat < -90:
+            continue  # No neighbour beyond the poles
+        n_lon = lon + step_lon * dlon
+        # Wrap around the antimeridian
+        if n_lon > 180:
+            n_lon -= 360
+        elif n_lon < -180:
+            n_lon += 360
+        cells.append(pgh.encode(n_lat, n_lon, precision=precision))
+    return tuple(cells)
+
+
+@lru_cache(maxsize=65536)
+def area_cells(geohash: str, include_neighbors: bool = True) -> Tuple[str, ...]:
+    """Centre cell plus (optionally) its 8 neighbours"""
+    if not include_neighbors:
+        return (geohash,)
+    return (geohash,) + neighbors(geohash)
+
+
+def precision_for_radius(radius_meters: float) -> int:
+    """
+    Finest indexed precision whose 3x3 block still covers `radius_meters`
+    around the centre cell.
+    """
+    precisions = subscription_precisions()
+    for precision in reversed(precisions):
+        width, height = CELL_SIZE_METERS.get(precision, (0, 0))
+        if min(width, height) >= radius_meters:
+            return precision
+    return precisions[0]
+
+
+def alert_radius_for_type(incident_type: str) -> int:
+    """Alert radius in meters for an incident type"""
+    return settings.INCIDENT_ALERT_RADIUS.get(
+        (incident_type or "").lower(),
+        settings.INCIDENT_ALERT_RADIUS_DEFAULT
+    )
+
+
+def alert_geohash(latitude: float, longitude: float, incident_type: str) -> str:
+    """Centre cell to broadcast an incident of this type from"""
+    radius = alert_radius_for_type(incident_type)
+    return encode(latitude, longitude, precision_for_radius(radius))
+
@@ -0,0 +1,175 @@
+"""
+Ehreezoh - Identity Cache
+Short-TTL Redis snapshot of the authenticated user and their driver profile,
+so authenticating a request costs no queries on a hit
+"""
+
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+import logging
+
+from sqlalchemy import DateTime, Numeric, event, inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+from app.core.metrics import metrics
+from app.models.driver import Driver
+from app.models.user import User
+from app.services.redis_service import redis_service
+
+logger = logging.getLogger(__name__)
+
+# Columns left out of the snapshot. They stay expired on cached instances and
+# load on first access; changes to them don't invalidate the cache.
+EXCLUDED_COLUMNS = {
+    User: {"phone_hash"},
+    # Location columns change every few seconds while a driver is online
+    Driver: {"current_location", "current_latitude", "current_longitude", "last_location_update"},
+}
+
+
+class Identity(NamedTuple):
+    user: User
+    driver: Optional[Driver]  # None unless the user has a driver profile
+
+
+def _cached_columns(model):
+    excluded = EXCLUDED_COLUMNS[model]
+    return [prop for prop in inspect(model).column_attrs if prop.key not in excluded]
+
+
+def _dump(obj) -> Dict[str, Any]:
+    values = {}
+    for prop in _cached_columns(type(obj)):
+        value = getattr(obj, prop.key)
+        if isinstance(value, datetime):
+            value = value.isoformat()
+        elif isinstance(value, Decimal):
+            value = str(value)
+        values[prop.key] = value
+    return values
+
+
+def _restore(model, values: Dict[str, Any]):
+    """Detached instance with clean attribute state (no SQL when merged)"""
+    kwargs = {}
+    for prop in _cached_columns(model):
+        value = values.get(prop.key)
+        if value is not None:
+            column_type = prop.columns[0].type
+            if isinstance(column_type, DateTime):
+                value = datetime.fromisoformat(value)
+            elif isinstance(column_type, Numeric):
+                value = Decimal(value)
+        kwargs[prop.key] = value
+    obj = model(**kwargs)
+    make_transient_to_detached(obj)
+    return obj
+
+
+def snapshot(user: User, driver: Optional[Driver]) -> Dict[str, Any]:
+    return {"user": _dump(user), "driver": _dump(driver) if driver else None}
+
+
+def restore(data: Dict[str, Any]) -> Tuple[User, Optional[Driver]]:
+    user = _restore(User, data["user"])
+    driver = _restore(Driver, data["driver"]) if data.get("driver") else None
+    return user, driver
+
+
+def _identity_query(user_id: str):
+    return select(User, Driver).outerjoin(Driver, Driver.user_id == User.id).where(User.id == user_id)
+
+
+def load_identity(db: Session, user_id: str) -> Optional[Identity]:
+    """
+    User and driver profile for `user_id`, attached to `db` so routes can
+    modify and commit them. Cache hit: no SQL. Miss: one joined query.
+    """
+    data = redis_service.get_identity(user_id)
+    if data is not None:
+        metrics.inc("auth.identity_cache.hit")
+        user, driver = restore(data)
+        return Identity(
+            db.merge(user, load=False),
+            db.merge(driver, load=False) if driver else None
+        )
+
+    metrics.inc("auth.identity_cache.miss")
+    row = db.execute(_identity_query(user_id)).first()
+    if row is None:
+        return None
+    user, driver = row
+    redis_service.cache_identity(user_id, snapshot(user, driver))
+    return Identity(user, driver)
+
+
+async def load_identity_async(db: AsyncSession, user_id: str) -> Optional[Identity]:
+    """load_identity for AsyncSession routes"""
+    data = redis_service.get_identity(user_id)
+    if data is not None:
+        metrics.inc("auth.identity_cache.hit")
+        user, driver = restore(data)
+        return Identity(
+            await db.merge(user, load=False),
+            await db.merge(driver, load=False) if driver else None
+        )
+
+    metrics.inc("auth.identity_cache.miss")
+    row = (await db.execute(_identity_query(user_id))).first()
+    if row is None:
+        return None
+    user, driver = row
+    redis_service.cache_identity(user_id, snapshot(user, driver))
+    return Identity(user, driver)
+
+
+# ===== INVALIDATION =====
+# Any ORM write that changes a cached column of a user or driver (profile
+# edits, driver status, verification, bans, points) drops that user's
+# snapshot once the transaction commits. Bulk query.update() bypasses this;
+# call redis_service.invalidate_identity() next to those.
+
+def _pending(session: Session) -> set:
+    return session.info.setdefault("identity_invalidations", set())
+
+
+def _changed_cached_column(target) -> bool:
+    state = inspect(target)
+    return any(state.attrs[prop.key].history.has_changes() for prop in _cached_columns(type(target)))
+
+
+@event.listens_for(User, "after_update")
+def _user_updated(mapper, connection, target):
+    if _changed_cached_column(target):
+        _pending(inspect(target).session).add(target.id)
+
+
+@event.listens_for(Driver, "after_update")
+def _driver_updated(mapper, connection, target):
+    if _changed_cached_column(target):
+        _pending(inspect(target).session).add(target.user_id)
+
+
+@event.listens_for(Driver, "after_insert")
+@event.listens_for(Driver, "after_delete")
+def _driver_added_or_removed(mapper, connection, target):
+    _pending(inspect(target).session).add(target.user_id)
+
+
+@event.listens_for(User, "after_delete")
+def _user_deleted(mapper, connection, target):
+    _pending(inspect(target).session).add(target.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed(session):
+    user_ids = session.info.pop("identity_invalidations", None)
+    if user_ids:
+        redis_service.invalidate_identity(*user_ids)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_rolled_back(session, previous_transaction):
+    session.info.pop("identity_invalidations", None)
@@ -0,0 +1,113 @@
+"""
+Ehreezoh - In-Process Metrics
+Lightweight counters and latency histograms (per worker)
+"""
+
+from collections import defaultdict
+from typing import Dict, List, Optional
+import asyncio
+import bisect
+import threading
+import time
+
+
+# Latency bucket upper bounds in milliseconds
+DEFAULT_BUCKETS_MS = [0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000]
+
+
+class Histogram:
+    """Fixed-bucket latency histogram (milliseconds)"""
+
+    def __init__(self, buckets: Optional[List[float]] = None):
+        self.buckets = list(buckets or DEFAULT_BUCKETS_MS)
+        self.counts = [0] * (len(self.buckets) + 1)  # Last slot is +Inf
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value_ms: float):
+        """Record one observation"""
+        self.counts[bisect.bisect_left(self.buckets, value_ms)] += 1
+        self.count += 1
+        self.total += value_ms
+        if value_ms > self.max:
+            self.max = value_ms
+
+    def percentile(self, q: float) -> float:
+        """Approximate percentile (upper bound of the bucket holding it)"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= rank:
+                return min(self.buckets[i], self.max) if i < len(self.buckets) else self.max
+        return self.max
+
+    def snapshot(self) -> dict:
+        """Summary for API responses"""
+        return {
+            "count": self.count,
+            "total_ms": round(self.total, 3),
+            "avg_ms": round(self.total / self.count, 3) if self.count else 0.0,
+            "p50_ms": self.percentile(0.50),
+            "p95_ms": self.percentile(0.95),
+            "p99_ms": self.percentile(0.99),
+            "max_ms": round(self.max, 3),
+            "buckets": {
+                **{f"le_{b}": c for b, c in zip(self.buckets, self.counts)},
+                "le_inf": self.counts[-1]
+            }
+        }
+
+
+class MetricsRegistry:
+    """Named counters and histograms for this worker"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters: Dict[str, int] = defaultdict(int)
+        self.histograms: Dict[str, Histogram] = {}
+
+    def inc(self, name: str, amount: int = 1):
+        """Increment a counter"""
+        self.counters[name] += amount
+
+    def observe(self, name: str, value_ms: float):
+        """Record a latency observation"""
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = self.histograms.setdefault(name, Histogram())
+        histogram.observe(value_ms)
+
+    def snapshot(self, prefix: str = "") -> dict:
+        """Counters and histogram summaries, optionally filtered by name prefix"""
+        return {
+            "counters": {k: v for k, v in sorted(self.counters.items()) if k.startswith(prefix)},
+            "histograms": {
+                k: h.snapshot() for k, h in sorted(self.histograms.items()) if k.startswith(prefix)
+            }
+        }
+
+    def reset(self):
+        """Clear all metrics (tests)"""
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+
+# Global metrics registry
+metrics = MetricsRegistry()
+
+
+async def monitor_event_loop_lag(interval: float = 0.5, name: str = "ws.event_loop_lag"):
+    """
+    Record how late the event loop wakes a sleeping task (milliseconds).
+    Sustained lag means the worker is saturated; run as a background task.
+    """
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        metrics.observe(name, max(0.0, (time.perf_counter() - start - interval) * 1000))
@@ -0,0 +1,102 @@
+"""
+Ehreezoh - Keyset Pagination
+Opaque (timestamp, id) cursors so page N costs the same as page 1
+"""
+
+from datetime import datetime
+from typing import Any, List, Literal, NamedTuple, Optional, Tuple
+import base64
+import json
+
+from fastapi import HTTPException, status
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Query, Session
+
+# ?total= values accepted by endpoints that can report a total
+TotalMode = Literal["exact", "estimate"]
+
+
+class Page(NamedTuple):
+    items: List[Any]
+    next_cursor: Optional[str]  # None on the last page
+
+
+def encode_cursor(created_at: datetime, id: str) -> str:
+    """Opaque cursor pointing just past a row"""
+    raw = json.dumps([created_at.isoformat(), id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    """Inverse of encode_cursor; 400 on anything clients shouldn't have sent"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(created_at), str(id)
+    except (ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid pagination cursor"
+        )
+
+
+def keyset_paginate(
+    query: Query,
+    created_col,
+    id_col,
+    limit: int,
+    cursor: Optional[str] = None,
+    row_key=None,
+) -> Page:
+    """
+    Newest-first page of `query` ordered by (created_col, id_col).
+
+    One extra row is fetched to know whether another page exists; no
+    OFFSET and no COUNT. `row_key(row)` returns (created_at, id) for result
+    rows that aren't the entity itself (e.g. multi-entity queries).
+    """
+    if cursor:
+        created_at, id = decode_cursor(cursor)
+        query = query.filter(tuple_(created_col, id_col) < tuple_(created_at, id))
+
+    rows = query.order_by(created_col.desc(), id_col.desc()).limit(limit + 1).all()
+    if len(rows) <= limit:
+        return Page(rows, None)
+
+    rows = rows[:limit]
+    if row_key is None:
+        last = rows[-1]
+        key = (getattr(last, created_col.key), getattr(last, id_col.key))
+    else:
+        key = row_key(rows[-1])
+    return Page(rows, encode_cursor(*key))
+
+
+def estimate_count(db: Session, query: Query) -> int:
+    """
+    Planner row estimate for `query` (PostgreSQL EXPLAIN), falling back to
+    an exact COUNT on other databases
+    """
+    bind = db.get_bind()
+    if bind.dialect.name != "postgresql":
+        return exact_count(query)
+
+    compiled = query.statement.compile(dialect=bind.dialect)
+    plan = db.connection().exec_driver_sql(
+        f"EXPLAIN (FORMAT JSON) {compiled}", compiled.params
+    ).scalar()
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def exact_count(query: Query) -> int:
+    """COUNT(*) of `query` without its ORDER BY"""
+    return query.order_by(None).count()
+
+
+def count_total(db: Session, query: Query, mode: Optional[TotalMode]) -> Optional[int]:
+    """Total for ?total=exact|estimate, None when the client didn't ask"""
+    if mode == "exact":
+        return exact_count(query)
+    if mode == "estimate":
+        return estimate_count(db, query)
+    return None
@@ -0,0 +1,125 @@
+"""
+Ehreezoh - SQL Query Instrumentation
+Per-request statement counts, DB time and N+1 detection via SQLAlchemy engine events
+"""
+
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Iterator, List, Optional
+import logging
+import re
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+# Literals and bind placeholders collapse to "?" so one statement shape
+# (e.g. the per-row query of an N+1 loop) gets one fingerprint
+_PLACEHOLDER_RE = re.compile(r"%\(\w+\)s|\$\d+|:\w+|'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_IN_LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def fingerprint(statement: str) -> str:
+    """Normalize a SQL statement to its shape"""
+    shape = _PLACEHOLDER_RE.sub("?", statement)
+    shape = _IN_LIST_RE.sub("(?)", shape)
+    return _WHITESPACE_RE.sub(" ", shape).strip()
+
+
+class QueryStats:
+    """Statements executed while handling one request (or test block)"""
+
+    __slots__ = ("count", "total_ms", "fingerprints")
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.fingerprints: Counter = Counter()
+
+    def record(self, statement: str, elapsed_ms: float):
+        self.count += 1
+        self.total_ms += elapsed_ms
+        self.fingerprints[fingerprint(statement)] += 1
+
+    def most_repeated(self):
+        """(fingerprint, count) of the most repeated statement shape, or None"""
+        top = self.fingerprints.most_common(1)
+        return top[0] if top else None
+
+    def repeated(self, threshold: int):
+        """Statement shapes executed more than `threshold` times"""
+        return [(shape, n) for shape, n in self.fingerprints.most_common() if n > threshold]
+
+
+_current_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+# Callbacks receiving (label, QueryStats) when a tracked block ends (query budgets in tests)
+_listeners: List[Callable[[str, QueryStats], None]] = []
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current_stats.get() is not None:
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current_stats.get()
+    if stats is None:
+        return
+    starts = conn.info.get("query_start")
+    if starts:
+        stats.record(statement, (time.perf_counter() - starts.pop()) * 1000)
+
+
+@contextmanager
+def track_queries(label: str = "") -> Iterator[QueryStats]:
+    """
+    Record every statement executed in this context (including tasks and
+    greenlets it spawns) into a fresh QueryStats
+    """
+    stats = QueryStats()
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+        for listener in list(_listeners):
+            listener(label, stats)
+
+
+@contextmanager
+def assert_max_queries(budget: int):
+    """
+    Fail if any request (or track_queries block) finishing inside this block
+    ran more than `budget` statements. Fails too if nothing was tracked
+    (e.g. the app's tracking middleware is missing), so a budget can't pass
+    vacuously.
+
+    Usage:
+        with assert_max_queries(5):
+            client.get("/api/v1/incidents/feed", headers=headers)
+    """
+    seen = []
+    listener = lambda label, stats: seen.append((label, stats))
+    _listeners.append(listener)
+    try:
+        yield seen
+    finally:
+        _listeners.remove(listener)
+
+    if not seen:
+        raise AssertionError("No tracked requests or track_queries blocks finished inside assert_max_queries")
+    over = [(label, stats) for label, stats in seen if stats.count > budget]
+    if over:
+        details = "\n".join(
+            f"  {label or '<block>'}: {stats.count} statements; most repeated: "
+            f"{stats.most_repeated()[1]}x {stats.most_repeated()[0][:200]}"
+            for label, stats in over
+        )
+        raise AssertionError(f"Query budget of {budget} exceeded:\n{details}")
@@ -4,11 +4,12 @@ Real-time connection management and event broadcasting
 """
 
 from fastapi import WebSocket, WebSocketDisconnect
-from typing import Dict, Set, Optional
+from typing import Dict, Set, Optional, List
 import json
 import logging
 from datetime import datetime
 from app.services.redis_service import redis_service
+from app.core import geohash as geohash_utils
 
 logger = logging.getLogger(__name__)
 
@@ -37,9 +38,11 @@ class ConnectionManager:
         self.online_drivers: Set[str] = set()
         
         # Geofenced rooms: {geohash: Set[user_id]}
+        # Subscribers are indexed at every precision in GEO_ROOM_PRECISIONS;
+        # cells of different precisions never collide since their lengths differ.
         self.geo_rooms: Dict[str, Set[str]] = {}
         
-        # User current geohash: {user_id: geohash}
+        # User current geohash (finest precision): {user_id: geohash}
         self.user_geohash: Dict[str, str] = {}
     
     async def connect(self, websocket: WebSocket, user_id: str):
@@ -75,12 +78,8 @@ class ConnectionManager:
                     
         # Remove from geo rooms
         if user_id in self.user_geohash:
-            old_geohash = self.user_geohash[user_id]
-            if old_geohash in self.geo_rooms and user_id in self.geo_rooms[old_geohash]:
-                self.geo_rooms[old_geohash].remove(user_id)
-                if not self.geo_rooms[old_geohash]:
-                    del self.geo_rooms[old_geohash]
-            del self.user_geohash[user_id]
+            old_geohash = self.user_geohash.pop(user_id)
+            self._leave_geo_cells(user_id, geohash_utils.subscription_cells(old_geohash))
     
     async def send_personal_message(self, message: dict, user_id: str):
         """Send message to a specific user"""
@@ -148,26 +147,37 @@ class ConnectionManager:
                     continue
                 await self.send_personal_message(message, user_id)
 
+    def _leave_geo_cells(self, user_id: str, cells):
+        """Remove a user from the given geo room cells"""
+        for cell in cells:
+            members = self.geo_rooms.get(cell)
+            if members and user_id in members:
+                members.remove(user_id)
+                if not members:
+                    del self.geo_rooms[cell]
+
     def update_geohash_subscription(self, user_id: str, geohash: str):
         """
         Update a user's subscription to a geohash room.
-        Automatically removes them from the old room.
+        The user is indexed at every configured precision (prefixes of `geohash`).
+        Automatically removes them from cells they no longer belong to.
         """
-        # Remove from old room if exists
-        if user_id in self.user_geohash:
-            old_hash = self.user_geohash[user_id]
-            if old_hash == geohash:
-                return # No change
-                
-            if old_hash in self.geo_rooms and user_id in self.geo_rooms[old_hash]:
-                self.geo_rooms[old_hash].remove(user_id)
-                if not self.geo_rooms[old_hash]:
-                    del self.geo_rooms[old_hash]
+        old_hash = self.user_geohash.get(user_id)
+        if old_hash == geohash:
+            return # No change
+        
+        new_cells = geohash_utils.subscription_cells(geohash)
         
-        # Add to new room
-        if geohash not in self.geo_rooms:
-            self.geo_rooms[geohash] = set()
-        self.geo_rooms[geohash].add(user_id)
+        # Remove from old cells that are not shared with the new location
+        if old_hash:
+            stale = set(geohash_utils.subscription_cells(old_hash)) - set(new_cells)
+            self._leave_geo_cells(user_id, stale)
+        
+        # Add to new cells
+        for cell in new_cells:
+            if cell not in self.geo_rooms:
+                self.geo_rooms[cell] = set()
+            self.geo_rooms[cell].add(user_id)
         self.user_geohash[user_id] = geohash
         # logger.info(f"📍 User {user_id} subscribed to geohash {geohash}")
 
@@ -177,35 +187,27 @@ class ConnectionManager:
             for user_id in list(self.geo_rooms[geohash]):
                 await self.send_personal_message(message, user_id)
     
+    def get_area_subscribers(self, center_geohash: str, include_neighbors: bool = True) -> Set[str]:
+        """
+        Resolve the users subscribed to a cell and (optionally) its 8 neighbours.
+        The cell's precision selects the radius; neighbours come from a cached table.
+        """
+        rooms = [
+            self.geo_rooms[cell]
+            for cell in geohash_utils.area_cells(center_geohash, include_neighbors)
+            if cell in self.geo_rooms
+        ]
+        if not rooms:
+            return set()
+        return set().union(*rooms)
+    
     async def broadcast_to_area(self, center_geohash: str, message: dict, include_neighbors: bool = True):
         """
         Broadcast to a geohash and optionally its 8 neighbors.
-        Requires pygeohash installed.
+        Use app.core.geohash.alert_geohash() to pick the centre cell for a radius.
         """
-        try:
-            target_hashes = [center_geohash]
-            if include_neighbors:
-                 import pygeohash as pgh
-                 neighbors = pgh.neighbors(center_geohash)
-                 # neighbors returns {n, s, e, w, ne, nw, se, sw} dict values usually, but pygeohash might return list or dict?
-                 # pgh.neighbors(hash) returns dictionary like {'n': '...', 's': '...'} in some libs, or list?
-                 # Let's check typical usage. usually it returns a dict.
-                 if isinstance(neighbors, dict):
-                     target_hashes.extend(neighbors.values())
-                 elif isinstance(neighbors, list):
-                     target_hashes.extend(neighbors)
-
-            unique_users = set()
-            for gh in target_hashes:
-                if gh in self.geo_rooms:
-                    unique_users.update(self.geo_rooms[gh])
-            
-            for user_id in unique_users:
-                 await self.send_personal_message(message, user_id)
-                 
-        except ImportError:
-            logger.error("pygeohash not installed, broadcasting to single cell only")
-            await self.broadcast_to_geohash(center_geohash, message)
+        for user_id in self.get_area_subscribers(center_geohash, include_neighbors):
+            await self.send_personal_message(message, user_id)
     
     async def broadcast_to_ride(self, ride_id: str, message: dict):
         """Broadcast message to all users in a ride room"""
@@ -275,10 +277,16 @@ class EventType:
     # Passenger events
     PASSENGER_LOCATION_UPDATE = "passenger_location_update"
     
+    # Incident events
+    INCIDENT_ALERT = "incident_alert"
+    INCIDENT_VERIFIED = "incident_verified"
+    INCIDENTS_EXPIRED = "incidents_expired"
+    
     # System events
     ERROR = "error"
     PING = "ping"
     PONG = "pong"
+    EVENTS_REPLAY = "events_replay"
 
 
 def create_event(event_type: str, data: dict, metadata: Optional[dict] = None) -> dict:
@@ -305,7 +313,39 @@ def create_event(event_type: str, data: dict, metadata: Optional[dict] = None) -
     return event
 
 
-async def broadcast_ride_update(ride_id: str, event_type: str, ride_data: dict):
+def user_stream_key(user_id: str) -> str:
+    """Redis stream holding a user's resumable events"""
+    return f"events:user:{user_id}"
+
+
+def ride_stream_key(ride_id: str) -> str:
+    """Redis stream holding a ride's resumable events"""
+    return f"events:ride:{ride_id}"
+
+
+def record_event(event: dict, user_ids: Optional[List[str]] = None, ride_id: Optional[str] = None) -> dict:
+    """
+    Append an event to the per-user (and optionally per-ride) event logs
+    so clients that were disconnected can replay it with `last_seq`.
+    
+    Sets `event["seq"]` to the event's monotonic sequence number.
+    """
+    stream_keys = [user_stream_key(str(uid)) for uid in dict.fromkeys(user_ids or []) if uid]
+    if ride_id:
+        stream_keys.append(ride_stream_key(ride_id))
+    
+    seq = redis_service.append_event(stream_keys, event)
+    if seq is not None:
+        event["seq"] = seq
+    return event
+
+
+async def broadcast_ride_update(
+    ride_id: str,
+    event_type: str,
+    ride_data: dict,
+    participant_ids: Optional[List[str]] = None
+):
     """
     Broadcast ride update to all participants
     
@@ -313,12 +353,15 @@ async def broadcast_ride_update(ride_id: str, event_type: str, ride_data: dict):
         ride_id: Ride ID
         event_type: Type of update (use EventType constants)
         ride_data: Ride information
+        participant_ids: User IDs whose event logs should record the update,
+            so they can replay it after reconnecting
     """
     event = create_event(
         event_type=event_type,
         data=ride_data,
         metadata={"ride_id": ride_id}
     )
+    record_event(event, user_ids=participant_ids, ride_id=ride_id)
     
     await manager.broadcast_to_ride(ride_id, event)
 
@@ -333,6 +376,7 @@ async def notify_driver(driver_user_id: str, event_type: str, data: dict):
         data: Notification data
     """
     event = create_event(event_type=event_type, data=data)
+    record_event(event, user_ids=[driver_user_id])
     await manager.send_personal_message(event, driver_user_id)
 
 
@@ -346,4 +390,5 @@ async def notify_passenger(passenger_user_id: str, event_type: str, data: dict):
         data: Notification data
     """
     event = create_event(event_type=event_type, data=data)
+    record_event(event, user_ids=[passenger_user_id])
     await manager.send_personal_message(event, passenger_user_id)
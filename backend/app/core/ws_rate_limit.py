@@ -0,0 +1,162 @@
+"""
+Ehreezoh - WebSocket Rate Limiting
+Per-connection token buckets for inbound WebSocket messages
+"""
+
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+import asyncio
+import logging
+import time
+
+from app.core.config import settings
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+PERIOD_SECONDS = {"second": 1, "minute": 60, "hour": 3600}
+
+# Bucket key shared by message types without their own limit, so arbitrary
+# type strings cannot grow the per-connection bucket table
+DEFAULT_BUCKET = "*"
+
+
+class RateLimitVerdict:
+    """Outcome of checking one inbound message"""
+    ALLOW = "allow"
+    COALESCE = "coalesce"  # Over limit; latest frame is applied when a token frees up
+    DROP = "drop"
+
+
+@lru_cache(maxsize=64)
+def parse_rate(limit: str) -> Tuple[float, float]:
+    """
+    Parse a "count/period" limit (e.g. "5/second", "30/minute")
+
+    Returns:
+        (tokens per second, bucket capacity)
+    """
+    count, _, period = limit.partition("/")
+    seconds = PERIOD_SECONDS[period.strip().lower()]
+    capacity = float(count)
+    return capacity / seconds, capacity
+
+
+class TokenBucket:
+    """Classic token bucket; refills lazily on each check"""
+
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, rate: float, capacity: float, now: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = now
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def consume(self, now: float) -> bool:
+        """Take one token if available"""
+        self._refill(now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def wait_time(self, now: float) -> float:
+        """Seconds until one token is available"""
+        self._refill(now)
+        return max(0.0, (1 - self.tokens) / self.rate)
+
+
+class ConnectionRateLimiter:
+    """
+    Inbound message limits for one WebSocket connection.
+
+    Each message type gets its own bucket (configured in WS_RATE_LIMITS, the rest
+    share WS_RATE_LIMIT_DEFAULT). Over-limit frames of types in
+    WS_COALESCE_MESSAGE_TYPES are coalesced (only the latest is applied once a
+    token frees up); others are dropped. A connection exceeding
+    WS_RATE_LIMIT_MAX_VIOLATIONS over-limit frames within
+    WS_RATE_LIMIT_VIOLATION_WINDOW seconds is flagged as abusive.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self.clock = clock
+        self.buckets: Dict[str, TokenBucket] = {}
+        self.violations = 0
+        self.window_start = clock()
+        self._pending: Dict[str, Any] = {}
+        self._timers: Dict[str, asyncio.TimerHandle] = {}
+
+    def _bucket_key(self, message_type: Optional[str]) -> str:
+        if isinstance(message_type, str) and message_type in settings.WS_RATE_LIMITS:
+            return message_type
+        return DEFAULT_BUCKET
+
+    def _bucket(self, key: str, now: float) -> TokenBucket:
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            limit = settings.WS_RATE_LIMITS.get(key, settings.WS_RATE_LIMIT_DEFAULT)
+            bucket = self.buckets[key] = TokenBucket(*parse_rate(limit), now)
+        return bucket
+
+    def check(self, message_type: Optional[str]) -> str:
+        """Check (and consume) the limit for one inbound message"""
+        now = self.clock()
+        key = self._bucket_key(message_type)
+        if self._bucket(key, now).consume(now):
+            return RateLimitVerdict.ALLOW
+
+        # Over limit: count the violation in the current window
+        if now - self.window_start > settings.WS_RATE_LIMIT_VIOLATION_WINDOW:
+            self.window_start = now
+            self.violations = 0
+        self.violations += 1
+
+        if key in settings.WS_COALESCE_MESSAGE_TYPES:
+            metrics.inc(f"ws.ratelimit.coalesced.{key}")
+            return RateLimitVerdict.COALESCE
+        metrics.inc(f"ws.ratelimit.dropped.{'other' if key == DEFAULT_BUCKET else key}")
+        return RateLimitVerdict.DROP
+
+    @property
+    def is_abusive(self) -> bool:
+        return self.violations > settings.WS_RATE_LIMIT_MAX_VIOLATIONS
+
+    def defer(self, message_type: str, message: Any, dispatch: Callable[[Any], Awaitable[Any]]):
+        """
+        Keep only the latest over-limit message of this type and dispatch it
+        as soon as its bucket has a token again (one timer per type).
+        """
+        self._pending[message_type] = message
+        if message_type in self._timers:
+            return
+
+        now = self.clock()
+        delay = self._bucket(message_type, now).wait_time(now)
+        loop = asyncio.get_running_loop()
+        self._timers[message_type] = loop.call_later(
+            delay, lambda: asyncio.ensure_future(self._flush(message_type, dispatch))
+        )
+
+    async def _flush(self, message_type: str, dispatch: Callable[[Any], Awaitable[Any]]):
+        self._timers.pop(message_type, None)
+        message = self._pending.pop(message_type, None)
+        if message is None:
+            return
+        now = self.clock()
+        self._bucket(message_type, now).consume(now)
+        try:
+            await dispatch(message)
+        except Exception as e:
+            logger.error(f"Failed to dispatch coalesced {message_type}: {e}")
+
+    def close(self):
+        """Cancel pending coalesced dispatches (on disconnect)"""
+        for timer in self._timers.values():
+            timer.cancel()
+        self._timers.clear()
+        self._pending.clear()
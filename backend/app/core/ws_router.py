@@ -0,0 +1,104 @@
+"""
+Ehreezoh - WebSocket Message Router
+Table-driven dispatch of inbound WebSocket messages with per-type latency metrics
+"""
+
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, NamedTuple, Optional, Type
+from pydantic import BaseModel, ValidationError
+from sqlalchemy.orm import Session
+from fastapi import WebSocket
+import logging
+import time
+
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ConnectionContext:
+    """Per-connection state passed to every message handler"""
+    websocket: WebSocket
+    user: Any
+    db: Session
+    state: Dict[str, Any] = field(default_factory=dict)
+
+
+Handler = Callable[[ConnectionContext, Any], Awaitable[None]]
+
+
+class Route(NamedTuple):
+    handler: Handler
+    schema: Optional[Type[BaseModel]]
+
+
+class MessageRouter:
+    """
+    Maps message types to handler coroutines.
+
+    Payloads are validated with the route's pydantic model (compiled once at
+    class definition) and every handler call is timed into a per-type histogram
+    (`ws.handler.<type>`). Unknown types cost one dict miss and a counter bump.
+    """
+
+    def __init__(self):
+        self._routes: Dict[str, Route] = {}
+
+    def route(self, message_type: str, schema: Optional[Type[BaseModel]] = None):
+        """Decorator registering a handler for a message type"""
+        def decorator(handler: Handler) -> Handler:
+            self._routes[message_type] = Route(handler, schema)
+            return handler
+        return decorator
+
+    @property
+    def message_types(self):
+        return list(self._routes)
+
+    @staticmethod
+    def extract_payload(message: dict) -> dict:
+        """
+        Clients send fields either at the top level or under `data`
+        (e.g. `{"type": "join_ride", "ride_id": ...}`); merge both.
+        """
+        data = message.get("data")
+        payload = {k: v for k, v in message.items() if k not in ("type", "data")}
+        if isinstance(data, dict):
+            payload.update(data)
+        return payload
+
+    async def dispatch(self, ctx: ConnectionContext, message: Any) -> bool:
+        """
+        Route one inbound message to its handler
+
+        Returns:
+            True if a handler ran
+        """
+        message_type = message.get("type") if isinstance(message, dict) else None
+        if not isinstance(message_type, str):
+            message_type = None  # e.g. {"type": []}: unhashable, treated as unknown
+        route = self._routes.get(message_type)
+        if route is None:
+            metrics.inc("ws.messages.unknown")
+            logger.debug(f"Unknown message type: {message_type}")
+            return False
+
+        payload = self.extract_payload(message)
+        if route.schema is not None:
+            try:
+                payload = route.schema.model_validate(payload)
+            except ValidationError:
+                metrics.inc(f"ws.messages.invalid.{message_type}")
+                return False
+
+        start = time.perf_counter()
+        try:
+            await route.handler(ctx, payload)
+        finally:
+            metrics.observe(f"ws.handler.{message_type}", (time.perf_counter() - start) * 1000)
+        return True
+
+
+# Global router for /ws/connect
+ws_router = MessageRouter()
@@ -8,12 +8,17 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.responses import JSONResponse, Response
 from contextlib import asynccontextmanager
+import asyncio
 import logging
 import time
 
 from app.core.config import settings
 from app.core.database import engine, Base
-from app.api import auth, incidents, users, health, drivers, rides, websocket, admin, payments, routes, analytics, gamification, maps, community, social, chat, profiles, digest
+from app.core.metrics import metrics, monitor_event_loop_lag
+from app.core.query_stats import track_queries
+from app.core.auth import user_id_from_request
+from app.services.redis_service import redis_service
+from app.api import auth, incidents, users, health, drivers, rides, websocket, admin, payments, routes, analytics, gamification, maps, community, social, chat, profiles, digest, tiles
 
 
 
@@ -49,10 +54,47 @@ async def lifespan(app: FastAPI):
         logger.info("Creating database tables...")
         Base.metadata.create_all(bind=engine)
     
+    # Sample event loop lag for /ws/metrics (capacity tracking per worker)
+    lag_monitor = None
+    if settings.EVENT_LOOP_LAG_INTERVAL > 0:
+        lag_monitor = asyncio.create_task(monitor_event_loop_lag(settings.EVENT_LOOP_LAG_INTERVAL))
+    
+    # Active incidents in memory, kept current over Redis pub/sub
+    if settings.INCIDENT_INDEX_ENABLED:
+        from app.services.incident_index import incident_index
+        incident_index.start()
+    
+    # Move overdue incidents to 'expired'
+    expiry_sweeper = None
+    if settings.INCIDENT_EXPIRY_INTERVAL > 0:
+        from app.services.incident_expiry import incident_expiry_service
+        expiry_sweeper = asyncio.create_task(incident_expiry_service.run(settings.INCIDENT_EXPIRY_INTERVAL))
+    
+    # Queued push delivery (pooled client, receipt polling)
+    from app.services.push_dispatcher import push_dispatcher
+    await push_dispatcher.start()
+    
+    # Side effects committed by requests (report points, alerts, pushes)
+    outbox_worker = None
+    if settings.OUTBOX_POLL_INTERVAL > 0:
+        from app.services.outbox import outbox
+        outbox_worker = asyncio.create_task(outbox.run(settings.OUTBOX_POLL_INTERVAL))
+    
     yield
     
     # Shutdown
     logger.info("Shutting down Ehreezoh API...")
+    if lag_monitor:
+        lag_monitor.cancel()
+    if settings.INCIDENT_INDEX_ENABLED:
+        incident_index.stop()
+    if expiry_sweeper:
+        expiry_sweeper.cancel()
+    if outbox_worker:
+        outbox_worker.cancel()
+    await push_dispatcher.stop()
+    from app.services.route_analysis import route_analysis_service
+    await route_analysis_service.close()
 
 
 # Initialize FastAPI app
@@ -164,6 +206,51 @@ async def add_process_time_header(request: Request, call_next):
     return response
 
 
+# SQL instrumentation middleware
+@app.middleware("http")
+async def track_sql_queries(request: Request, call_next):
+    """
+    Count statements and DB time per request; warn on repeated statement
+    shapes (N+1). Exposed as X-DB-* headers in debug mode, metrics otherwise.
+    """
+    with track_queries(f"{request.method} {request.url.path}") as stats:
+        response = await call_next(request)
+    
+    route = request.scope.get("route")
+    route_name = f"{request.method} {route.path if route else 'unmatched'}"
+    
+    repeated = stats.repeated(settings.SQL_REPEAT_WARNING_THRESHOLD)
+    if repeated:
+        shape, count = repeated[0]
+        metrics.inc(f"db.n_plus_one.{route_name}")
+        logger.warning(f"🐢 Possible N+1 in {route_name}: {count}x {shape[:200]} "
+                       f"({stats.count} statements, {stats.total_ms:.1f}ms)")
+    
+    if settings.DEBUG:
+        top = stats.most_repeated()
+        response.headers["X-DB-Query-Count"] = str(stats.count)
+        response.headers["X-DB-Time-Ms"] = f"{stats.total_ms:.2f}"
+        response.headers["X-DB-Max-Repeat"] = str(top[1] if top else 0)
+    else:
+        metrics.inc(f"db.requests.{route_name}")
+        metrics.inc(f"db.statements.{route_name}", stats.count)
+        metrics.observe(f"db.time.{route_name}", stats.total_ms)
+    return response
+
+
+# Read-your-writes middleware
+@app.middleware("http")
+async def mark_recent_writes(request: Request, call_next):
+    """Keep a user's reads on the primary for a while after a successful write"""
+    response = await call_next(request)
+    if (settings.DATABASE_REPLICA_URL and request.method not in ("GET", "HEAD", "OPTIONS")
+            and response.status_code < 400):
+        user_id = user_id_from_request(request)
+        if user_id:
+            redis_service.mark_recent_write(user_id)
+    return response
+
+
 # Exception handlers
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
@@ -198,6 +285,7 @@ app.include_router(social.router, prefix="/api/v1", tags=["Social"])
 app.include_router(chat.router, prefix="/api/v1", tags=["Chat"])
 app.include_router(profiles.router, prefix="/api/v1", tags=["Profiles"])
 app.include_router(digest.router, prefix="/api/v1", tags=["Digest"])
+app.include_router(tiles.router, prefix="/api/v1")
 
 
 # Root endpoint
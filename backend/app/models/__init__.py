@@ -15,6 +15,8 @@ from app.models.gamification import Badge, UserBadge
 from app.models.community import City, Neighborhood, UserNeighborhood, IncidentVerification
 from app.models.social import IncidentThanks, IncidentComment, CommentUpvote, UserFollow
 from app.models.chat import ChatRoom, ChatMessage, ChatRoomMember
+from app.models.archive import PartitionArchive
+from app.models.outbox import OutboxEvent
 
 __all__ = [
     "User",
@@ -38,5 +40,7 @@ __all__ = [
     "UserFollow",
     "ChatRoom",
     "ChatMessage",
-    "ChatRoomMember"
+    "ChatRoomMember",
+    "PartitionArchive",
+    "OutboxEvent"
 ]
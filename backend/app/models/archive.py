@@ -0,0 +1,34 @@
+"""
+Partition archive model - Cold storage for detached monthly partitions
+"""
+
+from sqlalchemy import Column, String, Integer, DateTime, UniqueConstraint
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.sql import func
+
+from app.core.database import Base
+
+
+class PartitionArchive(Base):
+    """
+    Rows of an expired incidents / chat_messages / rides partition, stored
+    as JSONB chunks (compressed by TOAST) after the partition is dropped.
+    """
+    
+    __tablename__ = "partition_archive"
+    
+    id = Column(Integer, primary_key=True)
+    table_name = Column(String(63), nullable=False)
+    range_start = Column(DateTime, nullable=False)
+    range_end = Column(DateTime, nullable=False)
+    chunk = Column(Integer, nullable=False)
+    row_count = Column(Integer, nullable=False)
+    rows = Column(JSONB, nullable=False)
+    archived_at = Column(DateTime, server_default=func.now())
+    
+    __table_args__ = (
+        UniqueConstraint('table_name', 'range_start', 'chunk', name='uq_partition_archive_chunk'),
+    )
+    
+    def __repr__(self):
+        return f"<PartitionArchive {self.table_name} {self.range_start:%Y-%m} #{self.chunk}>"
@@ -2,7 +2,7 @@
 Chat models for Neighborhood Chat feature
 """
 
-from sqlalchemy import Column, String, ForeignKey, Integer, DateTime, Text, Boolean
+from sqlalchemy import Column, String, ForeignKey, Integer, DateTime, Text, Boolean, Index
 from sqlalchemy.sql import func
 import uuid
 
@@ -38,7 +38,12 @@ class ChatMessage(Base):
     reference_id = Column(String)  # For incident shares, etc.
     is_pinned = Column(Boolean, default=False)
     is_deleted = Column(Boolean, default=False)
-    created_at = Column(DateTime, server_default=func.now())
+    created_at = Column(DateTime, server_default=func.now(), nullable=False)  # Monthly partition key
+    
+    # Room history pages: newest messages of one room
+    __table_args__ = (
+        Index('ix_chat_messages_room_created_at', 'room_id', 'created_at'),
+    )
 
 
 class ChatRoomMember(Base):
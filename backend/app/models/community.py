@@ -2,7 +2,7 @@
 Community models - Cities, Neighborhoods, and Verifications
 """
 
-from sqlalchemy import Column, String, Integer, ForeignKey, DateTime, Boolean, Numeric, Text
+from sqlalchemy import Column, String, Integer, ForeignKey, DateTime, Boolean, Numeric, Text, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.dialects.postgresql import JSONB
 from datetime import datetime
@@ -87,6 +87,12 @@ class IncidentVerification(Base):
     
     created_at = Column(DateTime, default=datetime.utcnow)
     
+    # Per-incident tallies by verification type; one vote per user
+    __table_args__ = (
+        Index('ix_incident_verifications_incident_type', 'incident_id', 'verification_type'),
+        UniqueConstraint('incident_id', 'user_id', name='uq_incident_verifications_incident_user'),
+    )
+    
     # Relationships
     incident = relationship("Incident", backref="verifications")
     user = relationship("User", backref="verifications")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, Float, DateTime, ForeignKey, Text, Boolean, JSON
+from sqlalchemy import Column, String, Integer, Float, DateTime, ForeignKey, Text, Boolean, JSON, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from geoalchemy2 import Geography
@@ -20,6 +20,9 @@ class Incident(Base):
     
     # Vote/Confirmations count (for credibility)
     confirmations = Column(Integer, default=0)
+    # Verification tallies, kept by app/services/verification.py
+    confirmation_weight = Column(Float, default=0)  # Sum of 'still_there' vote weights
+    all_clear_count = Column(Integer, default=0)
     upvotes = Column(Integer, default=0)
     downvotes = Column(Integer, default=0)
     
@@ -31,10 +34,25 @@ class Incident(Base):
     reward_status = Column(String(20), default='not_eligible') # 'not_eligible', 'pending', 'paid'
     affected_routes = Column(JSON, nullable=True) # Store route_ids affected (JSONB in Postgres)
     expires_at = Column(DateTime, nullable=True)
+    report_points_awarded_at = Column(DateTime, nullable=True)  # Set with the reporter's points (outbox runs at least once)
     status = Column(String(20), default='active') # 'active', 'resolved', 'expired'
     
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)  # Monthly partition key
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)  # Delta sync (app/services/incident_changes.py)
+    
+    # Feed (active only, newest first) and bounding-box lookups.
+    # GIST on location is created by geoalchemy2 as idx_incidents_location.
+    # In PostgreSQL the table is range-partitioned by month on created_at
+    # (migration partition_001): filter on created_at so partitions prune.
+    # ForeignKeys to incidents.id on other models are ORM-only there.
+    __table_args__ = (
+        Index('ix_incidents_active_created_at', created_at.desc(), postgresql_where=(status == 'active')),
+        Index('ix_incidents_lat_lng', 'latitude', 'longitude'),
+        # Expiry sweep (app/services/incident_expiry.py)
+        Index('ix_incidents_active_expires_at', 'expires_at', postgresql_where=(status == 'active')),
+        # Delta sync: everything changed since a client's cursor
+        Index('ix_incidents_updated_at', 'updated_at'),
+    )
     
     # Relationships
     reporter = relationship("User", foreign_keys=[user_id], backref="reported_incidents")
@@ -0,0 +1,36 @@
+"""
+Outbox model - Side effects committed with the change that causes them
+"""
+
+from datetime import datetime
+
+from sqlalchemy import Column, BigInteger, String, Integer, DateTime, Text, Index, text
+from sqlalchemy.dialects.postgresql import JSONB
+
+from app.core.database import Base
+
+
+class OutboxEvent(Base):
+    """
+    Work written in the same transaction as a request's changes and carried
+    out afterwards by the outbox worker (app/services/outbox.py).
+    Times are naive UTC.
+    """
+
+    __tablename__ = "outbox_events"
+
+    id = Column(BigInteger, primary_key=True)
+    topic = Column(String(50), nullable=False)
+    payload = Column(JSONB, nullable=False)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    available_at = Column(DateTime, nullable=False, default=datetime.utcnow)  # Next attempt / lease expiry
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(Text)
+    processed_at = Column(DateTime)  # Done, or given up (last_error set)
+
+    __table_args__ = (
+        Index('ix_outbox_events_pending', 'available_at', postgresql_where=text('processed_at IS NULL')),
+    )
+
+    def __repr__(self):
+        return f"<OutboxEvent {self.id} {self.topic}>"
@@ -2,7 +2,7 @@
 Ride model - Core ride-hailing functionality
 """
 
-from sqlalchemy import Column, String, DateTime, Integer, Numeric, ForeignKey, Text
+from sqlalchemy import Column, String, DateTime, Integer, Numeric, ForeignKey, Text, Index
 from sqlalchemy.orm import relationship
 from geoalchemy2 import Geography
 from datetime import datetime
@@ -67,7 +67,7 @@ class Ride(Base):
     cancellation_fee = Column(Numeric(10, 2), default=0.00)
     
     # Timestamps
-    requested_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+    requested_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)  # Monthly partition key
     accepted_at = Column(DateTime)
     driver_arrived_at = Column(DateTime)
     started_at = Column(DateTime)
@@ -77,6 +77,14 @@ class Ride(Base):
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    # "My rides" history: filter by participant, newest first.
+    # In PostgreSQL the table is range-partitioned by month on requested_at
+    # (migration partition_001); ForeignKeys to rides.id are ORM-only there.
+    __table_args__ = (
+        Index('ix_rides_passenger_requested_at', 'passenger_id', requested_at.desc()),
+        Index('ix_rides_driver_requested_at', 'driver_id', requested_at.desc()),
+    )
+    
     # Relationships
     passenger = relationship("User", foreign_keys=[passenger_id], back_populates="rides_as_passenger")
     driver = relationship("Driver", foreign_keys=[driver_id], back_populates="rides")
@@ -56,6 +56,6 @@ class UserFollow(Base):
     __tablename__ = "user_follows"
     
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
-    follower_id = Column(String, ForeignKey("users.id"), nullable=False)  # Who is following
-    followed_id = Column(String, ForeignKey("users.id"), nullable=False)  # Who is being followed
+    follower_id = Column(String, ForeignKey("users.id"), nullable=False, index=True)  # Who is following
+    followed_id = Column(String, ForeignKey("users.id"), nullable=False, index=True)  # Who is being followed
     created_at = Column(DateTime, server_default=func.now())
@@ -2,7 +2,7 @@
 User model - Base user for both passengers and drivers
 """
 
-from sqlalchemy import Column, String, Boolean, DateTime, Integer, Numeric
+from sqlalchemy import Column, String, Boolean, DateTime, Integer, Numeric, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import uuid
@@ -56,6 +56,11 @@ class User(Base):
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     last_login_at = Column(DateTime)
     
+    # Leaderboards order by points
+    __table_args__ = (
+        Index('ix_users_points', points.desc()),
+    )
+    
     # Relationships
     driver_profile = relationship("Driver", back_populates="user", uselist=False)
     rides_as_passenger = relationship("Ride", foreign_keys="Ride.passenger_id", back_populates="passenger")
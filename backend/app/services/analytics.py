@@ -2,7 +2,8 @@ from sqlalchemy.orm import Session
 from sqlalchemy import func
 from app.models.incident import Incident
 from app.models.historical import HistoricalIncidentStats
-from datetime import datetime
+from datetime import datetime, timedelta
+from app.core.config import settings
 import pygeohash
 import logging
 
@@ -10,16 +11,17 @@ logger = logging.getLogger(__name__)
 
 class AnalyticsService:
     
-    def calculate_historical_stats(self, db: Session):
+    def calculate_historical_stats(self, db: Session, window_days: int = None):
         """
-        Aggregates all incidents to update historical stats.
+        Aggregates incidents of the last `window_days` (default
+        HISTORICAL_STATS_WINDOW_DAYS) to update historical stats.
         Grouping by: Geohash (precision 6), Day of Week, Hour of Day
         """
         logger.info("Starting historical stats aggregation...")
 
-        # 1. Fetch all confirmed incidents
-        # In a real system, we might limit this to "newly closed" incidents or run daily.
-        incidents = db.query(Incident).all() # Simplification for prototype
+        # 1. Fetch incidents in the window (the created_at bound prunes old partitions)
+        since = datetime.utcnow() - timedelta(days=window_days or settings.HISTORICAL_STATS_WINDOW_DAYS)
+        incidents = db.query(Incident).filter(Incident.created_at >= since).all()
         
         stats_map = {} # Key: (geohash, dow, hour) -> {count, total_severity}
 
@@ -0,0 +1,111 @@
+"""
+Ehreezoh - Incident Delta Sync
+Incidents created, verified, resolved or expired since a client's cursor,
+read from the updated_at index on incidents, with a full snapshot when the
+cursor is missing or too old
+"""
+
+from datetime import datetime, timedelta, timezone
+from typing import List, NamedTuple, Optional
+
+from geoalchemy2.elements import WKTElement
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.models.incident import Incident
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+class ChangeSet(NamedTuple):
+    incidents: List[Incident]
+    cursor: str  # Pass back as `since` on the next poll
+    full: bool  # True: a snapshot of active incidents, replacing what the client holds
+
+
+def encode_cursor(watermark: datetime) -> str:
+    """Opaque cursor: microseconds since the epoch"""
+    return str((watermark - EPOCH) // timedelta(microseconds=1))
+
+
+def decode_cursor(cursor: str) -> datetime:
+    """Inverse of encode_cursor; ValueError on anything else"""
+    return EPOCH + timedelta(microseconds=int(cursor))
+
+
+class IncidentChangesService:
+    """
+    updated_at is stamped by the database (now(), the writing transaction's
+    start time) on insert and on every UPDATE: reports, merged reports,
+    votes, resolution and the expiry sweep. A transaction can commit after a
+    reader has passed its timestamp, so a poll only returns rows stamped
+    before `now - INCIDENT_CHANGES_LAG_SECONDS` (the watermark, which becomes
+    the next cursor). Each change is then returned exactly once, at most
+    that many seconds late; realtime updates go over the websocket anyway.
+    """
+
+    def watermark(self, now: Optional[datetime] = None) -> datetime:
+        now = now or datetime.now(timezone.utc)
+        return now - timedelta(seconds=settings.INCIDENT_CHANGES_LAG_SECONDS)
+
+    def is_stale(self, since: datetime, now: Optional[datetime] = None) -> bool:
+        """Cursors this old get a snapshot instead of a delta"""
+        now = now or datetime.now(timezone.utc)
+        return since < now - timedelta(seconds=settings.INCIDENT_CHANGES_MAX_AGE_SECONDS)
+
+    def delta_query(self, latitude: float, longitude: float, radius_km: float,
+                    since: datetime, until: datetime, limit: int):
+        """Incidents in the area stamped in [since, until), any status, oldest change first"""
+        from app.services.partitioning import active_incidents_since
+
+        point = WKTElement(f'POINT({longitude} {latitude})', srid=4326)
+        return select(Incident).where(
+            Incident.updated_at >= since,
+            Incident.updated_at < until,
+            # Only incidents still within the active window change (partition pruning)
+            Incident.created_at >= active_incidents_since(),
+            func.ST_DWithin(Incident.location, point, radius_km * 1000)
+        ).order_by(Incident.updated_at).limit(limit)
+
+    async def snapshot(self, db: AsyncSession, latitude: float, longitude: float,
+                       radius_km: float, limit: int) -> List[Incident]:
+        from app.services.incident_index import active_near
+
+        conditions, _ = active_near(latitude, longitude, radius_km)
+        result = await db.execute(
+            select(Incident).where(*conditions).order_by(Incident.created_at.desc()).limit(limit)
+        )
+        return result.scalars().all()
+
+    async def changes(
+        self,
+        db: AsyncSession,
+        latitude: float,
+        longitude: float,
+        radius_km: float,
+        since: Optional[datetime],
+        limit: int,
+    ) -> ChangeSet:
+        """
+        Changes in the area since `since`. A snapshot is returned instead when
+        there is no cursor, it is older than INCIDENT_CHANGES_MAX_AGE_SECONDS,
+        or more than `limit` incidents changed (the snapshot is smaller then).
+        """
+        until = self.watermark()
+        cursor = encode_cursor(until)
+
+        if since is not None and not self.is_stale(since):
+            result = await db.execute(self.delta_query(latitude, longitude, radius_km, since, until, limit + 1))
+            incidents = result.scalars().all()
+            if len(incidents) <= limit:
+                metrics.inc("incidents.changes.delta" if incidents else "incidents.changes.none")
+                return ChangeSet(incidents, cursor, full=False)
+
+        # Changes stamped from `until` on come again in the next delta (harmless repeats)
+        metrics.inc("incidents.changes.snapshot")
+        return ChangeSet(await self.snapshot(db, latitude, longitude, radius_km, limit), cursor, full=True)
+
+
+incident_changes_service = IncidentChangesService()
@@ -0,0 +1,115 @@
+"""
+Ehreezoh - Incident Expiry
+Per-type lifetimes stamped at report time, and the sweep that moves overdue
+incidents to 'expired' and tells the map rooms they are gone
+"""
+
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+import asyncio
+import logging
+
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.models.incident import Incident
+
+logger = logging.getLogger(__name__)
+
+# Incident type -> Settings attribute holding its lifetime in seconds
+# (other types use INCIDENT_EXPIRY_DEFAULT)
+EXPIRY_SETTINGS = {
+    "traffic": "INCIDENT_EXPIRY_TRAFFIC_JAM",
+    "traffic_jam": "INCIDENT_EXPIRY_TRAFFIC_JAM",
+    "accident": "INCIDENT_EXPIRY_ACCIDENT",
+    "hazard": "INCIDENT_EXPIRY_ROAD_HAZARD",
+    "road_hazard": "INCIDENT_EXPIRY_ROAD_HAZARD",
+    "flood": "INCIDENT_EXPIRY_ROAD_HAZARD",
+    "construction": "INCIDENT_EXPIRY_ROAD_HAZARD",
+}
+
+
+def expiry_seconds(incident_type: str) -> int:
+    """Lifetime of an incident of this type"""
+    name = EXPIRY_SETTINGS.get((incident_type or "").lower(), "INCIDENT_EXPIRY_DEFAULT")
+    return getattr(settings, name)
+
+
+def expires_at_for(incident_type: str, reported_at: Optional[datetime] = None) -> datetime:
+    """expires_at for an incident reported now (UTC, like the column)"""
+    return (reported_at or datetime.utcnow()) + timedelta(seconds=expiry_seconds(incident_type))
+
+
+class IncidentExpiryService:
+
+    async def expire_due(self, db: AsyncSession, now: Optional[datetime] = None) -> List[dict]:
+        """
+        Move every active incident past its expires_at to 'expired' in one
+        UPDATE. Returns the transitioned incidents (id, type, position).
+        """
+        result = await db.execute(
+            update(Incident)
+            .where(Incident.status == 'active', Incident.expires_at <= (now or datetime.utcnow()))
+            .values(status='expired')
+            .returning(Incident.id, Incident.type, Incident.latitude, Incident.longitude)
+            .execution_options(synchronize_session=False)
+        )
+        expired = [row._asdict() for row in result]
+        await db.commit()
+        return expired
+
+    def group_by_area(self, expired: List[dict]) -> Dict[str, List[str]]:
+        """
+        Expired incident ids per alert cell: the rooms that were told about
+        each incident when it was reported
+        """
+        from app.core import geohash as geohash_utils
+
+        areas = defaultdict(list)
+        for incident in expired:
+            cell = geohash_utils.alert_geohash(incident["latitude"], incident["longitude"], incident["type"])
+            areas[cell].append(incident["id"])
+        return areas
+
+    async def announce(self, expired: List[dict]):
+        """One incidents_expired message per area, and drop them from every incident index"""
+        from app.core.websocket import EventType, create_event, manager
+        from app.services.incident_index import incident_index
+
+        incident_index.publish_removed([incident["id"] for incident in expired])
+        for cell, incident_ids in self.group_by_area(expired).items():
+            await manager.broadcast_to_area(
+                center_geohash=cell,
+                message=create_event(
+                    event_type=EventType.INCIDENTS_EXPIRED,
+                    data={"incident_ids": incident_ids}
+                ),
+                include_neighbors=True
+            )
+
+    async def sweep(self) -> int:
+        """Expire overdue incidents and announce them"""
+        from app.core.database import AsyncSessionLocal
+
+        async with AsyncSessionLocal() as db:
+            expired = await self.expire_due(db)
+        if expired:
+            metrics.inc("incidents.expired", len(expired))
+            await self.announce(expired)
+            logger.info(f"⌛ Expired {len(expired)} incidents")
+        return len(expired)
+
+    async def run(self, interval: float):
+        """Background task: sweep every `interval` seconds"""
+        while True:
+            try:
+                await self.sweep()
+            except Exception as e:
+                logger.error(f"Incident expiry sweep failed: {e}")
+            await asyncio.sleep(interval)
+
+
+incident_expiry_service = IncidentExpiryService()
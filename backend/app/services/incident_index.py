@@ -0,0 +1,461 @@
+"""
+Ehreezoh - In-Process Incident Index
+Active incidents held in memory per worker, bucketed on a lat/lng grid, so
+map polls and the feed don't query the database. Loaded at startup and kept
+current by changes published on Redis pub/sub, with a periodic full reload
+to heal missed messages.
+"""
+
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+import json
+import logging
+import math
+import sys
+import threading
+import time
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.core.pagination import Page, decode_cursor, encode_cursor
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "incidents:index"
+
+KM_PER_DEGREE = 111.0
+
+
+def _timestamp(value: Optional[datetime]) -> Optional[float]:
+    """Epoch seconds; naive datetimes are UTC (as stored by the app)"""
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def _parse(value: Optional[str]) -> Optional[datetime]:
+    return datetime.fromisoformat(value) if value else None
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    dlat = math.radians(lat2 - lat1)
+    dlon = math.radians(lon2 - lon1)
+    a = math.sin(dlat / 2) ** 2 + \
+        math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(dlon / 2) ** 2
+    return 6371 * 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+
+
+def active_near(latitude: float, longitude: float, radius_km: float):
+    """
+    Database form of IncidentIndex.nearby(): conditions for active, unexpired
+    incidents within `radius_km`, using the GIST index on `location`.
+    Returns (conditions, distance in meters).
+    """
+    from sqlalchemy import func, or_
+    from geoalchemy2.elements import WKTElement
+    from app.models.incident import Incident
+    from app.services.partitioning import active_incidents_since
+
+    point = WKTElement(f'POINT({longitude} {latitude})', srid=4326)
+    distance = func.ST_Distance(Incident.location, point)
+    conditions = [
+        Incident.status == 'active',
+        or_(Incident.expires_at.is_(None), Incident.expires_at > datetime.utcnow()),
+        Incident.created_at >= active_incidents_since(),
+        func.ST_DWithin(Incident.location, point, radius_km * 1000)  # km -> meters
+    ]
+    return conditions, distance
+
+
+class IndexedIncident(NamedTuple):
+    """Columns of an active incident needed by map and feed responses"""
+    id: str
+    user_id: Optional[str]
+    type: str
+    description: Optional[str]
+    latitude: float
+    longitude: float
+    media_url: Optional[str]
+    status: str
+    is_verified: bool
+    confirmations: int
+    created_at: datetime
+    expires_at: Optional[datetime]
+    all_clear_count: int = 0  # Last, with a default: messages from older workers lack it
+
+    @classmethod
+    def from_model(cls, incident) -> "IndexedIncident":
+        return cls(
+            id=incident.id,
+            user_id=incident.user_id,
+            type=incident.type,
+            description=incident.description,
+            latitude=incident.latitude,
+            longitude=incident.longitude,
+            media_url=incident.media_url,
+            status=incident.status or 'active',
+            is_verified=bool(incident.is_verified),
+            confirmations=incident.confirmations or 0,
+            created_at=incident.created_at,
+            expires_at=incident.expires_at,
+            all_clear_count=incident.all_clear_count or 0,
+        )
+
+    def to_message(self) -> dict:
+        data = self._asdict()
+        data["created_at"] = self.created_at.isoformat()
+        data["expires_at"] = self.expires_at.isoformat() if self.expires_at else None
+        return data
+
+    @classmethod
+    def from_message(cls, data: dict) -> "IndexedIncident":
+        return cls(**{
+            **data,
+            "created_at": _parse(data["created_at"]),
+            "expires_at": _parse(data.get("expires_at")),
+        })
+
+    @property
+    def sort_key(self) -> Tuple[float, str]:
+        return _timestamp(self.created_at), self.id
+
+    def is_live(self, now: float, since: float) -> bool:
+        expires = _timestamp(self.expires_at)
+        return (
+            self.status == 'active'
+            and (expires is None or expires > now)
+            and self.sort_key[0] >= since
+        )
+
+
+class IncidentIndex:
+    """
+    Grid of active incidents for this worker.
+
+    Cells are INCIDENT_INDEX_CELL_DEG degrees on a side; a radius query only
+    scans the cells its bounding box touches. Until the first load completes
+    (or while Redis is unreachable) `ready` is False and callers query the DB.
+    """
+
+    def __init__(self, cell_deg: float = None):
+        self.cell_deg = cell_deg or settings.INCIDENT_INDEX_CELL_DEG
+        self._lock = threading.Lock()
+        self._cells: Dict[Tuple[int, int], Dict[str, IndexedIncident]] = {}
+        self._by_id: Dict[str, IndexedIncident] = {}
+        self._loaded = False
+        self._subscribed = False
+        self._last_load = 0.0
+        self._last_change = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._listeners: List[Callable] = []
+
+    @property
+    def ready(self) -> bool:
+        return self._loaded and self._subscribed
+
+    def _cell(self, latitude: float, longitude: float) -> Tuple[int, int]:
+        return math.floor(latitude / self.cell_deg), math.floor(longitude / self.cell_deg)
+
+    # ===== UPDATES =====
+
+    def add_listener(self, callback: Callable[[Optional[List[Tuple[float, float]]]], None]):
+        """
+        Call `callback(points)` after every change with the (lat, lng) of the
+        incidents that changed, or None after a full reload. Runs on the
+        listener thread for other workers' changes.
+        """
+        self._listeners.append(callback)
+
+    def _changed(self, points: Optional[List[Tuple[float, float]]]):
+        for callback in self._listeners:
+            callback(points)
+
+    def _remove_locked(self, incident_id: str) -> Optional[IndexedIncident]:
+        old = self._by_id.pop(incident_id, None)
+        if old is not None:
+            cell = self._cells.get(self._cell(old.latitude, old.longitude))
+            if cell is not None:
+                cell.pop(incident_id, None)
+                if not cell:
+                    del self._cells[self._cell(old.latitude, old.longitude)]
+        return old
+
+    def _add_locked(self, entry: IndexedIncident):
+        self._by_id[entry.id] = entry
+        self._cells.setdefault(self._cell(entry.latitude, entry.longitude), {})[entry.id] = entry
+
+    def upsert(self, entry: IndexedIncident):
+        """Add or replace an incident; non-active ones are removed"""
+        with self._lock:
+            old = self._remove_locked(entry.id)
+            if entry.status == 'active':
+                self._add_locked(entry)
+        points = [(entry.latitude, entry.longitude)]
+        if old is not None and (old.latitude, old.longitude) != points[0]:
+            points.append((old.latitude, old.longitude))
+        self._changed(points)
+
+    def remove(self, incident_ids: Iterable[str]):
+        with self._lock:
+            removed = [self._remove_locked(incident_id) for incident_id in incident_ids]
+        self._changed([(old.latitude, old.longitude) for old in removed if old is not None])
+
+    def replace(self, entries: Iterable[IndexedIncident]):
+        """Swap in a complete set of active incidents"""
+        by_id, cells = {}, {}
+        for entry in entries:
+            by_id[entry.id] = entry
+            cells.setdefault(self._cell(entry.latitude, entry.longitude), {})[entry.id] = entry
+        with self._lock:
+            self._by_id, self._cells = by_id, cells
+            self._loaded = True
+            self._last_load = time.time()
+        self._changed(None)
+
+    def load(self, db) -> int:
+        """Full load of active, unexpired incidents from the recent partitions"""
+        from sqlalchemy import or_
+        from app.models.incident import Incident
+        from app.services.partitioning import active_incidents_since
+
+        started = time.perf_counter()
+        incidents = db.query(Incident).filter(
+            Incident.status == 'active',
+            or_(Incident.expires_at.is_(None), Incident.expires_at > datetime.utcnow()),
+            Incident.created_at >= active_incidents_since()
+        ).all()
+        self.replace(IndexedIncident.from_model(inc) for inc in incidents)
+        metrics.observe("incident_index.load", (time.perf_counter() - started) * 1000)
+        logger.info(f"🗺️ Incident index loaded ({len(incidents)} active incidents)")
+        return len(incidents)
+
+    def apply(self, message: dict):
+        """Apply one published change"""
+        if message.get("op") == "upsert":
+            self.upsert(IndexedIncident.from_message(message["incident"]))
+        elif message.get("op") == "remove":
+            self.remove(message.get("ids", []))
+        published_at = message.get("published_at")
+        if published_at:
+            metrics.observe("incident_index.refresh_lag", max(0.0, (time.time() - published_at) * 1000))
+        self._last_change = time.time()
+
+    # ===== QUERIES =====
+
+    def _candidates(self, latitude: float, longitude: float, dlat: float, dlng: float) -> List[IndexedIncident]:
+        lat_lo, lng_lo = self._cell(latitude - dlat, longitude - dlng)
+        lat_hi, lng_hi = self._cell(latitude + dlat, longitude + dlng)
+        with self._lock:
+            if (lat_hi - lat_lo + 1) * (lng_hi - lng_lo + 1) > len(self._cells):
+                return list(self._by_id.values())
+            found = []
+            for i in range(lat_lo, lat_hi + 1):
+                for j in range(lng_lo, lng_hi + 1):
+                    cell = self._cells.get((i, j))
+                    if cell:
+                        found.extend(cell.values())
+            return found
+
+    def nearby(
+        self,
+        latitude: float,
+        longitude: float,
+        radius_km: float,
+        order_by: str = "distance",
+        limit: int = 100,
+    ) -> List[IndexedIncident]:
+        """Same result as GET /incidents/ against the database"""
+        from app.services.partitioning import active_incidents_since
+
+        now, since = time.time(), _timestamp(active_incidents_since())
+        dlat = radius_km / KM_PER_DEGREE
+        dlng = radius_km / (KM_PER_DEGREE * max(math.cos(math.radians(latitude)), 0.01))
+
+        hits = []
+        for entry in self._candidates(latitude, longitude, dlat, dlng):
+            if not entry.is_live(now, since):
+                continue
+            distance = haversine_km(latitude, longitude, entry.latitude, entry.longitude)
+            if distance <= radius_km:
+                hits.append((distance, entry))
+
+        if order_by == "distance":
+            hits.sort(key=lambda hit: hit[0])
+        else:
+            hits.sort(key=lambda hit: hit[1].sort_key, reverse=True)
+        return [entry for _, entry in hits[:limit]]
+
+    def nearest_recent(
+        self,
+        latitude: float,
+        longitude: float,
+        incident_type: str,
+        radius_km: float,
+        since: datetime,
+    ) -> Optional[IndexedIncident]:
+        """Closest live incident of a type reported since `since` (ingest dedup)"""
+        after = _timestamp(since)
+        incident_type = incident_type.lower()
+        for entry in self.nearby(latitude, longitude, radius_km, limit=len(self._by_id) or 1):
+            if entry.type.lower() == incident_type and entry.sort_key[0] >= after:
+                return entry
+        return None
+
+    def feed_page(
+        self,
+        limit: int,
+        cursor: Optional[str] = None,
+        latitude: Optional[float] = None,
+        longitude: Optional[float] = None,
+        deg_radius: float = 10 / KM_PER_DEGREE,
+    ) -> Tuple[Page, int]:
+        """Newest-first feed page (same cursors as the DB path) and the total"""
+        from app.services.partitioning import active_incidents_since
+
+        now, since = time.time(), _timestamp(active_incidents_since())
+        if latitude and longitude:
+            entries = [
+                entry for entry in self._candidates(latitude, longitude, deg_radius, deg_radius)
+                if abs(entry.latitude - latitude) <= deg_radius
+                and abs(entry.longitude - longitude) <= deg_radius
+            ]
+        else:
+            with self._lock:
+                entries = list(self._by_id.values())
+
+        entries = sorted(
+            (entry for entry in entries if entry.is_live(now, since)),
+            key=lambda entry: entry.sort_key,
+            reverse=True
+        )
+        total = len(entries)
+        if cursor:
+            created_at, cursor_id = decode_cursor(cursor)
+            after = (_timestamp(created_at), cursor_id)
+            entries = [entry for entry in entries if entry.sort_key < after]
+
+        if len(entries) <= limit:
+            return Page(entries, None), total
+        entries = entries[:limit]
+        return Page(entries, encode_cursor(entries[-1].created_at, entries[-1].id)), total
+
+    # ===== PUBLISHING =====
+
+    def publish(self, incident) -> bool:
+        """
+        Announce an incident's current state to every worker (call after
+        commit). Active incidents are upserted, anything else removed.
+        """
+        entry = IndexedIncident.from_model(incident)
+        self.upsert(entry)  # This worker sees its own write immediately
+        if entry.status == 'active':
+            message = {"op": "upsert", "incident": entry.to_message()}
+        else:
+            message = {"op": "remove", "ids": [entry.id]}
+        return self._publish(message)
+
+    def publish_removed(self, incident_ids: List[str]) -> bool:
+        """Announce incidents that left the active set (expiry, bulk updates)"""
+        if not incident_ids:
+            return True
+        self.remove(incident_ids)
+        return self._publish({"op": "remove", "ids": list(incident_ids)})
+
+    def _publish(self, message: dict) -> bool:
+        from app.services.redis_service import redis_service
+        message["published_at"] = time.time()
+        return redis_service.publish_incident_change(CHANNEL, message)
+
+    # ===== LISTENER =====
+
+    def start(self):
+        """Start the background listener (loads the index once subscribed)"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._listen, name="incident-index", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def _reload(self):
+        from app.core.database import SessionLocal
+        db = SessionLocal()
+        try:
+            self.load(db)
+        finally:
+            db.close()
+
+    def _listen(self):
+        from app.services.redis_service import redis_service
+
+        backoff = 1.0
+        while not self._stop.is_set():
+            pubsub = None
+            try:
+                pubsub = redis_service.redis_client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(CHANNEL)
+                # Subscribe first, then load, so no change falls in between
+                self._reload()
+                self._subscribed = True
+                backoff = 1.0
+                while not self._stop.is_set():
+                    message = pubsub.get_message(timeout=1.0)
+                    if message and message.get("type") == "message":
+                        self.apply(json.loads(message["data"]))
+                    if time.time() - self._last_load > settings.INCIDENT_INDEX_RELOAD_SECONDS:
+                        self._reload()
+            except Exception as e:
+                self._subscribed = False
+                logger.error(f"Incident index listener failed: {e}")
+                self._stop.wait(backoff)
+                backoff = min(backoff * 2, 60.0)
+            finally:
+                if pubsub is not None:
+                    try:
+                        pubsub.close()
+                    except Exception:
+                        pass
+        self._subscribed = False
+
+    # ===== STATS =====
+
+    def stats(self) -> dict:
+        """Size, approximate resident memory, freshness and hit ratio"""
+        with self._lock:
+            entries = list(self._by_id.values())
+            cell_count = len(self._cells)
+            memory = sys.getsizeof(self._by_id) + sys.getsizeof(self._cells) + sum(
+                sys.getsizeof(cell) for cell in self._cells.values()
+            )
+        memory += sum(
+            sys.getsizeof(entry) + sum(sys.getsizeof(value) for value in entry)
+            for entry in entries
+        )
+        hits = metrics.counters.get("incident_index.hit", 0)
+        misses = metrics.counters.get("incident_index.miss", 0)
+        now = time.time()
+        return {
+            "ready": self.ready,
+            "incidents": len(entries),
+            "cells": cell_count,
+            "approx_memory_bytes": memory,
+            "seconds_since_load": round(now - self._last_load, 1) if self._last_load else None,
+            "seconds_since_change": round(now - self._last_change, 1) if self._last_change else None,
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": round(hits / (hits + misses), 4) if hits + misses else None,
+            "refresh_lag": metrics.snapshot(prefix="incident_index.refresh_lag")["histograms"].get(
+                "incident_index.refresh_lag"
+            ),
+        }
+
+
+# Global incident index (one per worker)
+incident_index = IncidentIndex()
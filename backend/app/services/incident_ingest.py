@@ -0,0 +1,226 @@
+"""
+Ehreezoh - Incident Ingest
+Spatio-temporal deduplication of reports: a report of an active incident of
+the same type nearby and recently is merged into it as a confirmation
+instead of creating (and fanning out) a new incident. New reports' points,
+alerts and pushes run from the outbox (app/services/outbox.py).
+"""
+
+from datetime import datetime, timedelta
+from typing import List, Optional, Set
+import asyncio
+import logging
+
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core import geohash as geohash_utils
+from app.core.config import settings
+from app.models.incident import Incident
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+DEDUP_LOCK_PRECISION = 6  # ~1.2km x 0.6km cells, wider than INCIDENT_DEDUP_RADIUS_METERS
+
+
+def dedup_lock_keys(incident_type: str, latitude: float, longitude: float) -> List[str]:
+    """
+    Advisory lock keys for reports of `incident_type` at this point: its
+    cell and the 8 around it, sorted so concurrent reports take them in
+    the same order. Two reports within the dedup radius are in the same or
+    adjacent cells, so they share at least one key.
+    """
+    cell = geohash_utils.encode(latitude, longitude, DEDUP_LOCK_PRECISION)
+    return sorted(f"incident_dedup:{incident_type.lower()}:{area_cell}" for area_cell in geohash_utils.area_cells(cell))
+
+
+class IncidentIngestService:
+
+    def __init__(self):
+        self._broadcasts: Set[asyncio.Task] = set()  # Keep pending tasks referenced
+
+    async def lock_area(self, db: AsyncSession, incident_type: str, latitude: float, longitude: float):
+        """
+        Serialize reports of the same type nearby until this transaction
+        ends, so the duplicate check and the insert of a new incident can't
+        interleave with another report's
+        """
+        for key in dedup_lock_keys(incident_type, latitude, longitude):
+            await db.execute(select(func.pg_advisory_xact_lock(func.hashtext(key))))
+
+    async def find_duplicate(
+        self,
+        db: AsyncSession,
+        incident_type: str,
+        latitude: float,
+        longitude: float,
+    ) -> Optional[Incident]:
+        """
+        Closest active incident of `incident_type` within
+        INCIDENT_DEDUP_RADIUS_METERS reported in the last
+        INCIDENT_DEDUP_WINDOW_MINUTES (in-process index, else GIST lookup).
+        Index misses are re-checked in the database: an incident committed
+        by another worker may not have reached this worker's index yet.
+        """
+        from app.services.incident_index import active_near, incident_index
+
+        since = datetime.utcnow() - timedelta(minutes=settings.INCIDENT_DEDUP_WINDOW_MINUTES)
+        radius_km = settings.INCIDENT_DEDUP_RADIUS_METERS / 1000
+
+        if settings.INCIDENT_INDEX_ENABLED and incident_index.ready:
+            entry = incident_index.nearest_recent(latitude, longitude, incident_type, radius_km, since)
+            incident = await db.get(Incident, entry.id) if entry else None
+            if incident is not None:
+                return incident
+
+        conditions, distance = active_near(latitude, longitude, radius_km)
+        result = await db.execute(
+            select(Incident).where(
+                *conditions,
+                func.lower(Incident.type) == incident_type.lower(),
+                Incident.created_at >= since
+            ).order_by(distance).limit(1)
+        )
+        return result.scalars().first()
+
+    async def merge(self, db: AsyncSession, incident: Incident, user: User) -> bool:
+        """
+        Record a duplicate report from `user` as a 'still_there' vote on
+        `incident`, which also pushes its expires_at out again. Returns False
+        if the user reported it or had already confirmed it.
+        """
+        from app.services.incident_expiry import expires_at_for
+        from app.services.verification import verification_service
+
+        if incident.user_id == user.id:
+            return False
+        result = await verification_service.vote(
+            db, incident, user, 'still_there',
+            expires_at=func.greatest(Incident.expires_at, expires_at_for(incident.type))
+        )
+        return result is not None and result.recorded
+
+    def schedule_broadcast(self, incident: Incident):
+        """
+        One incident_verified message per incident per
+        INCIDENT_DEDUP_BROADCAST_SECONDS, however many reports merge into it.
+        The first merge in a window sends the count at the end of the window.
+        """
+        from app.services.redis_service import redis_service
+
+        window = settings.INCIDENT_DEDUP_BROADCAST_SECONDS
+        if not redis_service.claim_merge_broadcast(incident.id, window):
+            return
+        task = asyncio.create_task(self._broadcast(incident.id, incident.latitude, incident.longitude, incident.type, window))
+        self._broadcasts.add(task)
+        task.add_done_callback(self._broadcasts.discard)
+
+    async def _broadcast(self, incident_id: str, latitude: float, longitude: float, incident_type: str, delay: float):
+        from app.core import geohash as geohash_utils
+        from app.core.database import AsyncSessionLocal
+        from app.core.websocket import EventType, create_event, manager
+
+        try:
+            await asyncio.sleep(delay)
+            async with AsyncSessionLocal() as db:
+                confirmations = (await db.execute(
+                    select(Incident.confirmations).where(Incident.id == incident_id)
+                )).scalar()
+
+            await manager.broadcast_to_area(
+                center_geohash=geohash_utils.alert_geohash(latitude, longitude, incident_type),
+                message=create_event(
+                    event_type=EventType.INCIDENT_VERIFIED,
+                    data={
+                        "incident_id": incident_id,
+                        "verification_type": "still_there",
+                        "confirmations": confirmations
+                    }
+                ),
+                include_neighbors=True
+            )
+        except Exception as e:
+            logger.error(f"Failed to broadcast merged reports for {incident_id}: {e}")
+
+    # ===== OUTBOX HANDLERS (new reports) =====
+
+    def claim_report_points(self, incident_id: str):
+        """
+        Mark an incident's report points as awarded, if they weren't yet.
+        Leaves updated_at alone: this is not a change clients sync.
+        """
+        return (
+            update(Incident)
+            .where(Incident.id == incident_id, Incident.report_points_awarded_at.is_(None))
+            .values(report_points_awarded_at=datetime.utcnow(), updated_at=Incident.updated_at)
+            .execution_options(synchronize_session=False)
+        )
+
+    async def award_report_points(self, payload: dict):
+        """
+        Reporter's points and any badges they unlock. The outbox can run this
+        more than once for an incident: the claim and the points commit
+        together, so only the first run pays.
+        """
+        from app.core.database import AsyncSessionLocal
+        from app.services.gamification import gamification_service
+
+        def award(session: Session):
+            if not session.execute(self.claim_report_points(payload["incident_id"])).rowcount:
+                logger.info(f"Report points for incident {payload['incident_id']} already awarded")
+                return
+            # Commits the claim with the points
+            gamification_service.award_points(session, payload["user_id"], 5, reason="incident_report")
+
+        async with AsyncSessionLocal() as db:
+            await db.run_sync(award)
+
+    async def announce_report(self, payload: dict):
+        """incident_alert to the map rooms around it, and a push to devices last seen there"""
+        from app.core import geohash as geohash_utils
+        from app.core.database import AsyncSessionLocal
+        from app.core.websocket import EventType, create_event, manager
+        from app.services.notifications import notification_service
+        from app.services.push_registry import push_registry
+
+        async with AsyncSessionLocal() as db:
+            row = (await db.execute(
+                select(Incident, User.device_token)
+                .outerjoin(User, User.id == Incident.user_id)
+                .where(Incident.id == payload["incident_id"])
+            )).first()
+        if row is None or row.Incident.status != 'active':
+            return
+        incident, reporter_token = row
+
+        # Radius (and so geo room precision) depends on the incident type
+        await manager.broadcast_to_area(
+            center_geohash=geohash_utils.alert_geohash(incident.latitude, incident.longitude, incident.type),
+            message=create_event(
+                event_type=EventType.INCIDENT_ALERT,
+                data={
+                    "id": incident.id,
+                    "type": incident.type,
+                    "latitude": incident.latitude,
+                    "longitude": incident.longitude,
+                    "description": incident.description,
+                    "created_at": incident.created_at.isoformat()
+                }
+            ),
+            include_neighbors=True
+        )
+
+        device_tokens = push_registry.recipients_for_incident(incident.latitude, incident.longitude, incident.type)
+        device_tokens.discard(reporter_token)
+        if device_tokens:
+            await notification_service.send_push_notification(
+                to=list(device_tokens),
+                title=f"New {incident.type} reported!",
+                body=f"Near you: {incident.description or 'Check map for details'}",
+                data={"incident_id": incident.id}
+            )
+
+
+incident_ingest_service = IncidentIngestService()
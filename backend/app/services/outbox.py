@@ -0,0 +1,193 @@
+"""
+Ehreezoh - Transactional Outbox
+Side effects are written to outbox_events in the same commit as the change
+that causes them, then carried out here, off the request path, with retries
+"""
+
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional
+import asyncio
+import logging
+import time
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.models.outbox import OutboxEvent
+
+logger = logging.getLogger(__name__)
+
+# Topics
+INCIDENT_REPORT_POINTS = "incident_report_points"  # {"user_id", "incident_id"}
+INCIDENT_REPORT_ALERT = "incident_report_alert"  # {"incident_id"}
+
+
+class OutboxWorker:
+    """
+    Delivery is at least once: an event whose handler failed, or whose
+    worker died before recording the result, is run again. Every API worker
+    runs one; claims use SKIP LOCKED so each event goes to one of them.
+    """
+
+    def __init__(self):
+        self._wake: Optional[asyncio.Event] = None
+        self._last_purge = 0.0
+
+    def add(self, db: AsyncSession, topic: str, payload: dict) -> OutboxEvent:
+        """Queue an event in the caller's transaction (committed with it)"""
+        event = OutboxEvent(topic=topic, payload=payload)
+        db.add(event)
+        return event
+
+    def notify(self):
+        """Process new events now instead of at the next poll (this worker)"""
+        if self._wake is not None:
+            self._wake.set()
+
+    def handlers(self) -> Dict[str, Callable[[dict], Awaitable]]:
+        from app.services.incident_ingest import incident_ingest_service
+
+        return {
+            INCIDENT_REPORT_POINTS: incident_ingest_service.award_report_points,
+            INCIDENT_REPORT_ALERT: incident_ingest_service.announce_report,
+        }
+
+    def backoff_seconds(self, attempts: int) -> float:
+        """Delay before attempt `attempts + 1`"""
+        return min(3600.0, settings.OUTBOX_RETRY_BASE_SECONDS * 2 ** (attempts - 1))
+
+    async def claim(self, db: AsyncSession, limit: int, now: Optional[datetime] = None) -> List[dict]:
+        """
+        Lease up to `limit` due events for OUTBOX_LEASE_SECONDS (oldest first).
+        Unfinished leases come back due when they run out.
+        """
+        now = now or datetime.utcnow()
+        due = (
+            select(OutboxEvent.id)
+            .where(OutboxEvent.processed_at.is_(None), OutboxEvent.available_at <= now)
+            .order_by(OutboxEvent.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        result = await db.execute(
+            update(OutboxEvent)
+            .where(OutboxEvent.id.in_(due))
+            .values(
+                attempts=OutboxEvent.attempts + 1,
+                available_at=now + timedelta(seconds=settings.OUTBOX_LEASE_SECONDS)
+            )
+            .returning(OutboxEvent.id, OutboxEvent.topic, OutboxEvent.payload,
+                       OutboxEvent.created_at, OutboxEvent.attempts)
+            .execution_options(synchronize_session=False)
+        )
+        events = [row._asdict() for row in result]
+        await db.commit()
+        return events
+
+    async def handle(self, event: dict) -> Optional[str]:
+        """Run the event's handler. Returns the error, if any."""
+        handler = self.handlers().get(event["topic"])
+        if handler is None:
+            return f"No handler for topic {event['topic']!r}"
+        try:
+            await handler(event["payload"])
+            return None
+        except Exception as e:
+            logger.error(f"Outbox event {event['id']} ({event['topic']}) failed: {e}")
+            return f"{type(e).__name__}: {e}"
+
+    async def record(self, db: AsyncSession, events: List[dict], errors: List[Optional[str]], now: Optional[datetime] = None):
+        """Mark handled events done; reschedule failures with backoff, or give up"""
+        now = now or datetime.utcnow()
+        done = [event["id"] for event, error in zip(events, errors) if error is None]
+        if done:
+            await db.execute(
+                update(OutboxEvent).where(OutboxEvent.id.in_(done))
+                .values(processed_at=now, last_error=None)
+                .execution_options(synchronize_session=False)
+            )
+        for event, error in zip(events, errors):
+            if error is None:
+                metrics.inc("outbox.processed")
+                metrics.observe("outbox.lag", (now - event["created_at"]).total_seconds() * 1000)
+                continue
+            values = {"last_error": error[:1000]}
+            if event["attempts"] >= settings.OUTBOX_MAX_ATTEMPTS:
+                values["processed_at"] = now  # Kept (with last_error) until purged
+                metrics.inc("outbox.dead")
+                logger.error(f"Outbox event {event['id']} ({event['topic']}) given up after {event['attempts']} attempts")
+            else:
+                values["available_at"] = now + timedelta(seconds=self.backoff_seconds(event["attempts"]))
+                metrics.inc("outbox.retries")
+            await db.execute(
+                update(OutboxEvent).where(OutboxEvent.id == event["id"]).values(**values)
+                .execution_options(synchronize_session=False)
+            )
+        await db.commit()
+
+    async def process_batch(self) -> int:
+        """Claim, run and record one batch. Returns the number of events claimed."""
+        from app.core.database import AsyncSessionLocal
+
+        async with AsyncSessionLocal() as db:
+            events = await self.claim(db, settings.OUTBOX_BATCH_SIZE)
+        if not events:
+            return 0
+        errors = await asyncio.gather(*(self.handle(event) for event in events))
+        async with AsyncSessionLocal() as db:
+            await self.record(db, events, list(errors))
+        return len(events)
+
+    async def purge(self) -> int:
+        """Delete events processed more than OUTBOX_RETENTION_HOURS ago"""
+        from app.core.database import AsyncSessionLocal
+
+        cutoff = datetime.utcnow() - timedelta(hours=settings.OUTBOX_RETENTION_HOURS)
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(delete(OutboxEvent).where(OutboxEvent.processed_at < cutoff))
+            await db.commit()
+        return result.rowcount
+
+    async def run(self, interval: float):
+        """Background task: drain due events whenever woken, or every `interval` seconds"""
+        self._wake = asyncio.Event()
+        while True:
+            try:
+                while await self.process_batch() == settings.OUTBOX_BATCH_SIZE:
+                    pass  # Backlog: keep going
+                if time.monotonic() - self._last_purge > 3600:
+                    self._last_purge = time.monotonic()
+                    await self.purge()
+            except Exception as e:
+                logger.error(f"Outbox worker failed: {e}")
+            try:
+                await asyncio.wait_for(self._wake.wait(), interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    async def stats(self) -> dict:
+        """Backlog size and age, dead events, and this worker's counters and lag"""
+        from app.core.database import AsyncSessionLocal
+
+        async with AsyncSessionLocal() as db:
+            pending, oldest = (await db.execute(
+                select(func.count(), func.min(OutboxEvent.created_at))
+                .where(OutboxEvent.processed_at.is_(None))
+            )).one()
+            dead = (await db.execute(
+                select(func.count()).where(OutboxEvent.processed_at.is_not(None), OutboxEvent.last_error.is_not(None))
+            )).scalar()
+        return {
+            "pending": pending,
+            "oldest_pending_seconds": round((datetime.utcnow() - oldest).total_seconds(), 1) if oldest else 0.0,
+            "dead": dead,
+            **metrics.snapshot(prefix="outbox."),
+        }
+
+
+# Global outbox worker
+outbox = OutboxWorker()
@@ -0,0 +1,187 @@
+"""
+Ehreezoh - Partition Maintenance
+Keeps monthly partitions of incidents, chat_messages and rides ready ahead of
+time and moves expired ones into partition_archive
+"""
+
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+import logging
+import re
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# table -> partition key (see migration partition_001)
+PARTITIONED_TABLES = {
+    "incidents": "created_at",
+    "chat_messages": "created_at",
+    "rides": "requested_at",
+}
+
+# Rows pointing at partitioned tables, archived and deleted together with the
+# partition holding their parent: partition_001 dropped these foreign keys, so
+# nothing else would clean them up. (child, column, parent); parent None is
+# the partition itself. Children of children come first (deleted first).
+DEPENDENT_ROWS = {
+    "incidents": [
+        ("comment_upvotes", "comment_id", "incident_comments"),
+        ("incident_comments", "incident_id", None),
+        ("incident_verifications", "incident_id", None),
+        ("incident_thanks", "incident_id", None),
+        ("incident_rewards", "incident_id", None),
+    ],
+    "rides": [
+        ("payments", "ride_id", None),
+        ("driver_ratings", "ride_id", None),
+        ("passenger_ratings", "ride_id", None),
+    ],
+}
+
+# Rows per partition_archive row; keeps each JSONB value well under the 256MB limit
+ARCHIVE_CHUNK_ROWS = 5000
+
+_PARTITION_RE = re.compile(r"_p(\d{4})(\d{2})$")
+
+
+def add_months(month: date, n: int) -> date:
+    """First day of the month `n` months after `month`"""
+    index = month.year * 12 + month.month - 1 + n
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_p{month:%Y%m}"
+
+
+def partition_month(name: str) -> Optional[date]:
+    """Month covered by a monthly partition, None for the DEFAULT partition"""
+    match = _PARTITION_RE.search(name)
+    return date(int(match.group(1)), int(match.group(2)), 1) if match else None
+
+
+def active_incidents_since() -> datetime:
+    """
+    Lower created_at bound for queries over active incidents. Active reports
+    are recent, and the bound lets PostgreSQL skip older partitions.
+    """
+    return datetime.utcnow() - timedelta(days=settings.ACTIVE_INCIDENT_MAX_AGE_DAYS)
+
+
+def dependent_filters(table: str, partition: str) -> List[Tuple[str, str]]:
+    """(child table, WHERE clause selecting its rows under `partition`), children first"""
+    filters = {}
+    for child, column, parent in reversed(DEPENDENT_ROWS.get(table, [])):
+        if parent is None:
+            filters[child] = f"{column} IN (SELECT id FROM {partition})"
+        else:
+            filters[child] = f"{column} IN (SELECT id FROM {parent} WHERE {filters[parent]})"
+    return [(child, filters[child]) for child, _, _ in DEPENDENT_ROWS.get(table, [])]
+
+
+def _bound(month: date) -> str:
+    # Explicit UTC offset; ignored for columns without a time zone
+    return f"'{month:%Y-%m-%d} 00:00:00+00'"
+
+
+class PartitionService:
+
+    def list_partitions(self, db: Session, table: str) -> List[str]:
+        """Names of the partitions currently attached to `table`"""
+        return db.execute(text(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = CAST(:t AS regclass) ORDER BY c.relname"
+        ), {"t": table}).scalars().all()
+
+    def ensure_partitions(self, db: Session, table: str, months_ahead: int, today: Optional[date] = None) -> List[str]:
+        """
+        Create monthly partitions from this month to `months_ahead` months out.
+        Rows that already landed in the DEFAULT partition for a new month are
+        moved into it before it is attached.
+        """
+        key = PARTITIONED_TABLES[table]
+        existing = set(self.list_partitions(db, table))
+        month = (today or date.today()).replace(day=1)
+        created = []
+
+        for _ in range(months_ahead + 1):
+            name = partition_name(table, month)
+            following = add_months(month, 1)
+            if name not in existing:
+                in_range = f"{key} >= {_bound(month)} AND {key} < {_bound(following)}"
+                db.execute(text(f"CREATE TABLE {name} (LIKE {table} INCLUDING DEFAULTS)"))
+                db.execute(text(f"INSERT INTO {name} SELECT * FROM {table}_default WHERE {in_range}"))
+                db.execute(text(f"DELETE FROM {table}_default WHERE {in_range}"))
+                db.execute(text(
+                    f"ALTER TABLE {table} ATTACH PARTITION {name} "
+                    f"FOR VALUES FROM ({_bound(month)}) TO ({_bound(following)})"
+                ))
+                db.commit()
+                created.append(name)
+                logger.info(f"🗂️ Created partition {name}")
+            month = following
+
+        return created
+
+    def archive_partitions(self, db: Session, table: str, retain_months: int, today: Optional[date] = None) -> List[str]:
+        """
+        Detach partitions entirely older than `retain_months` full months,
+        copy their rows into partition_archive and drop them. Rows of
+        DEPENDENT_ROWS tables pointing into the partition are archived
+        (under their own table name and the partition's range) and deleted
+        in the same transaction.
+        """
+        cutoff = add_months((today or date.today()).replace(day=1), -retain_months)
+        archived = []
+
+        for name in self.list_partitions(db, table):
+            month = partition_month(name)
+            if month is None or add_months(month, 1) > cutoff:
+                continue
+
+            db.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+            bounds = {
+                "start": datetime.combine(month, datetime.min.time()),
+                "end": datetime.combine(add_months(month, 1), datetime.min.time()),
+            }
+            for child, where in dependent_filters(table, name):
+                self._archive_rows(db, child, f"SELECT * FROM {child} WHERE {where}", **bounds)
+                db.execute(text(f"DELETE FROM {child} WHERE {where}"))
+            rows = self._archive_rows(db, table, f"SELECT * FROM {name}", **bounds)
+            db.execute(text(f"DROP TABLE {name}"))
+            db.commit()
+            archived.append(name)
+            logger.info(f"🧊 Archived partition {name} ({rows} chunks)")
+
+        return archived
+
+    def _archive_rows(self, db: Session, table: str, query: str, start: datetime, end: datetime) -> int:
+        """Copy the rows of `query` into partition_archive in chunks; returns the chunk count"""
+        return db.execute(text(
+            "INSERT INTO partition_archive (table_name, range_start, range_end, chunk, row_count, rows) "
+            "SELECT :table, :start, :end, chunk, count(*), jsonb_agg(row) "
+            f"FROM (SELECT to_jsonb(t) AS row, (row_number() OVER () - 1) / :chunk_rows AS chunk FROM ({query}) t) s "
+            "GROUP BY chunk"
+        ), {"table": table, "start": start, "end": end, "chunk_rows": ARCHIVE_CHUNK_ROWS}).rowcount
+
+    def run_maintenance(self, db: Session) -> Dict[str, dict]:
+        """Daily job: create upcoming partitions, archive expired ones"""
+        report = {}
+        for table in PARTITIONED_TABLES:
+            try:
+                report[table] = {
+                    "created": self.ensure_partitions(db, table, settings.PARTITION_MONTHS_AHEAD),
+                    "archived": self.archive_partitions(db, table, settings.PARTITION_RETENTION_MONTHS[table]),
+                }
+            except Exception as e:
+                db.rollback()
+                logger.error(f"Partition maintenance failed for {table}: {e}")
+                report[table] = {"created": [], "archived": [], "error": str(e)}
+        return report
+
+
+partition_service = PartitionService()
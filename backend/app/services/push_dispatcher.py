@@ -0,0 +1,263 @@
+"""
+Ehreezoh - Push Dispatcher
+Queued Expo push delivery: 100-token requests over one pooled (HTTP/2 when
+available) client, bounded concurrency, retries with backoff, and batched
+receipt polling that prunes tokens of uninstalled apps
+"""
+
+from typing import Dict, List, Optional, Tuple
+import asyncio
+import logging
+import random
+import time
+
+import httpx
+
+from app.core.config import settings
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Expo limits
+CHUNK_SIZE = 100  # Push tokens per send request
+RECEIPT_CHUNK_SIZE = 1000  # Receipt ids per getReceipts request
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+try:
+    import h2  # noqa: F401  (httpx[http2])
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+def chunk(items: List, size: int) -> List[List]:
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+class PushDispatcher:
+    """
+    Background push delivery for this worker.
+
+    `enqueue()` returns immediately; `concurrency` workers drain the queue.
+    Tickets with status "ok" are kept (in memory) until their receipt is
+    due; DeviceNotRegistered from a ticket or a receipt clears the token.
+    """
+
+    retry_base_seconds = 0.5  # First backoff; doubles per attempt, capped at 30s
+
+    def __init__(
+        self,
+        send_url: str = None,
+        receipts_url: str = None,
+        concurrency: int = None,
+        max_retries: int = None,
+        receipt_delay: float = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.send_url = send_url or settings.EXPO_PUSH_API_URL
+        self.receipts_url = receipts_url or settings.EXPO_PUSH_RECEIPTS_URL
+        self.concurrency = concurrency or settings.PUSH_CONCURRENCY
+        self.max_retries = settings.PUSH_MAX_RETRIES if max_retries is None else max_retries
+        self.receipt_delay = settings.PUSH_RECEIPT_DELAY if receipt_delay is None else receipt_delay
+        self._transport = transport  # Tests / stand-in servers
+        self.queue: Optional[asyncio.Queue] = None
+        self.client: Optional[httpx.AsyncClient] = None
+        self._tasks: List[asyncio.Task] = []
+        self._pending_receipts: Dict[str, Tuple[str, float]] = {}  # receipt id -> (token, sent_at)
+        self._started_at = 0.0
+
+    # ===== LIFECYCLE =====
+
+    def _make_client(self) -> httpx.AsyncClient:
+        headers = {
+            "Accept": "application/json",
+            "Accept-Encoding": "gzip, deflate",
+            "Content-Type": "application/json",
+        }
+        if settings.EXPO_ACCESS_TOKEN:
+            headers["Authorization"] = f"Bearer {settings.EXPO_ACCESS_TOKEN}"
+        return httpx.AsyncClient(
+            http2=HTTP2_AVAILABLE and self._transport is None,
+            transport=self._transport,
+            headers=headers,
+            timeout=10.0,
+            limits=httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency),
+        )
+
+    async def start(self):
+        if self._tasks:
+            return
+        if not HTTP2_AVAILABLE:
+            logger.warning("h2 not installed, push requests use HTTP/1.1")
+        self.queue = asyncio.Queue(maxsize=settings.PUSH_QUEUE_SIZE)
+        self.client = self._make_client()
+        self._started_at = time.time()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+        if self.receipt_delay > 0:
+            self._tasks.append(asyncio.create_task(self._poll_receipts_forever()))
+
+    async def stop(self, drain_timeout: float = 10.0):
+        """Stop the workers, giving queued notifications `drain_timeout` seconds to go out"""
+        if drain_timeout and self._tasks:
+            try:
+                await asyncio.wait_for(self.queue.join(), drain_timeout)
+            except asyncio.TimeoutError:
+                logger.warning(f"Dropping {self.queue.qsize()} queued push requests on shutdown")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+
+    # ===== SENDING =====
+
+    def enqueue(self, tokens: List[str], title: str, body: str, data: Optional[dict] = None, sound: str = "default") -> int:
+        """Queue one notification for `tokens` (any number). Returns requests queued."""
+        if self.queue is None:
+            logger.warning("Push dispatcher not started, dropping notification")
+            return 0
+        queued = 0
+        for tokens_chunk in chunk(list(dict.fromkeys(tokens)), CHUNK_SIZE):
+            message = {"to": tokens_chunk, "title": title, "body": body, "data": data or {}, "sound": sound}
+            try:
+                self.queue.put_nowait(message)
+                queued += 1
+            except asyncio.QueueFull:
+                metrics.inc("push.dropped", len(tokens_chunk))
+                logger.error("Push queue full, dropping notification chunk")
+        return queued
+
+    async def _worker(self):
+        while True:
+            message = await self.queue.get()
+            try:
+                await self.send(message)
+            except Exception as e:
+                logger.error(f"Push worker error: {e}")
+            finally:
+                self.queue.task_done()
+
+    async def _post(self, url: str, payload) -> Optional[dict]:
+        """POST with retries on transport errors, 429 and 5xx (exponential backoff + jitter)"""
+        for attempt in range(self.max_retries + 1):
+            started = time.perf_counter()
+            try:
+                response = await self.client.post(url, json=payload)
+                metrics.observe("push.request", (time.perf_counter() - started) * 1000)
+                if response.status_code not in RETRYABLE_STATUS:
+                    response.raise_for_status()
+                    return response.json()
+                error = f"HTTP {response.status_code}"
+            except httpx.TransportError as e:
+                error = str(e) or type(e).__name__
+            except httpx.HTTPStatusError as e:
+                logger.error(f"Push request rejected: {e.response.status_code} {e.response.text[:200]}")
+                return None
+
+            if attempt < self.max_retries:
+                metrics.inc("push.retries")
+                await asyncio.sleep(min(30.0, self.retry_base_seconds * 2 ** attempt) * (0.5 + random.random()))
+            else:
+                logger.error(f"Push request failed after {attempt + 1} attempts: {error}")
+        return None
+
+    async def send(self, message: dict) -> List[dict]:
+        """Send one ≤100-token message now. Returns Expo's tickets (one per token)."""
+        tokens = message["to"]
+        result = await self._post(self.send_url, [message])
+        if result is None:
+            metrics.inc("push.failed", len(tokens))
+            return []
+
+        tickets = result.get("data") or []
+        now, unregistered = time.time(), []
+        for token, ticket in zip(tokens, tickets):
+            if ticket.get("status") == "ok":
+                metrics.inc("push.sent")
+                if ticket.get("id") and self.receipt_delay > 0:
+                    self._pending_receipts[ticket["id"]] = (token, now)
+            else:
+                metrics.inc("push.failed")
+                if (ticket.get("details") or {}).get("error") == "DeviceNotRegistered":
+                    unregistered.append(token)
+        if unregistered:
+            await self.prune(unregistered)
+        return tickets
+
+    # ===== RECEIPTS =====
+
+    async def poll_receipts(self, now: Optional[float] = None) -> int:
+        """Fetch receipts that are due, in batches; prune DeviceNotRegistered tokens"""
+        now = now or time.time()
+        due = [rid for rid, (_, sent_at) in self._pending_receipts.items() if now - sent_at >= self.receipt_delay]
+        unregistered = []
+        for ids in chunk(due, RECEIPT_CHUNK_SIZE):
+            result = await self._post(self.receipts_url, {"ids": ids})
+            if result is None:
+                continue  # Retried next poll
+            receipts = result.get("data") or {}
+            for rid in ids:
+                token, _ = self._pending_receipts.pop(rid)
+                receipt = receipts.get(rid)
+                if receipt and receipt.get("status") == "error":
+                    metrics.inc("push.receipt_errors")
+                    if (receipt.get("details") or {}).get("error") == "DeviceNotRegistered":
+                        unregistered.append(token)
+        if unregistered:
+            await self.prune(unregistered)
+        return len(due)
+
+    async def _poll_receipts_forever(self):
+        interval = max(60.0, self.receipt_delay / 3)
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.poll_receipts()
+            except Exception as e:
+                logger.error(f"Push receipt poll failed: {e}")
+
+    async def prune(self, tokens: List[str]) -> int:
+        """Clear device tokens Expo reports as no longer registered"""
+        from sqlalchemy import update
+        from app.core.database import AsyncSessionLocal
+        from app.models.user import User
+        from app.services.redis_service import redis_service
+
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                update(User).where(User.device_token.in_(tokens)).values(device_token=None)
+                .returning(User.id).execution_options(synchronize_session=False)
+            )
+            user_ids = result.scalars().all()
+            await db.commit()
+
+        # Bulk update: drop cached identities and registry entries by hand
+        redis_service.invalidate_identity(*user_ids)
+        for user_id in user_ids:
+            redis_service.unregister_push(user_id)
+        metrics.inc("push.pruned", len(user_ids))
+        logger.info(f"🔕 Pruned {len(user_ids)} unregistered device tokens")
+        return len(user_ids)
+
+    # ===== STATS =====
+
+    def stats(self) -> dict:
+        """Queue depth, throughput since start and request latency"""
+        counters = metrics.snapshot(prefix="push.")
+        uptime = time.time() - self._started_at if self._started_at else 0
+        sent = counters["counters"].get("push.sent", 0)
+        return {
+            "running": bool(self._tasks),
+            "http2": HTTP2_AVAILABLE,
+            "queued": self.queue.qsize() if self.queue is not None else 0,
+            "pending_receipts": len(self._pending_receipts),
+            "sent_per_second": round(sent / uptime, 2) if uptime else 0.0,
+            **counters,
+        }
+
+
+# Global push dispatcher (one per worker)
+push_dispatcher = PushDispatcher()
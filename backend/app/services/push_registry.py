@@ -0,0 +1,42 @@
+"""
+Ehreezoh - Push Recipient Registry
+Device tokens indexed by each user's last known geohash, so incident pushes
+go to the devices around the incident instead of every device
+"""
+
+from typing import Optional, Set
+import logging
+
+from app.core import geohash as geohash_utils
+from app.services.redis_service import redis_service
+
+logger = logging.getLogger(__name__)
+
+
+class PushRegistry:
+
+    def update_location(self, user_id: str, token: Optional[str], latitude: float, longitude: float) -> bool:
+        """
+        Record where a device was last seen (geohash subscriptions, driver
+        location updates, app foregrounding). Cheap to call often: unchanged
+        cells are only rewritten every PUSH_REGISTRY_REFRESH_SECONDS.
+        """
+        if not token:
+            return False
+        gh = geohash_utils.encode(latitude, longitude)
+        return redis_service.register_push_location(user_id, token, geohash_utils.subscription_cells(gh))
+
+    def update_token(self, user_id: str, token: str) -> bool:
+        """Swap a user's device token in the cells they were last seen in"""
+        return redis_service.register_push_location(user_id, token)
+
+    def recipients_for_incident(self, latitude: float, longitude: float, incident_type: str) -> Set[str]:
+        """
+        Tokens in the incident's alert cell and its neighbours: the same
+        area (and radius per type) as the websocket incident alert
+        """
+        center = geohash_utils.alert_geohash(latitude, longitude, incident_type)
+        return redis_service.get_push_recipients(list(geohash_utils.area_cells(center)))
+
+
+push_registry = PushRegistry()
@@ -7,6 +7,7 @@ import redis
 from typing import List, Dict, Optional, Tuple
 import json
 import logging
+import time
 from datetime import datetime, timedelta
 
 from app.core.config import settings
@@ -34,6 +35,7 @@ class RedisService:
             socket_timeout=5,
             **ssl_kwargs
         )
+        self._append_event = self.redis_client.register_script(self._APPEND_EVENT_SCRIPT)
         logger.info("✅ Redis service initialized")
     
     def ping(self) -> bool:
@@ -437,6 +439,309 @@ class RedisService:
             logger.error(f"Failed to clear passenger current ride: {e}")
             return False
 
+    
+    # ===== EVENT STREAMS (RESUMABLE DELIVERY) =====
+    
+    # Atomically assign the next global sequence number and append the event
+    # to every stream with that number as its entry ID. Doing both in one
+    # script keeps IDs increasing within each stream across workers.
+    _APPEND_EVENT_SCRIPT = """
+    local seq = redis.call('INCR', KEYS[1])
+    for i = 2, #KEYS do
+        redis.call('XADD', KEYS[i], 'MAXLEN', '~', ARGV[2], seq .. '-0', 'event', ARGV[1])
+        redis.call('EXPIRE', KEYS[i], ARGV[3])
+    end
+    return seq
+    """
+    
+    def append_event(self, stream_keys: List[str], event: Dict) -> Optional[int]:
+        """
+        Append an event to one or more capped event streams
+        
+        Args:
+            stream_keys: Streams to append to (e.g. per-user and per-ride)
+            event: Event payload (JSON serialisable)
+        
+        Returns:
+            The event's sequence number, or None on failure
+        """
+        if not stream_keys:
+            return None
+        try:
+            seq = self._append_event(
+                keys=["events:seq", *stream_keys],
+                args=[json.dumps(event), settings.EVENT_STREAM_MAXLEN, settings.EVENT_STREAM_TTL]
+            )
+            return int(seq)
+        except Exception as e:
+            logger.error(f"Failed to append event: {e}")
+            return None
+    
+    def get_current_event_seq(self) -> int:
+        """Get the latest assigned event sequence number"""
+        try:
+            return int(self.redis_client.get("events:seq") or 0)
+        except Exception as e:
+            logger.error(f"Failed to get event sequence: {e}")
+            return 0
+    
+    def get_events_since(
+        self,
+        stream_key: str,
+        last_seq: int,
+        limit: int = 200
+    ) -> Tuple[List[Dict], bool]:
+        """
+        Get events with a sequence number greater than last_seq
+        
+        Args:
+            stream_key: Stream to read
+            last_seq: Last sequence number the client has seen
+            limit: Maximum number of events to return
+        
+        Returns:
+            (events oldest first, truncated) - truncated is True when events
+            after last_seq may have been trimmed, the stream is gone (expired
+            after EVENT_STREAM_TTL) while newer events exist, or more than
+            `limit` are pending
+        """
+        try:
+            pipe = self.redis_client.pipeline(transaction=False)
+            pipe.xlen(stream_key)
+            pipe.xrange(stream_key, "-", "+", count=1)
+            pipe.xrange(stream_key, f"{last_seq + 1}-0", "+", count=limit + 1)
+            pipe.get("events:seq")
+            length, oldest, entries, current_seq = pipe.execute()
+            
+            events = []
+            for entry_id, fields in entries[:limit]:
+                event = json.loads(fields["event"])
+                event["seq"] = int(entry_id.split("-")[0])
+                events.append(event)
+            
+            oldest_seq = int(oldest[0][0].split("-")[0]) if oldest else 0
+            trimmed = length >= settings.EVENT_STREAM_MAXLEN and oldest_seq > last_seq + 1
+            expired = length == 0 and int(current_seq or 0) > last_seq
+            return events, trimmed or expired or len(entries) > limit
+        except Exception as e:
+            logger.error(f"Failed to read events from {stream_key}: {e}")
+            return [], True
+    
+    # ===== READ-YOUR-WRITES MARKERS =====
+    
+    def mark_recent_write(self, user_id: str, ttl_seconds: int = None) -> bool:
+        """Remember that a user just wrote, so their reads stay on the primary"""
+        try:
+            self.redis_client.setex(
+                f"user:{user_id}:recent_write",
+                ttl_seconds or settings.READ_YOUR_WRITES_SECONDS,
+                1
+            )
+            return True
+        except Exception as e:
+            logger.error(f"Failed to mark recent write: {e}")
+            return False
+    
+    def has_recent_write(self, user_id: str) -> bool:
+        """Whether the user wrote within READ_YOUR_WRITES_SECONDS (errs towards the primary)"""
+        try:
+            return bool(self.redis_client.exists(f"user:{user_id}:recent_write"))
+        except Exception as e:
+            logger.error(f"Failed to check recent write: {e}")
+            return True
+
+    
+    # ===== IDENTITY CACHE =====
+    
+    def cache_identity(self, user_id: str, identity: Dict, ttl_seconds: int = None) -> bool:
+        """Cache the column snapshot of a user and their driver profile"""
+        try:
+            self.redis_client.setex(
+                f"user:{user_id}:identity",
+                ttl_seconds or settings.IDENTITY_CACHE_TTL,
+                json.dumps(identity)
+            )
+            return True
+        except Exception as e:
+            logger.error(f"Failed to cache identity: {e}")
+            return False
+    
+    def get_identity(self, user_id: str) -> Optional[Dict]:
+        """Get a cached identity snapshot (None on miss or error: load from the DB)"""
+        try:
+            identity_json = self.redis_client.get(f"user:{user_id}:identity")
+            if identity_json:
+                return json.loads(identity_json)
+            return None
+        except Exception as e:
+            logger.error(f"Failed to get identity: {e}")
+            return None
+    
+    def invalidate_identity(self, *user_ids: str) -> bool:
+        """Drop cached identities after their user or driver rows change"""
+        if not user_ids:
+            return True
+        try:
+            self.redis_client.delete(*(f"user:{user_id}:identity" for user_id in user_ids))
+            return True
+        except Exception as e:
+            logger.error(f"Failed to invalidate identity: {e}")
+            return False
+
+    
+    # ===== INCIDENT FEED CACHE =====
+    
+    def cache_feed_page(self, key: str, page: Dict, ttl_seconds: int = None) -> bool:
+        """Cache an assembled incident feed page for a geohash cell"""
+        try:
+            self.redis_client.setex(
+                f"incidents:feed:{key}",
+                ttl_seconds or settings.FEED_CACHE_TTL,
+                json.dumps(page)
+            )
+            return True
+        except Exception as e:
+            logger.error(f"Failed to cache feed page: {e}")
+            return False
+    
+    def get_feed_page(self, key: str) -> Optional[Dict]:
+        """Get a cached feed page (None on miss or error)"""
+        try:
+            page_json = self.redis_client.get(f"incidents:feed:{key}")
+            if page_json:
+                return json.loads(page_json)
+            return None
+        except Exception as e:
+            logger.error(f"Failed to get feed page: {e}")
+            return None
+
+
+    # ===== ROUTE CACHE =====
+
+    def cache_routes(self, key: str, routes: List[Dict], ttl_seconds: int = None) -> bool:
+        """Cache base routes (polyline, distance, duration) for a snapped origin/destination"""
+        try:
+            self.redis_client.setex(
+                f"routes:base:{key}",
+                ttl_seconds or settings.ROUTE_CACHE_TTL,
+                json.dumps(routes)
+            )
+            return True
+        except Exception as e:
+            logger.error(f"Failed to cache routes: {e}")
+            return False
+
+    def get_cached_routes(self, key: str) -> Optional[List[Dict]]:
+        """Get cached base routes (None on miss or error)"""
+        try:
+            routes_json = self.redis_client.get(f"routes:base:{key}")
+            if routes_json:
+                return json.loads(routes_json)
+            return None
+        except Exception as e:
+            logger.error(f"Failed to get cached routes: {e}")
+            return None
+
+
+    # ===== INCIDENT INDEX PUB/SUB =====
+    
+    def publish_incident_change(self, channel: str, message: Dict) -> bool:
+        """Publish an incident index change to every worker"""
+        try:
+            self.redis_client.publish(channel, json.dumps(message))
+            return True
+        except Exception as e:
+            logger.error(f"Failed to publish incident change: {e}")
+            return False
+
+    
+    # ===== INCIDENT MERGE COALESCING =====
+    
+    def claim_merge_broadcast(self, incident_id: str, ttl_seconds: int) -> bool:
+        """
+        True for the first merged report of an incident in a window (that
+        request schedules the broadcast). On Redis errors every merge broadcasts.
+        """
+        try:
+            return bool(self.redis_client.set(
+                f"incident:{incident_id}:merge_broadcast", 1, nx=True, ex=ttl_seconds
+            ))
+        except Exception as e:
+            logger.error(f"Failed to claim merge broadcast: {e}")
+            return True
+
+    
+    # ===== PUSH RECIPIENT REGISTRY =====
+    # push:cell:{geohash} is a sorted set of device tokens scored by when the
+    # device was last seen there (stale members are dropped on read);
+    # user:{id}:push remembers a user's token and cells so moves and token
+    # changes can take the old entries out.
+    
+    def register_push_location(self, user_id: str, token: str, cells: Optional[List[str]] = None) -> bool:
+        """
+        Index `token` under `cells` (one per geo room precision), leaving the
+        user's previous cells. cells=None keeps the previous cells (token change).
+        """
+        user_key = f"user:{user_id}:push"
+        try:
+            previous = self.redis_client.hgetall(user_key)
+            old_token = previous.get("token")
+            old_cells = previous["cells"].split(",") if previous.get("cells") else []
+            if cells is None:
+                cells = old_cells
+            if not cells:
+                return True
+            
+            now = time.time()
+            if (old_token == token and old_cells == cells
+                    and now - float(previous.get("updated_at", 0)) < settings.PUSH_REGISTRY_REFRESH_SECONDS):
+                return True  # Same place, seen recently
+            
+            pipe = self.redis_client.pipeline()
+            if old_token:
+                for cell in old_cells:
+                    if old_token != token or cell not in cells:
+                        pipe.zrem(f"push:cell:{cell}", old_token)
+            for cell in cells:
+                pipe.zadd(f"push:cell:{cell}", {token: now})
+            pipe.hset(user_key, mapping={"token": token, "cells": ",".join(cells), "updated_at": now})
+            pipe.expire(user_key, settings.PUSH_REGISTRY_TTL)
+            pipe.execute()
+            return True
+        except Exception as e:
+            logger.error(f"Failed to register push location: {e}")
+            return False
+    
+    def get_push_recipients(self, cells: List[str]) -> set:
+        """Device tokens seen within PUSH_REGISTRY_TTL in any of `cells`"""
+        try:
+            cutoff = time.time() - settings.PUSH_REGISTRY_TTL
+            pipe = self.redis_client.pipeline()
+            for cell in cells:
+                pipe.zremrangebyscore(f"push:cell:{cell}", "-inf", cutoff)
+                pipe.zrange(f"push:cell:{cell}", 0, -1)
+            results = pipe.execute()
+            return set().union(*results[1::2]) if cells else set()
+        except Exception as e:
+            logger.error(f"Failed to get push recipients: {e}")
+            return set()
+    
+    def unregister_push(self, user_id: str) -> bool:
+        """Take a user's token out of all its cells (token cleared or invalid)"""
+        user_key = f"user:{user_id}:push"
+        try:
+            previous = self.redis_client.hgetall(user_key)
+            pipe = self.redis_client.pipeline()
+            if previous.get("token") and previous.get("cells"):
+                for cell in previous["cells"].split(","):
+                    pipe.zrem(f"push:cell:{cell}", previous["token"])
+            pipe.delete(user_key)
+            pipe.execute()
+            return True
+        except Exception as e:
+            logger.error(f"Failed to unregister push token: {e}")
+            return False
+
 
 # Global Redis service instance
 redis_service = RedisService()
@@ -1,5 +1,7 @@
-from typing import List, Dict, Tuple, Any, Set
+from typing import List, Dict, Tuple, Any, Set, NamedTuple, Optional
+import logging
 import math
+import time
 import uuid
 import polyline
 from datetime import datetime
@@ -8,6 +10,7 @@ from sqlalchemy import func
 from shapely.geometry import LineString
 
 from app.core.config import settings
+from app.core.metrics import metrics
 from app.models.incident import Incident
 from app.models.historical import HistoricalIncidentStats
 from app.schemas.route import ScoredRoute, RouteIncident, RoutePreferences
@@ -15,6 +18,27 @@ from app.schemas.route import ScoredRoute, RouteIncident, RoutePreferences
 import pygeohash
 import httpx
 
+logger = logging.getLogger(__name__)
+
+
+class OverlayIncident(NamedTuple):
+    """Incident columns used to score a route (cached, unlike ORM objects)"""
+    id: str
+    type: str
+    confirmations: int
+    severity_score: Optional[int]
+    latitude: float
+    longitude: float
+    description: Optional[str]
+
+    @classmethod
+    def from_model(cls, incident: Incident) -> "OverlayIncident":
+        return cls(
+            incident.id, incident.type, incident.confirmations or 0, incident.severity_score,
+            incident.latitude, incident.longitude, incident.description
+        )
+
+
 class RouteAnalysisService:
     # ... (existing init)
 
@@ -22,7 +46,7 @@ class RouteAnalysisService:
 
     # ... (existing _get_mock_routes)
     
-    # ... (existing _find_incidents_on_route)
+    # ... (existing _find_incidents_on_routes)
     
     # ... (existing _score_route_logic)
 
@@ -83,6 +107,49 @@ class RouteAnalysisService:
     # ... (existing methods)
     def __init__(self):
         self.mapbox_token = settings.MAPBOX_ACCESS_TOKEN
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def _http(self) -> httpx.AsyncClient:
+        """Directions client shared by all requests (keep-alive connections to Mapbox)"""
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=5.0,
+                limits=httpx.Limits(max_connections=20, max_keepalive_connections=10)
+            )
+        return self._client
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    @property
+    def uses_mock_routes(self) -> bool:
+        return "Placeholder" in self.mapbox_token or len(self.mapbox_token) < 10
+
+    async def _base_routes(self, key: str, origin: Tuple[float, float], destination: Tuple[float, float]) -> List[Dict]:
+        """
+        Routes between the snapped origin/destination `key`: cached, or
+        fetched for this request's exact points and cached. Mock routes that
+        stand in for a failed Mapbox request are not cached.
+        """
+        from app.services.route_cache import route_cache
+
+        routes = route_cache.get_base(key)
+        if routes is not None:
+            return routes
+
+        started = time.perf_counter()
+        if self.uses_mock_routes:
+            routes = self._get_mock_routes(origin, destination)
+        else:
+            routes = await self._fetch_routes_from_mapbox(origin, destination)
+            if not routes:
+                return self._get_mock_routes(origin, destination)
+        elapsed = (time.perf_counter() - started) * 1000
+        metrics.observe("routes.base", elapsed)
+        route_cache.put_base(key, routes, elapsed)
+        return routes
 
     async def analyze_routes(
         self,
@@ -94,17 +161,29 @@ class RouteAnalysisService:
         user_permissions: List[str] = []
     ) -> List[ScoredRoute]:
         
-        if "Placeholder" in self.mapbox_token or len(self.mapbox_token) < 10:
-             base_routes = self._get_mock_routes(origin, destination)
-        else:
-             base_routes = await self._fetch_routes_from_mapbox(origin, destination)
+        from app.services.route_cache import route_cache, route_cover, route_key
+        
+        # 1. Base routes and the incidents along them, cached per snapped
+        # origin/destination (ride type and preferences only affect scoring)
+        key = route_key(origin, destination)
+        base_routes = await self._base_routes(key, origin, destination)
+        
+        overlay_key = (key, tuple(route['polyline'] for route in base_routes))
+        overlay = route_cache.get_overlay(overlay_key)
+        if overlay is None:
+            started = time.perf_counter()
+            # 2. Find incidents on every route (one query)
+            overlay = [
+                [OverlayIncident.from_model(i) for i in incidents]
+                for incidents in self._find_incidents_on_routes(db, [route['geometry'] for route in base_routes], buffer_meters=200)
+            ]
+            elapsed = (time.perf_counter() - started) * 1000
+            metrics.observe("routes.overlay", elapsed)
+            route_cache.put_overlay(overlay_key, route_cover(route['geometry'] for route in base_routes), overlay, elapsed)
         
         scored_routes = []
         
-        for idx, route_data in enumerate(base_routes):
-            # 2. Find incidents on route
-            incidents = self._find_incidents_on_route(db, route_data['geometry'], buffer_meters=200)
-            
+        for idx, (route_data, incidents) in enumerate(zip(base_routes, overlay)):
             # Filter incidents based on permissions (e.g., police)
             filtered_incidents = [
                 i for i in incidents 
@@ -185,7 +264,7 @@ class RouteAnalysisService:
     async def _fetch_routes_from_mapbox(self, origin: Tuple[float, float], dest: Tuple[float, float]) -> List[Dict]:
         """
         Fetches real routes from Mapbox Directions API.
-        Falls back to mock routes if request fails.
+        Returns [] if the request fails.
         """
         # Mapbox expects "lon,lat"
         coords = f"{origin[0]},{origin[1]};{dest[0]},{dest[1]}"
@@ -201,10 +280,9 @@ class RouteAnalysisService:
         }
         
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(url, params=params, timeout=5.0)
-                response.raise_for_status()
-                data = response.json()
+            response = await self._http().get(url, params=params)
+            response.raise_for_status()
+            data = response.json()
                 
             routes = []
             for r in data.get("routes", []):
@@ -224,42 +302,51 @@ class RouteAnalysisService:
                     'congestion': r.get("legs", [{}])[0].get("annotation", {}).get("congestion", [])
                 })
                 
-            if not routes:
-                return self._get_mock_routes(origin, dest)
-                
             return routes
             
         except Exception as e:
-            print(f"Mapbox API retrieval failed: {e}")
-            return self._get_mock_routes(origin, dest)
+            logger.error(f"Mapbox API retrieval failed: {e}")
+            return []
 
-    def _find_incidents_on_route(self, db: Session, route_geom: LineString, buffer_meters: int) -> List[Incident]:
+    def incidents_on_routes_query(self, route_geoms: List[LineString], buffer_meters: int):
         """
-        Finds active incidents within X meters of the route
+        (route index, incident) pairs for active incidents within
+        `buffer_meters` of each route: the routes are a VALUES list, each
+        parsed once, joined to incidents on ST_DWithin (GIST on location)
         """
-        # In a real PostGIS setup, we'd use ST_DWithin on the LineString
-        # For now, simplistic bbox or radius check if 'route_geom' is complex?
-        # Actually we should try to use PostGIS functions if available.
+        from sqlalchemy import Integer, column, or_, select, values
+        from geoalchemy2 import Geography
+        from geoalchemy2.elements import WKTElement
+        from app.services.partitioning import active_incidents_since
         
-        # Construct WKT for route
-        route_wkt = route_geom.wkt
+        routes = values(
+            column('route_idx', Integer), column('route', Geography(srid=4326)), name='routes'
+        ).data([(idx, WKTElement(geom.wkt, srid=4326)) for idx, geom in enumerate(route_geoms)])
         
-        # Query
-        # Note: 0.002 degrees approx 200m at equator
-        return db.query(Incident).filter(
+        return select(routes.c.route_idx, Incident).join(
+            routes,
+            func.ST_DWithin(Incident.location, routes.c.route, buffer_meters, True)  # Use sphere (meters)
+        ).where(
             Incident.status == 'active',
-            func.ST_DWithin(
-                Incident.location,
-                func.ST_GeomFromText(route_wkt, 4326),
-                buffer_meters,
-                True # Use sphere (meters)
-            )
-        ).all()
+            or_(Incident.expires_at.is_(None), Incident.expires_at > datetime.utcnow()),
+            Incident.created_at >= active_incidents_since()
+        ).order_by(routes.c.route_idx)
+
+    def _find_incidents_on_routes(self, db: Session, route_geoms: List[LineString], buffer_meters: int) -> List[List[Incident]]:
+        """
+        Active incidents within X meters of each route, in one round trip
+        however many alternatives there are
+        """
+        per_route = [[] for _ in route_geoms]
+        if route_geoms:
+            for route_idx, incident in db.execute(self.incidents_on_routes_query(route_geoms, buffer_meters)):
+                per_route[route_idx].append(incident)
+        return per_route
 
     def _score_route_logic(
         self, 
         route_data: Dict, 
-        incidents: List[Incident], 
+        incidents: List[OverlayIncident], 
         preferences: RoutePreferences
     ) -> Tuple[int, List[RouteIncident], List[str]]:
         
@@ -0,0 +1,197 @@
+"""
+Ehreezoh - Route Cache
+Route analysis per snapped origin/destination: base routes (Mapbox) in this
+worker's LRU and in Redis with a long TTL, and the incidents along them in
+the LRU only, dropped when an incident near the route changes
+"""
+
+from collections import OrderedDict, defaultdict
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Set, Tuple
+import math
+import threading
+import time
+
+import polyline
+from shapely.geometry import LineString
+
+from app.core import geohash as geohash_utils
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.services.incident_index import incident_index
+
+COVER_PRECISION = 6  # ~1.2km x 0.6km cover cells, wider than the route incident buffer
+COVER_STEP_DEG = 0.004  # Routes are sampled this often (~450m) so no cell is skipped
+
+
+def route_key(origin: Tuple[float, float], destination: Tuple[float, float]) -> str:
+    """Cache key: (lon, lat) pairs snapped to ROUTE_CACHE_PRECISION decimals"""
+    precision = settings.ROUTE_CACHE_PRECISION
+    return ":".join(f"{value:.{precision}f}" for value in (*origin, *destination))
+
+
+def route_cover(geometries: Iterable[LineString]) -> Set[str]:
+    """Geohash cells the routes pass through"""
+    cells = set()
+    for geometry in geometries:
+        coords = list(geometry.coords)
+        for (x0, y0), (x1, y1) in zip(coords, coords[1:]):
+            steps = max(1, math.ceil(max(abs(x1 - x0), abs(y1 - y0)) / COVER_STEP_DEG))
+            for i in range(steps + 1):
+                t = i / steps
+                cells.add(geohash_utils.encode(y0 + (y1 - y0) * t, x0 + (x1 - x0) * t, COVER_PRECISION))
+    return cells
+
+
+def _to_json(routes: List[Dict]) -> List[Dict]:
+    return [{k: v for k, v in route.items() if k != 'geometry'} for route in routes]
+
+
+def _from_json(routes: List[Dict]) -> List[Dict]:
+    return [
+        {**route, 'geometry': LineString([(lon, lat) for lat, lon in polyline.decode(route['polyline'])])}
+        for route in routes
+    ]
+
+
+class RouteCache:
+    """
+    Hits add the average cost of a miss (Mapbox round trip, incident query)
+    to `routes.cache.saved_ms`, minus the Redis round trip for Redis hits.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._base: "OrderedDict[str, Tuple[float, List[Dict]]]" = OrderedDict()
+        self._overlays: "OrderedDict[Hashable, Tuple[float, Set[str], Any]]" = OrderedDict()
+        self._overlays_by_cell: Dict[str, Set[Hashable]] = defaultdict(set)
+        self._miss_ms = {"base": 0.0, "overlay": 0.0}  # Moving average cost of a miss
+        self._lock = threading.Lock()  # Invalidated from the incident index listener thread
+
+    def _record_miss_cost(self, tier: str, elapsed_ms: float):
+        previous = self._miss_ms[tier]
+        self._miss_ms[tier] = elapsed_ms if not previous else previous * 0.8 + elapsed_ms * 0.2
+
+    def _saved(self, tier: str, spent_ms: float = 0.0):
+        metrics.inc("routes.cache.saved_ms", max(0, int(self._miss_ms[tier] - spent_ms)))
+
+    # Base routes: this worker, then Redis
+
+    def get_base(self, key: str) -> Optional[List[Dict]]:
+        from app.services.redis_service import redis_service
+
+        with self._lock:
+            cached = self._base.get(key)
+            if cached is not None and cached[0] >= time.monotonic():
+                self._base.move_to_end(key)
+                metrics.inc("routes.cache.base.local_hit")
+                self._saved("base")
+                return cached[1]
+
+        started = time.perf_counter()
+        routes = redis_service.get_cached_routes(key)
+        if routes:
+            routes = _from_json(routes)
+            self._put_base_local(key, routes)
+            metrics.inc("routes.cache.base.redis_hit")
+            self._saved("base", (time.perf_counter() - started) * 1000)
+            return routes
+
+        metrics.inc("routes.cache.base.miss")
+        return None
+
+    def _put_base_local(self, key: str, routes: List[Dict]):
+        with self._lock:
+            self._base[key] = (time.monotonic() + settings.ROUTE_CACHE_TTL, routes)
+            self._base.move_to_end(key)
+            while len(self._base) > self.max_entries:
+                self._base.popitem(last=False)
+
+    def put_base(self, key: str, routes: List[Dict], elapsed_ms: float):
+        from app.services.redis_service import redis_service
+
+        self._record_miss_cost("base", elapsed_ms)
+        self._put_base_local(key, routes)
+        redis_service.cache_routes(key, _to_json(routes), settings.ROUTE_CACHE_TTL)
+
+    # Incident overlay: this worker only
+
+    def get_overlay(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            cached = self._overlays.get(key)
+            if cached is None or cached[0] < time.monotonic():
+                metrics.inc("routes.cache.overlay.miss")
+                return None
+            self._overlays.move_to_end(key)
+            metrics.inc("routes.cache.overlay.hit")
+            self._saved("overlay")
+            return cached[2]
+
+    def put_overlay(self, key: Hashable, cells: Set[str], overlay: Any, elapsed_ms: float):
+        with self._lock:
+            self._record_miss_cost("overlay", elapsed_ms)
+            self._drop_overlay_locked(key)
+            self._overlays[key] = (time.monotonic() + settings.ROUTE_OVERLAY_CACHE_TTL, cells, overlay)
+            for cell in cells:
+                self._overlays_by_cell[cell].add(key)
+            while len(self._overlays) > self.max_entries:
+                self._drop_overlay_locked(next(iter(self._overlays)))
+
+    def _drop_overlay_locked(self, key: Hashable):
+        cached = self._overlays.pop(key, None)
+        if cached is None:
+            return
+        for cell in cached[1]:
+            keys = self._overlays_by_cell.get(cell)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._overlays_by_cell[cell]
+
+    def invalidate(self, points: Optional[Iterable[Tuple[float, float]]]):
+        """Drop overlays of routes passing near these (lat, lng) points; None drops all"""
+        with self._lock:
+            if points is None:
+                self._overlays.clear()
+                self._overlays_by_cell.clear()
+                return
+            for latitude, longitude in points:
+                cell = geohash_utils.encode(latitude, longitude, COVER_PRECISION)
+                for area_cell in geohash_utils.area_cells(cell):
+                    for key in list(self._overlays_by_cell.get(area_cell, ())):
+                        self._drop_overlay_locked(key)
+                        metrics.inc("routes.cache.overlay.invalidated")
+
+    def stats(self) -> dict:
+        counters = metrics.snapshot("routes.cache.")["counters"]
+
+        def ratio(hits: int, misses: int) -> Optional[float]:
+            return round(hits / (hits + misses), 3) if hits + misses else None
+
+        local, remote = counters.get("routes.cache.base.local_hit", 0), counters.get("routes.cache.base.redis_hit", 0)
+        base_misses = counters.get("routes.cache.base.miss", 0)
+        overlay_hits, overlay_misses = counters.get("routes.cache.overlay.hit", 0), counters.get("routes.cache.overlay.miss", 0)
+        return {
+            "base": {
+                "entries": len(self._base),
+                "local_hits": local,
+                "redis_hits": remote,
+                "misses": base_misses,
+                "hit_ratio": ratio(local + remote, base_misses),
+                "avg_miss_ms": round(self._miss_ms["base"], 1),
+            },
+            "overlay": {
+                "entries": len(self._overlays),
+                "hits": overlay_hits,
+                "misses": overlay_misses,
+                "invalidated": counters.get("routes.cache.overlay.invalidated", 0),
+                "hit_ratio": ratio(overlay_hits, overlay_misses),
+                "avg_miss_ms": round(self._miss_ms["overlay"], 1),
+            },
+            "saved_ms": counters.get("routes.cache.saved_ms", 0),
+        }
+
+
+route_cache = RouteCache(settings.ROUTE_CACHE_SIZE)
+
+# Incident changes seen by this worker (its own and, over pub/sub, everyone's)
+incident_index.add_listener(route_cache.invalidate)
@@ -0,0 +1,180 @@
+"""
+Ehreezoh - Map Tiles
+Mapbox vector tiles (ST_AsMVT) of active incidents and online driver
+density, cached per tile in each worker and dropped when an incident in
+the tile changes
+"""
+
+from collections import OrderedDict
+from datetime import datetime
+from typing import Iterable, Iterator, Optional, Tuple
+import math
+import threading
+import time
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.services.incident_index import incident_index
+
+MAX_ZOOM = 22
+EXTENT = 4096  # Tile coordinate space
+BUFFER = 64  # Features this close outside the tile are kept (symbols at edges)
+WEB_MERCATOR_WIDTH_M = 40075016.686
+
+TILE_SQL = text("""
+WITH tile AS (
+    SELECT ST_TileEnvelope(:z, :x, :y) AS envelope
+),
+incident_features AS (
+    SELECT i.id, i.type, i.confirmations, i.is_verified,
+           extract(epoch FROM i.created_at)::bigint AS created_at,
+           ST_AsMVTGeom(
+               ST_Transform(ST_SetSRID(ST_MakePoint(i.longitude, i.latitude), 4326), 3857),
+               tile.envelope, :extent, :buffer
+           ) AS geom
+    FROM incidents i, tile
+    WHERE i.status = 'active'
+      AND (i.expires_at IS NULL OR i.expires_at > :now)
+      AND i.created_at >= :since
+      AND i.latitude BETWEEN :south AND :north
+      AND i.longitude BETWEEN :west AND :east
+    ORDER BY i.created_at DESC
+    LIMIT :max_features
+),
+driver_points AS (
+    SELECT ST_Transform(d.current_location::geometry, 3857) AS point
+    FROM drivers d
+    WHERE d.is_online AND d.is_available AND d.is_verified
+      AND ST_Intersects(d.current_location, ST_MakeEnvelope(:west, :south, :east, :north, 4326)::geography)
+),
+driver_features AS (
+    SELECT count(*) AS drivers,
+           ST_AsMVTGeom(ST_Centroid(ST_Collect(p.point)), tile.envelope, :extent, :buffer) AS geom
+    FROM driver_points p, tile
+    GROUP BY ST_SnapToGrid(p.point, :cell_m), tile.envelope
+)
+SELECT coalesce((SELECT ST_AsMVT(f.*, 'incidents', :extent, 'geom') FROM incident_features f), ''::bytea)
+    || coalesce((SELECT ST_AsMVT(f.*, 'drivers', :extent, 'geom') FROM driver_features f), ''::bytea)
+""")
+
+
+def tile_bounds(z: int, x: int, y: int) -> Tuple[float, float, float, float]:
+    """(west, south, east, north) of a tile in degrees"""
+    n = 2 ** z
+
+    def lat(row: int) -> float:
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * row / n))))
+
+    return x / n * 360 - 180, lat(y + 1), (x + 1) / n * 360 - 180, lat(y)
+
+
+def buffered_bounds(z: int, x: int, y: int) -> Tuple[float, float, float, float]:
+    """tile_bounds grown by BUFFER: the area whose incidents a tile draws"""
+    west, south, east, north = tile_bounds(z, x, y)
+    pad_lng = (east - west) * BUFFER / EXTENT
+    pad_lat = (north - south) * BUFFER / EXTENT
+    return west - pad_lng, south - pad_lat, east + pad_lng, north + pad_lat
+
+
+def tile_for(latitude: float, longitude: float, z: int) -> Tuple[int, int]:
+    """(x, y) of the tile holding a point at zoom z"""
+    n = 2 ** z
+    lat = math.radians(max(-85.0511, min(85.0511, latitude)))
+    x = int((longitude + 180) / 360 * n)
+    y = int((1 - math.asinh(math.tan(lat)) / math.pi) / 2 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+def tiles_drawing(latitude: float, longitude: float, z: int) -> Iterator[Tuple[int, int]]:
+    """(x, y) of the tiles at zoom z whose buffer reaches a point: its own, plus neighbours near an edge"""
+    n = 2 ** z
+    x, y = tile_for(latitude, longitude, z)
+    for nx in range(max(x - 1, 0), min(x + 1, n - 1) + 1):
+        for ny in range(max(y - 1, 0), min(y + 1, n - 1) + 1):
+            west, south, east, north = buffered_bounds(z, nx, ny)
+            if (nx, ny) == (x, y) or (west <= longitude <= east and south <= latitude <= north):
+                yield nx, ny
+
+
+class TileCache:
+    """LRU of rendered tiles with a TTL (driver density goes stale on its own)"""
+
+    def __init__(self, max_tiles: int):
+        self.max_tiles = max_tiles
+        self._tiles: "OrderedDict[Tuple[int, int, int], Tuple[float, bytes]]" = OrderedDict()
+        self._lock = threading.Lock()  # Invalidated from the incident index listener thread
+
+    def get(self, key: Tuple[int, int, int]) -> Optional[bytes]:
+        with self._lock:
+            cached = self._tiles.get(key)
+            if cached is None or cached[0] < time.monotonic():
+                return None
+            self._tiles.move_to_end(key)
+            return cached[1]
+
+    def put(self, key: Tuple[int, int, int], tile: bytes, ttl: float):
+        with self._lock:
+            self._tiles[key] = (time.monotonic() + ttl, tile)
+            self._tiles.move_to_end(key)
+            while len(self._tiles) > self.max_tiles:
+                self._tiles.popitem(last=False)
+
+    def invalidate(self, points: Optional[Iterable[Tuple[float, float]]]):
+        """Drop the tiles drawing these (lat, lng) points at every zoom; None drops all"""
+        with self._lock:
+            if points is None:
+                self._tiles.clear()
+                return
+            for latitude, longitude in points:
+                for z in range(MAX_ZOOM + 1):
+                    for x, y in tiles_drawing(latitude, longitude, z):
+                        self._tiles.pop((z, x, y), None)
+
+    def __len__(self):
+        return len(self._tiles)
+
+
+class TileService:
+
+    def __init__(self):
+        self.cache = TileCache(settings.TILE_CACHE_SIZE)
+
+    async def render(self, db: AsyncSession, z: int, x: int, y: int) -> bytes:
+        """Both layers of one tile, straight from PostGIS"""
+        from app.services.partitioning import active_incidents_since
+
+        west, south, east, north = buffered_bounds(z, x, y)
+        result = await db.execute(TILE_SQL, {
+            "z": z, "x": x, "y": y,
+            "extent": EXTENT, "buffer": BUFFER,
+            "west": west, "south": south, "east": east, "north": north,
+            "now": datetime.utcnow(),
+            "since": active_incidents_since(),
+            "max_features": settings.TILE_MAX_INCIDENTS,
+            "cell_m": WEB_MERCATOR_WIDTH_M / 2 ** z / settings.TILE_DENSITY_GRID,
+        })
+        return bytes(result.scalar() or b"")
+
+    async def get_tile(self, db: AsyncSession, z: int, x: int, y: int) -> bytes:
+        key = (z, x, y)
+        tile = self.cache.get(key) if settings.TILE_CACHE_TTL > 0 else None
+        if tile is not None:
+            metrics.inc("tiles.cache.hit")
+            return tile
+        metrics.inc("tiles.cache.miss")
+
+        started = time.perf_counter()
+        tile = await self.render(db, z, x, y)
+        metrics.observe("tiles.render", (time.perf_counter() - started) * 1000)
+        if settings.TILE_CACHE_TTL > 0:
+            self.cache.put(key, tile, settings.TILE_CACHE_TTL)
+        return tile
+
+
+tile_service = TileService()
+
+# Incident changes seen by this worker (its own and, over pub/sub, everyone's)
+incident_index.add_listener(tile_service.cache.invalidate)
@@ -0,0 +1,192 @@
+"""
+Ehreezoh - Incident Verification
+Community votes ('still_there' / 'all_clear') and the per-incident tallies
+they keep: weighted confirmations verify an incident, all-clears resolve it
+"""
+
+from datetime import datetime
+from typing import NamedTuple, Optional
+import logging
+
+from sqlalchemy import case, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.community import IncidentVerification
+from app.models.incident import Incident
+from app.models.user import User
+from app.services.gamification import gamification_service
+
+logger = logging.getLogger(__name__)
+
+VERIFICATION_TYPES = ('still_there', 'all_clear')
+
+
+class VoteResult(NamedTuple):
+    recorded: bool  # False: the user had already cast this vote
+    confirmations: int
+    confirmation_weight: float
+    all_clear_count: int
+    is_verified: bool
+    status: str
+    verified_now: bool  # This vote took the incident over the verification threshold
+    resolved_now: bool  # ...or the all-clear threshold
+
+
+def vote_weight(user: User) -> float:
+    """A vote counts for the voter's trust score / 100 (at least 0.1)"""
+    return max(0.1, (user.trust_score or 0) / 100.0)
+
+
+class VerificationService:
+
+    def tally_deltas(self, verification_type: str, weight: float, previous=None) -> dict:
+        """
+        Changes to (confirmations, confirmation_weight, all_clear_count) for a
+        vote, taking back the user's `previous` (type, weight) vote if any
+        """
+        confirmations, confirmation_weight, all_clear_count = 0, 0.0, 0
+        if verification_type == 'still_there':
+            confirmations, confirmation_weight = 1, weight
+        else:
+            all_clear_count = 1
+        if previous is not None:
+            if previous.verification_type == 'still_there':
+                confirmations -= 1
+                confirmation_weight -= float(previous.weight or 0)
+            else:
+                all_clear_count -= 1
+        return {
+            "confirmations": confirmations,
+            "confirmation_weight": confirmation_weight,
+            "all_clear_count": all_clear_count,
+        }
+
+    def tally_update(self, incident_id: str, deltas: dict, now: datetime, **values):
+        """
+        UPDATE of an active incident's tallies. Thresholds are applied to the
+        new tallies in the same statement; RETURNING gives them back.
+        verified_at is set (to `now`) only by the update that verifies it.
+        """
+        confirmation_weight = func.coalesce(Incident.confirmation_weight, 0) + deltas["confirmation_weight"]
+        all_clear_count = func.coalesce(Incident.all_clear_count, 0) + deltas["all_clear_count"]
+        verifies = (confirmation_weight >= settings.INCIDENT_VERIFY_WEIGHT) & ~func.coalesce(Incident.is_verified, False)
+        return (
+            update(Incident)
+            .where(Incident.id == incident_id, Incident.status == 'active')
+            .values(
+                confirmations=func.coalesce(Incident.confirmations, 0) + deltas["confirmations"],
+                confirmation_weight=confirmation_weight,
+                all_clear_count=all_clear_count,
+                is_verified=case((verifies, True), else_=Incident.is_verified),
+                verified_at=case((verifies, now), else_=Incident.verified_at),
+                status=case((all_clear_count >= settings.INCIDENT_RESOLVE_ALL_CLEARS, 'resolved'), else_=Incident.status),
+                **values
+            )
+            .returning(
+                Incident.confirmations, Incident.confirmation_weight, Incident.all_clear_count,
+                Incident.is_verified, Incident.verified_at, Incident.status
+            )
+            .execution_options(synchronize_session=False)
+        )
+
+    async def vote(
+        self,
+        db: AsyncSession,
+        incident: Incident,
+        user: User,
+        verification_type: str,
+        **values
+    ) -> Optional[VoteResult]:
+        """
+        Record `user`'s vote on `incident` and apply it to the tallies. A vote
+        of the other type replaces the user's earlier one. Extra `values` go
+        into the same incident UPDATE. Returns None if the incident is no
+        longer active.
+        """
+        # Votes on one incident take turns (row lock until commit)
+        status = (await db.execute(
+            select(Incident.status).where(Incident.id == incident.id).with_for_update()
+        )).scalar()
+        if status != 'active':
+            await db.commit()
+            return None
+
+        previous = (await db.execute(
+            select(IncidentVerification)
+            .where(IncidentVerification.incident_id == incident.id, IncidentVerification.user_id == user.id)
+        )).scalar_one_or_none()
+        if previous is not None and previous.verification_type == verification_type:
+            await db.commit()
+            return VoteResult(
+                False, incident.confirmations or 0, incident.confirmation_weight or 0.0,
+                incident.all_clear_count or 0, bool(incident.is_verified), status, False, False
+            )
+
+        weight = vote_weight(user)
+        deltas = self.tally_deltas(verification_type, weight, previous)
+        first_vote = previous is None
+        if first_vote:
+            db.add(IncidentVerification(
+                incident_id=incident.id,
+                user_id=user.id,
+                verification_type=verification_type,
+                weight=weight
+            ))
+        else:
+            previous.verification_type = verification_type
+            previous.weight = weight
+            previous.created_at = datetime.utcnow()
+
+        now = datetime.utcnow()
+        tallies = (await db.execute(self.tally_update(incident.id, deltas, now, **values))).first()
+        result = VoteResult(
+            recorded=True,
+            confirmations=tallies.confirmations,
+            confirmation_weight=tallies.confirmation_weight,
+            all_clear_count=tallies.all_clear_count,
+            is_verified=bool(tallies.is_verified),
+            status=tallies.status,
+            verified_now=tallies.verified_at == now,
+            resolved_now=tallies.status == 'resolved',
+        )
+        reporter_id = incident.user_id if result.verified_now else None
+
+        def award(session: Session):
+            if first_vote:
+                gamification_service.award_points(session, user.id, 2, "incident_verification")
+            if reporter_id:
+                reporter = session.get(User, reporter_id)
+                if reporter:
+                    reporter.trust_score = min(1000, (reporter.trust_score or 0) + 10)
+                    gamification_service.award_points(session, reporter_id, 10, "report_verified")
+
+        await db.run_sync(award)
+        await db.commit()
+        await db.refresh(incident)
+        return result
+
+    async def announce(self, incident: Incident, verification_type: str):
+        """Every worker's incident index, and an incident_verified message to the area"""
+        from app.core import geohash as geohash_utils
+        from app.core.websocket import EventType, create_event, manager
+        from app.services.incident_index import incident_index
+
+        incident_index.publish(incident)
+        await manager.broadcast_to_area(
+            center_geohash=geohash_utils.alert_geohash(incident.latitude, incident.longitude, incident.type),
+            message=create_event(
+                event_type=EventType.INCIDENT_VERIFIED,
+                data={
+                    "incident_id": incident.id,
+                    "verification_type": verification_type,
+                    "confirmations": incident.confirmations,
+                    "status": incident.status
+                }
+            ),
+            include_neighbors=True
+        )
+
+
+verification_service = VerificationService()
@@ -0,0 +1,136 @@
+import pytest
+from geoalchemy2.elements import WKTElement
+
+from app.models.community import IncidentVerification
+from app.models.incident import Incident
+from app.models.user import User
+from app.services.incident_index import incident_index
+
+
+@pytest.fixture(scope="module")
+def feed_incidents(db_session, test_user):
+    incidents = [
+        Incident(user_id=test_user.id, type="traffic", latitude=4.05 + i * 0.001, longitude=9.7,
+                 location=WKTElement(f"POINT(9.7 {4.05 + i * 0.001})", srid=4326), status="active",
+                 confirmations=1, all_clear_count=1)  # Tallies of the votes below
+        for i in range(10)
+    ]
+    incidents[-1].status = "resolved"
+    db_session.add_all(incidents)
+    db_session.flush()
+    db_session.add_all(
+        IncidentVerification(incident_id=inc.id, user_id=test_user.id, verification_type=kind)
+        for inc in incidents for kind in ("still_there", "all_clear")
+    )
+    db_session.commit()
+    for inc in incidents:
+        incident_index.publish(inc)
+    yield incidents
+    incident_index.publish_removed([inc.id for inc in incidents])
+    db_session.query(IncidentVerification).filter(
+        IncidentVerification.incident_id.in_([inc.id for inc in incidents])
+    ).delete(synchronize_session=False)
+    for inc in incidents:
+        db_session.delete(inc)
+    db_session.commit()
+
+
+def test_incident_feed_query_budget(client, mock_user_token, query_budget, feed_incidents):
+    headers = {"Authorization": f"Bearer {mock_user_token}"}
+    # auth + incident page + reporters/badges, whatever the page size
+    with query_budget(3):
+        response = client.get("/api/v1/incidents/feed?limit=9", headers=headers)
+    assert response.status_code == 200
+    items = response.json()["items"]
+    assert len(items) == 9
+    assert items[0]["reporter"]["name"] == "Test User"
+    assert items[0]["verifications"] == {"still_there": 1, "all_clear": 1}
+
+
+def test_nearby_incidents_are_active_nearest_first_and_capped(client, feed_incidents):
+    response = client.get("/api/v1/incidents/?latitude=4.05&longitude=9.7&radius_km=2&limit=5")
+    assert response.status_code == 200
+    ids = [item["id"] for item in response.json()]
+    assert ids == [inc.id for inc in feed_incidents[:5]]
+
+
+def test_nearby_incidents_radius_is_bounded(client):
+    response = client.get("/api/v1/incidents/?latitude=4.05&longitude=9.7&radius_km=500")
+    assert response.status_code == 422
+
+
+def test_incident_clusters(client, feed_incidents):
+    response = client.get("/api/v1/incidents/clusters?latitude=4.05&longitude=9.7&zoom=8")
+    assert response.status_code == 200
+    clusters = response.json()
+    assert sum(cluster["count"] for cluster in clusters) >= 9
+
+
+def test_duplicate_report_merges_into_existing_incident(client, mock_user_token, mock_driver_token):
+    report = {"type": "accident", "latitude": 4.2001, "longitude": 9.9001}
+    first = client.post("/api/v1/incidents/", json=report, headers={"Authorization": f"Bearer {mock_user_token}"})
+    assert first.status_code == 201
+
+    nearby = {**report, "latitude": 4.2005}  # ~45m away
+    second = client.post("/api/v1/incidents/", json=nearby, headers={"Authorization": f"Bearer {mock_driver_token}"})
+    assert second.status_code == 200
+    assert second.json()["id"] == first.json()["id"]
+    assert second.json()["confirmations"] == 1
+
+
+def test_report_side_effects_are_queued_in_the_outbox(client, mock_user_token, db_session):
+    from app.models.outbox import OutboxEvent
+    from app.services.outbox import INCIDENT_REPORT_ALERT, INCIDENT_REPORT_POINTS
+
+    report = {"type": "road_hazard", "latitude": 4.3001, "longitude": 9.8001}
+    response = client.post("/api/v1/incidents/", json=report, headers={"Authorization": f"Bearer {mock_user_token}"})
+    assert response.status_code == 201
+
+    topics = {
+        event.topic for event in db_session.query(OutboxEvent).filter(
+            OutboxEvent.payload["incident_id"].astext == response.json()["id"]
+        )
+    }
+    assert topics == {INCIDENT_REPORT_POINTS, INCIDENT_REPORT_ALERT}
+
+
+def test_votes_keep_incident_tallies(client, mock_user_token, mock_driver_token, db_session):
+    report = {"type": "police", "latitude": 4.4001, "longitude": 9.6001}
+    db_session.query(User).filter(User.id == "test_user_id").update({"trust_score": 100})
+    db_session.commit()
+    incident_id = client.post(
+        "/api/v1/incidents/", json=report, headers={"Authorization": f"Bearer {mock_user_token}"}
+    ).json()["id"]
+    voter = {"Authorization": f"Bearer {mock_driver_token}"}
+
+    vote = lambda kind: client.post(f"/api/v1/incidents/{incident_id}/verify", json={"verification_type": kind}, headers=voter)
+    assert vote("still_there").status_code == 200
+    assert vote("still_there").status_code == 400  # Same vote again
+    assert vote("all_clear").status_code == 200  # Changed their mind
+
+    incident = db_session.get(Incident, incident_id)
+    db_session.refresh(incident)
+    assert (incident.confirmations, incident.confirmation_weight, incident.all_clear_count) == (0, 0, 1)
+
+
+def test_incident_changes_since_cursor(client, mock_user_token, monkeypatch):
+    from app.core.config import settings
+    monkeypatch.setattr(settings, "INCIDENT_CHANGES_LAG_SECONDS", 0)
+    area = "/api/v1/incidents/changes?latitude=4.5001&longitude=9.5001&radius_km=1"
+
+    snapshot = client.get(area)
+    assert snapshot.status_code == 200 and snapshot.json()["full"] is True
+    cursor = snapshot.json()["cursor"]
+
+    unchanged = client.get(f"{area}&since={cursor}")
+    assert unchanged.status_code == 304 and unchanged.headers["X-Next-Cursor"]
+
+    report = {"type": "accident", "latitude": 4.5001, "longitude": 9.5001}
+    incident_id = client.post(
+        "/api/v1/incidents/", json=report, headers={"Authorization": f"Bearer {mock_user_token}"}
+    ).json()["id"]
+    delta = client.get(f"{area}&since={unchanged.headers['X-Next-Cursor']}").json()
+    assert delta["full"] is False
+    assert [(i["id"], i["status"]) for i in delta["incidents"]] == [(incident_id, "active")]
+
+    assert client.get(f"{area}&since=not-a-cursor").status_code == 400
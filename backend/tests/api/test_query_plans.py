@@ -0,0 +1,135 @@
+"""
+EXPLAIN regression tests for hot query shapes.
+
+Each query mirrors a router query. With sequential scans disabled the
+planner picks any usable index, so a "Seq Scan" in the plan means the
+supporting index is missing (dropped, renamed, or the query shape drifted).
+"""
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import text
+
+from app.core.database import engine
+
+
+HOT_QUERIES = {
+    # GET /rides/
+    "my_rides": (
+        "rides",
+        "SELECT * FROM rides WHERE passenger_id = 'test_user_id' OR driver_id = 'test_driver_id' "
+        "ORDER BY requested_at DESC, id DESC LIMIT 21",
+    ),
+    # GET /incidents/feed
+    "incident_feed": (
+        "incidents",
+        "SELECT * FROM incidents WHERE status = 'active' ORDER BY created_at DESC, id DESC LIMIT 21",
+    ),
+    # GET /incidents/feed?latitude=&longitude= (bounding box)
+    "incident_bbox": (
+        "incidents",
+        "SELECT * FROM incidents WHERE latitude BETWEEN 3.80 AND 3.90 AND longitude BETWEEN 11.45 AND 11.55",
+    ),
+    # GET /incidents/
+    "incident_radius": (
+        "incidents",
+        "SELECT id FROM incidents WHERE status = 'active' AND ST_DWithin(location, "
+        "ST_SetSRID(ST_MakePoint(11.50, 3.85), 4326)::geography, 5000) "
+        "ORDER BY ST_Distance(location, ST_SetSRID(ST_MakePoint(11.50, 3.85), 4326)::geography) LIMIT 100",
+    ),
+    # GET /incidents/changes
+    "incident_changes": (
+        "incidents",
+        "SELECT id FROM incidents WHERE updated_at >= now() - interval '1 minute' AND updated_at < now() "
+        "ORDER BY updated_at LIMIT 501",
+    ),
+    # POST /routes/analyze (every alternative in one query)
+    "route_incidents": (
+        "incidents",
+        "SELECT routes.route_idx, incidents.id FROM incidents JOIN (VALUES "
+        "(0, ST_GeogFromText('SRID=4326;LINESTRING(11.50 3.85, 11.55 3.90)')), "
+        "(1, ST_GeogFromText('SRID=4326;LINESTRING(11.50 3.85, 11.52 3.88, 11.55 3.90)'))) AS routes (route_idx, route) "
+        "ON ST_DWithin(incidents.location, routes.route, 200, true) WHERE incidents.status = 'active'",
+    ),
+    # GET /drivers/nearby
+    "nearby_drivers": (
+        "drivers",
+        "SELECT id FROM drivers WHERE ST_DWithin(current_location, "
+        "ST_SetSRID(ST_MakePoint(11.50, 3.85), 4326)::geography, 5000)",
+    ),
+    # GET /chat/rooms/{room_id}/messages
+    "room_messages": (
+        "chat_messages",
+        "SELECT * FROM chat_messages WHERE room_id = 'room' AND is_deleted = false "
+        "ORDER BY created_at DESC, id DESC LIMIT 51",
+    ),
+    # Feed verification tallies
+    "verification_counts": (
+        "incident_verifications",
+        "SELECT incident_id, verification_type, count(id) FROM incident_verifications "
+        "WHERE incident_id IN ('incident', 'other') GROUP BY incident_id, verification_type",
+    ),
+    # Followers / following counts
+    "follower_count": (
+        "user_follows",
+        "SELECT count(id) FROM user_follows WHERE followed_id = 'test_user_id'",
+    ),
+    # GET /leaderboard
+    "leaderboard": (
+        "users",
+        "SELECT * FROM users ORDER BY points DESC LIMIT 10",
+    ),
+    # Outbox worker claim
+    "outbox_claim": (
+        "outbox_events",
+        "SELECT id FROM outbox_events WHERE processed_at IS NULL AND available_at <= now() "
+        "ORDER BY id LIMIT 50 FOR UPDATE SKIP LOCKED",
+    ),
+}
+
+
+@pytest.fixture(scope="module")
+def seeded_plans(db_session):
+    """
+    Seed incidents (mixed statuses around Yaounde), ANALYZE, and EXPLAIN
+    every hot query. Everything runs in one rolled-back transaction.
+    """
+    plans = {}
+    with engine.connect() as conn:
+        trans = conn.begin()
+        try:
+            now = datetime.utcnow()
+            conn.execute(
+                text(
+                    "INSERT INTO incidents (id, type, latitude, longitude, location, status, created_at) "
+                    "VALUES (:id, 'traffic', :lat, :lng, "
+                    "ST_SetSRID(ST_MakePoint(:lng, :lat), 4326)::geography, :status, :created_at)"
+                ),
+                [
+                    {
+                        "id": str(uuid.uuid4()),
+                        "lat": 3.0 + (i % 100) * 0.02,
+                        "lng": 11.0 + (i // 100) * 0.05,
+                        "status": "active" if i % 5 == 0 else "resolved",
+                        "created_at": now - timedelta(minutes=i),
+                    }
+                    for i in range(2000)
+                ],
+            )
+            for table in {table for table, _ in HOT_QUERIES.values()}:
+                conn.execute(text(f"ANALYZE {table}"))
+
+            conn.execute(text("SET LOCAL enable_seqscan = off"))
+            for name, (table, sql) in HOT_QUERIES.items():
+                rows = conn.execute(text(f"EXPLAIN {sql}")).scalars().all()
+                plans[name] = (table, "\n".join(rows))
+        finally:
+            trans.rollback()
+    return plans
+
+
+@pytest.mark.parametrize("name", sorted(HOT_QUERIES))
+def test_hot_query_uses_index(seeded_plans, name):
+    table, plan = seeded_plans[name]
+    assert f"Seq Scan on {table}" not in plan, f"{name} fell back to a sequential scan:\n{plan}"
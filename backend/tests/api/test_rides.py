@@ -4,3 +4,8 @@ def test_create_ride_unauthorized(client):
     assert response.status_code in [401, 403]
 
 
+def test_my_rides_query_budget(client, mock_user_token, query_budget):
+    headers = {"Authorization": f"Bearer {mock_user_token}"}
+    with query_budget(3):
+        response = client.get("/api/v1/rides/", headers=headers)
+    assert response.status_code == 200
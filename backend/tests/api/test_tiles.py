@@ -0,0 +1,25 @@
+from geoalchemy2.elements import WKTElement
+
+from app.models.incident import Incident
+from app.services.tiles import tile_for
+
+
+def test_incident_tile(client, db_session, test_user):
+    incident = Incident(user_id=test_user.id, type="accident", latitude=4.61, longitude=9.41,
+                        location=WKTElement("POINT(9.41 4.61)", srid=4326), status="active")
+    db_session.add(incident)
+    db_session.commit()
+    try:
+        x, y = tile_for(4.61, 9.41, 14)
+        response = client.get(f"/api/v1/tiles/14/{x}/{y}.mvt")
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/vnd.mapbox-vector-tile"
+        assert b"incidents" in response.content and incident.id.encode() in response.content
+    finally:
+        db_session.delete(incident)
+        db_session.commit()
+
+
+def test_tile_out_of_range(client):
+    assert client.get("/api/v1/tiles/2/4/0.mvt").status_code == 400
+    assert client.get("/api/v1/tiles/23/0/0.mvt").status_code == 422
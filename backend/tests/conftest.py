@@ -6,6 +6,7 @@ from app.core.database import SessionLocal, engine
 from app.models.user import User
 from app.models.driver import Driver
 from app.core.auth import create_access_token
+from app.core.query_stats import assert_max_queries
 
 @pytest.fixture(scope="module")
 def client():
@@ -81,3 +82,13 @@ def test_driver(db_session):
 @pytest.fixture(scope="module")
 def mock_driver_token(test_driver):
     return create_access_token(data={"sub": test_driver.id, "role": "driver"})
+
+@pytest.fixture
+def query_budget():
+    """
+    Assert a maximum number of SQL statements per request:
+
+        with query_budget(6):
+            client.get("/api/v1/rides/", headers=headers)
+    """
+    return assert_max_queries
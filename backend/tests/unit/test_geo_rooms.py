@@ -0,0 +1,41 @@
+import pygeohash as pgh
+from app.core import geohash as geohash_utils
+from app.core.websocket import ConnectionManager
+
+
+def test_neighbors_are_adjacent_cells():
+    cell = pgh.encode(4.0511, 9.7679, precision=6)
+    neighbors = geohash_utils.neighbors(cell)
+    assert len(neighbors) == 8
+    assert cell not in neighbors
+    assert all(len(n) == 6 for n in neighbors)
+    assert len(set(neighbors)) == 8
+
+def test_precision_for_radius():
+    assert geohash_utils.precision_for_radius(3000) == 5
+    assert geohash_utils.precision_for_radius(500) == 6
+    assert geohash_utils.precision_for_radius(100) == 7
+
+def test_subscription_indexed_at_all_precisions():
+    manager = ConnectionManager()
+    gh = geohash_utils.encode(4.0511, 9.7679)
+    manager.update_geohash_subscription("u1", gh)
+    for precision in geohash_utils.subscription_precisions():
+        assert "u1" in manager.geo_rooms[gh[:precision]]
+
+def test_area_subscribers_include_neighbours():
+    manager = ConnectionManager()
+    center = geohash_utils.encode(4.0511, 9.7679, precision=6)
+    neighbor = geohash_utils.neighbors(center)[0]
+    manager.update_geohash_subscription("near", neighbor + "0")
+    assert "near" in manager.get_area_subscribers(center)
+    assert "near" not in manager.get_area_subscribers(center, include_neighbors=False)
+
+def test_resubscribe_and_disconnect_clean_up_rooms():
+    manager = ConnectionManager()
+    manager.update_geohash_subscription("u1", geohash_utils.encode(4.0511, 9.7679))
+    manager.update_geohash_subscription("u1", geohash_utils.encode(3.8667, 11.5167))
+    assert all(room == {"u1"} for room in manager.geo_rooms.values())
+    assert len(manager.geo_rooms) == len(geohash_utils.subscription_precisions())
+    manager.disconnect("u1")
+    assert manager.geo_rooms == {}
@@ -0,0 +1,108 @@
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import create_engine, inspect
+from sqlalchemy.orm import Session
+
+from app.core import identity as identity_module
+from app.core.identity import load_identity, restore, snapshot
+from app.core.query_stats import track_queries
+from app.models.driver import Driver
+from app.models.user import User
+
+
+class FakeRedis:
+    def __init__(self):
+        self.identities = {}
+        self.invalidated = []
+
+    def get_identity(self, user_id):
+        return self.identities.get(user_id)
+
+    def cache_identity(self, user_id, identity, ttl_seconds=None):
+        self.identities[user_id] = identity
+        return True
+
+    def invalidate_identity(self, *user_ids):
+        self.invalidated.extend(user_ids)
+        return True
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    fake = FakeRedis()
+    monkeypatch.setattr(identity_module, "redis_service", fake)
+    return fake
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://")
+    User.__table__.create(engine)
+    return engine
+
+
+def make_user(**kwargs):
+    values = dict(id="u1", phone_number="+237600000000", phone_hash="secret", firebase_uid="fb1",
+                  full_name="Ada", is_active=True, is_banned=False, is_driver=True,
+                  points=10, created_at=datetime(2024, 12, 1, 8, 30))
+    values.update(kwargs)
+    return User(**values)
+
+
+def make_driver():
+    return Driver(id="d1", user_id="u1", driver_license_number="L1", vehicle_type="moto",
+                  vehicle_plate_number="CE-1", is_online=True, is_verified=True,
+                  average_rating=Decimal("4.75"), current_latitude=Decimal("3.85"))
+
+
+def test_snapshot_round_trip_restores_types_and_skips_excluded():
+    data = snapshot(make_user(), make_driver())
+    assert "phone_hash" not in data["user"]
+    assert "current_latitude" not in data["driver"]
+
+    user, driver = restore(data)
+    assert user.created_at == datetime(2024, 12, 1, 8, 30)
+    assert driver.average_rating == Decimal("4.75")
+    assert inspect(user).detached and inspect(driver).detached
+    assert "phone_hash" in inspect(user).expired_attributes
+
+
+def test_cache_hit_attaches_without_queries(redis):
+    redis.identities["u1"] = snapshot(make_user(), make_driver())
+    db = Session(create_engine("sqlite://"))
+
+    with track_queries() as stats:
+        cached = load_identity(db, "u1")
+
+    assert stats.count == 0
+    assert cached.user in db and cached.driver in db
+    assert cached.driver.is_online and cached.user.full_name == "Ada"
+
+
+def test_commit_invalidates_changed_user(redis, engine):
+    with Session(engine) as db:
+        db.add(make_user())
+        db.commit()
+        redis.invalidated.clear()
+
+        user = db.get(User, "u1")
+        user.full_name = "Ada L."
+        db.commit()
+
+    assert redis.invalidated == ["u1"]
+
+
+def test_rollback_discards_pending_invalidation(redis, engine):
+    with Session(engine) as db:
+        db.add(make_user())
+        db.commit()
+        redis.invalidated.clear()
+
+        user = db.get(User, "u1")
+        user.is_banned = True
+        db.flush()
+        db.rollback()
+
+    assert redis.invalidated == []
@@ -0,0 +1,70 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy.dialects import postgresql
+
+from app.core.config import settings
+from app.services.incident_changes import IncidentChangesService, decode_cursor, encode_cursor
+
+
+class FakeResult:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def scalars(self):
+        return self
+
+    def all(self):
+        return self.rows
+
+
+class FakeSession:
+    """Answers each execute() with the next canned row list"""
+
+    def __init__(self, *results):
+        self.results = list(results)
+        self.statements = []
+
+    async def execute(self, statement):
+        self.statements.append(statement)
+        return FakeResult(self.results.pop(0))
+
+
+def test_cursor_round_trips_and_lags_behind_now():
+    service = IncidentChangesService()
+    now = datetime(2025, 1, 4, 12, 0, 0, 123456, tzinfo=timezone.utc)
+    watermark = service.watermark(now)
+    assert watermark == now - timedelta(seconds=settings.INCIDENT_CHANGES_LAG_SECONDS)
+    assert decode_cursor(encode_cursor(watermark)) == watermark
+    assert service.is_stale(now - timedelta(seconds=settings.INCIDENT_CHANGES_MAX_AGE_SECONDS + 1), now)
+    assert not service.is_stale(watermark, now)
+
+
+def test_delta_is_an_updated_at_range_in_any_status():
+    since = datetime(2025, 1, 4, tzinfo=timezone.utc)
+    statement = IncidentChangesService().delta_query(4.05, 9.7, 5, since, since + timedelta(minutes=1), 501)
+    sql = str(statement.compile(dialect=postgresql.dialect()))
+
+    assert "incidents.updated_at >= %(updated_at_1)s AND incidents.updated_at < %(updated_at_2)s" in sql
+    assert "incidents.created_at >=" in sql and "ST_DWithin" in sql
+    assert "status" not in sql.split("WHERE")[1]
+    assert "ORDER BY incidents.updated_at" in sql
+
+
+def test_changes_fall_back_to_a_snapshot():
+    service = IncidentChangesService()
+    recent = datetime.now(timezone.utc) - timedelta(minutes=1)
+
+    db = FakeSession([])
+    changes = asyncio.run(service.changes(db, 4.05, 9.7, 5, recent, limit=2))
+    assert not changes.full and changes.incidents == [] and len(db.statements) == 1
+    assert decode_cursor(changes.cursor) > recent
+
+    db = FakeSession(["a", "b", "c"], ["snapshot"])  # More changes than the limit
+    changes = asyncio.run(service.changes(db, 4.05, 9.7, 5, recent, limit=2))
+    assert changes.full and changes.incidents == ["snapshot"]
+
+    for since in (None, recent - timedelta(days=1)):
+        db = FakeSession(["snapshot"])
+        changes = asyncio.run(service.changes(db, 4.05, 9.7, 5, since, limit=2))
+        assert changes.full and len(db.statements) == 1
@@ -0,0 +1,46 @@
+import asyncio
+from datetime import datetime
+
+from sqlalchemy.dialects import postgresql
+
+from app.core.config import settings
+from app.services.incident_expiry import IncidentExpiryService, expires_at_for, expiry_seconds
+
+
+def test_expiry_per_type():
+    assert expiry_seconds("traffic") == settings.INCIDENT_EXPIRY_TRAFFIC_JAM
+    assert expiry_seconds("Accident") == settings.INCIDENT_EXPIRY_ACCIDENT
+    assert expiry_seconds("hazard") == settings.INCIDENT_EXPIRY_ROAD_HAZARD
+    assert expiry_seconds("police") == settings.INCIDENT_EXPIRY_DEFAULT
+
+    reported = datetime(2024, 12, 1, 8, 0)
+    assert expires_at_for("traffic", reported) == datetime(2024, 12, 1, 8, 30)
+
+
+def test_expired_incidents_grouped_by_alert_cell():
+    expired = [
+        {"id": "a", "type": "accident", "latitude": 3.8480, "longitude": 11.5021},
+        {"id": "b", "type": "accident", "latitude": 3.8481, "longitude": 11.5022},
+        {"id": "c", "type": "accident", "latitude": 4.0511, "longitude": 9.7679},
+    ]
+    areas = IncidentExpiryService().group_by_area(expired)
+    assert sorted(areas.values()) == [["a", "b"], ["c"]]
+
+
+def test_expire_due_is_one_update_returning_positions():
+    captured = []
+
+    class FakeSession:
+        async def execute(self, statement):
+            captured.append(statement)
+            return []
+
+        async def commit(self):
+            pass
+
+    asyncio.run(IncidentExpiryService().expire_due(FakeSession(), now=datetime(2024, 12, 1)))
+
+    sql = str(captured[0].compile(dialect=postgresql.dialect()))
+    assert len(captured) == 1
+    assert sql.startswith("UPDATE incidents SET status=")
+    assert "RETURNING incidents.id, incidents.type, incidents.latitude, incidents.longitude" in sql
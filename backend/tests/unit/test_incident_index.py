@@ -0,0 +1,77 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.services.incident_index import IncidentIndex, IndexedIncident
+
+
+def make_incident(id, latitude, longitude, minutes_ago=0, **kwargs):
+    values = dict(id=id, user_id="u1", type="traffic", description=None, latitude=latitude,
+                  longitude=longitude, media_url=None, status="active", is_verified=False,
+                  confirmations=0, created_at=datetime.utcnow() - timedelta(minutes=minutes_ago),
+                  expires_at=None)
+    values.update(kwargs)
+    return IndexedIncident(**values)
+
+
+@pytest.fixture
+def index():
+    index = IncidentIndex(cell_deg=0.05)
+    index.replace([
+        make_incident("near", 3.851, 11.501, minutes_ago=30),
+        make_incident("mid", 3.87, 11.50, minutes_ago=5),
+        make_incident("far", 3.95, 11.50),  # ~11km north
+        make_incident("expired", 3.85, 11.50, expires_at=datetime.utcnow() - timedelta(minutes=1)),
+        make_incident("stale", 3.85, 11.50, minutes_ago=60 * 24 * 30),
+    ])
+    return index
+
+
+def test_nearby_filters_radius_and_expiry(index):
+    assert [i.id for i in index.nearby(3.85, 11.50, radius_km=5)] == ["near", "mid"]
+    assert [i.id for i in index.nearby(3.85, 11.50, radius_km=5, order_by="recent")] == ["mid", "near"]
+    assert [i.id for i in index.nearby(3.85, 11.50, radius_km=20, limit=1)] == ["near"]
+
+
+def test_apply_upsert_and_remove(index):
+    moved = make_incident("near", 3.95, 11.50, status="active")
+    index.apply({"op": "upsert", "incident": moved.to_message()})
+    assert "near" not in [i.id for i in index.nearby(3.85, 11.50, radius_km=5)]
+
+    index.apply({"op": "upsert", "incident": make_incident("mid", 3.87, 11.50, status="resolved").to_message()})
+    index.apply({"op": "remove", "ids": ["far"]})
+    assert index.nearby(3.85, 11.50, radius_km=50) == [index._by_id["near"]]
+
+
+
+def test_messages_without_all_clear_count_still_apply(index):
+    message = make_incident("mid", 3.87, 11.50, all_clear_count=2).to_message()
+    assert IndexedIncident.from_message(message).all_clear_count == 2
+    del message["all_clear_count"]  # From a worker running the previous release
+    index.apply({"op": "upsert", "incident": message})
+    assert index._by_id["mid"].all_clear_count == 0
+
+def test_feed_pages_walk_newest_first(index):
+    seen, cursor = [], None
+    while True:
+        (items, cursor), total = index.feed_page(limit=1, cursor=cursor)
+        seen.extend(i.id for i in items)
+        if cursor is None:
+            break
+    assert seen == ["far", "mid", "near"]
+    assert total == 3
+
+
+def test_stats_report_size_and_readiness(index):
+    stats = index.stats()
+    assert stats["incidents"] == 5
+    assert stats["approx_memory_bytes"] > 0
+    assert not stats["ready"]  # Loaded, but no listener subscribed
+
+
+def test_nearest_recent_matches_type_and_window(index):
+    minutes_ago = lambda minutes: datetime.utcnow() - timedelta(minutes=minutes)
+    assert index.nearest_recent(3.85, 11.50, "Traffic", 3, minutes_ago(60)).id == "near"
+    assert index.nearest_recent(3.85, 11.50, "traffic", 3, minutes_ago(15)).id == "mid"
+    assert index.nearest_recent(3.85, 11.50, "traffic", 1, minutes_ago(15)) is None
+    assert index.nearest_recent(3.85, 11.50, "accident", 3, minutes_ago(60)) is None
@@ -0,0 +1,91 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from sqlalchemy.dialects import postgresql
+
+from app.core.config import settings
+from app.services.outbox import OutboxWorker
+
+
+class FakeSession:
+    def __init__(self):
+        self.statements = []
+
+    async def execute(self, statement):
+        self.statements.append(statement)
+        return []
+
+    async def commit(self):
+        pass
+
+
+def sql(statement):
+    return str(statement.compile(dialect=postgresql.dialect()))
+
+
+def test_claim_leases_due_events_skipping_locked_rows():
+    db = FakeSession()
+    asyncio.run(OutboxWorker().claim(db, 10, now=datetime(2024, 12, 1)))
+    statement = sql(db.statements[0])
+    assert len(db.statements) == 1
+    assert statement.startswith("UPDATE outbox_events SET available_at=")
+    assert "FOR UPDATE SKIP LOCKED" in statement
+    assert "RETURNING outbox_events.id, outbox_events.topic" in statement
+
+
+def test_handler_errors_are_reported_not_raised(monkeypatch):
+    worker = OutboxWorker()
+
+    async def ok(payload):
+        pass
+
+    async def broken(payload):
+        raise RuntimeError("redis down")
+
+    monkeypatch.setattr(worker, "handlers", lambda: {"ok": ok, "broken": broken})
+    assert asyncio.run(worker.handle({"id": 1, "topic": "ok", "payload": {}})) is None
+    assert asyncio.run(worker.handle({"id": 2, "topic": "broken", "payload": {}})) == "RuntimeError: redis down"
+    assert "No handler" in asyncio.run(worker.handle({"id": 3, "topic": "missing", "payload": {}}))
+
+
+def test_failures_back_off_then_give_up():
+    worker = OutboxWorker()
+    now = datetime(2024, 12, 1)
+    events = [
+        {"id": 1, "topic": "t", "created_at": now - timedelta(seconds=1), "attempts": 1},
+        {"id": 2, "topic": "t", "created_at": now, "attempts": 1},
+        {"id": 3, "topic": "t", "created_at": now, "attempts": settings.OUTBOX_MAX_ATTEMPTS},
+    ]
+    db = FakeSession()
+    asyncio.run(worker.record(db, events, [None, "boom", "boom"], now=now))
+
+    done, retry, dead = (statement.compile(dialect=postgresql.dialect()).params for statement in db.statements)
+    assert done["processed_at"] == now
+    assert retry["available_at"] == now + timedelta(seconds=settings.OUTBOX_RETRY_BASE_SECONDS)
+    assert "processed_at" not in retry
+    assert dead["processed_at"] == now and dead["last_error"] == "boom"
+    assert worker.backoff_seconds(3) == settings.OUTBOX_RETRY_BASE_SECONDS * 4
+
+
+def test_report_points_are_claimed_once_per_incident():
+    from app.services.incident_ingest import incident_ingest_service
+
+    statement = sql(incident_ingest_service.claim_report_points("incident"))
+    assert "WHERE incidents.id = %(id_1)s AND incidents.report_points_awarded_at IS NULL" in statement
+    assert "updated_at=incidents.updated_at" in statement  # Not a change for delta sync
+
+
+def test_dedup_lock_is_shared_by_nearby_reports_across_cells():
+    from app.core import geohash as geohash_utils
+    from app.services.incident_ingest import DEDUP_LOCK_PRECISION, dedup_lock_keys, incident_ingest_service
+
+    # ~100m apart, on either side of a cell boundary
+    west, east = (3.85, 11.5022), (3.85, 11.5031)
+    assert geohash_utils.encode(*west, DEDUP_LOCK_PRECISION) != geohash_utils.encode(*east, DEDUP_LOCK_PRECISION)
+    assert set(dedup_lock_keys("Traffic", *west)) & set(dedup_lock_keys("traffic", *east))
+    assert not set(dedup_lock_keys("traffic", *west)) & set(dedup_lock_keys("accident", *west))
+
+    db = FakeSession()
+    asyncio.run(incident_ingest_service.lock_area(db, "traffic", *west))
+    assert len(db.statements) == 9
+    assert all("pg_advisory_xact_lock(hashtext(" in sql(statement) for statement in db.statements)
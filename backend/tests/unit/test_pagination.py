@@ -0,0 +1,63 @@
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import Column, DateTime, String, create_engine
+from sqlalchemy.orm import Session, declarative_base
+
+from app.core.pagination import count_total, decode_cursor, encode_cursor, keyset_paginate
+
+Base = declarative_base()
+
+
+class Post(Base):
+    __tablename__ = "posts"
+
+    id = Column(String, primary_key=True)
+    created_at = Column(DateTime, nullable=False)
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session = Session(engine)
+    start = datetime(2024, 12, 1, 12, 0)
+    # Pairs share a timestamp so the id tiebreaker matters
+    session.add_all(
+        Post(id=f"p{i:02d}", created_at=start + timedelta(minutes=i // 2))
+        for i in range(25)
+    )
+    session.commit()
+    yield session
+    session.close()
+
+
+def test_cursor_round_trip():
+    created_at = datetime(2024, 12, 1, 12, 30, 15, 123456)
+    assert decode_cursor(encode_cursor(created_at, "abc")) == (created_at, "abc")
+
+
+def test_invalid_cursor_is_400():
+    with pytest.raises(HTTPException) as exc:
+        decode_cursor("not-a-cursor")
+    assert exc.value.status_code == 400
+
+
+def test_keyset_walks_every_row_once_newest_first(db):
+    seen, cursor = [], None
+    while True:
+        items, cursor = keyset_paginate(db.query(Post), Post.created_at, Post.id, 10, cursor)
+        seen.extend(p.id for p in items)
+        if cursor is None:
+            break
+    assert len(items) == 5
+    assert seen == [f"p{i:02d}" for i in reversed(range(25))]
+
+
+def test_exact_total_is_opt_in(db):
+    query = db.query(Post)
+    assert count_total(db, query, None) is None
+    assert count_total(db, query, "exact") == 25
+    # Non-PostgreSQL databases fall back to an exact count
+    assert count_total(db, query, "estimate") == 25
@@ -0,0 +1,29 @@
+from datetime import date
+
+from app.services.partitioning import add_months, dependent_filters, partition_month, partition_name
+
+
+def test_add_months_crosses_years():
+    assert add_months(date(2024, 11, 1), 1) == date(2024, 12, 1)
+    assert add_months(date(2024, 12, 1), 1) == date(2025, 1, 1)
+    assert add_months(date(2025, 1, 1), -1) == date(2024, 12, 1)
+    assert add_months(date(2025, 3, 1), -24) == date(2023, 3, 1)
+
+
+def test_partition_name_round_trip():
+    name = partition_name("chat_messages", date(2025, 2, 1))
+    assert name == "chat_messages_p202502"
+    assert partition_month(name) == date(2025, 2, 1)
+    assert partition_month("chat_messages_default") is None
+
+
+def test_dependent_rows_go_with_their_partition():
+    filters = dict(dependent_filters("incidents", "incidents_p202401"))
+    assert filters["incident_verifications"] == "incident_id IN (SELECT id FROM incidents_p202401)"
+    assert filters["comment_upvotes"] == (
+        "comment_id IN (SELECT id FROM incident_comments WHERE incident_id IN (SELECT id FROM incidents_p202401))"
+    )
+    # Upvotes are deleted before the comments they point at
+    order = [child for child, _ in dependent_filters("incidents", "incidents_p202401")]
+    assert order.index("comment_upvotes") < order.index("incident_comments")
+    assert dependent_filters("chat_messages", "chat_messages_p202401") == []
@@ -0,0 +1,103 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from app.services.push_dispatcher import PushDispatcher
+
+SEND_URL = "http://expo.test/--/api/v2/push/send"
+RECEIPTS_URL = "http://expo.test/--/api/v2/push/getReceipts"
+
+
+class FakeExpo:
+    """Expo Push API on an httpx.MockTransport"""
+
+    def __init__(self, failures=0, unregistered=(), unregistered_receipts=()):
+        self.failures = failures
+        self.unregistered = set(unregistered)
+        self.unregistered_receipts = set(unregistered_receipts)
+        self.sent = []
+        self.receipt_requests = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        payload = json.loads(request.content)
+        if request.url.path.endswith("/getReceipts"):
+            self.receipt_requests.append(payload["ids"])
+            return httpx.Response(200, json={"data": {
+                rid: {"status": "error", "details": {"error": "DeviceNotRegistered"}}
+                if rid.removeprefix("id-") in self.unregistered_receipts else {"status": "ok"}
+                for rid in payload["ids"]
+            }})
+        if self.failures:
+            self.failures -= 1
+            return httpx.Response(503)
+        tokens = payload[0]["to"]
+        self.sent.append(tokens)
+        return httpx.Response(200, json={"data": [
+            {"status": "error", "details": {"error": "DeviceNotRegistered"}} if token in self.unregistered
+            else {"status": "ok", "id": f"id-{token}"}
+            for token in tokens
+        ]})
+
+
+def make_dispatcher(expo, **kwargs):
+    dispatcher = PushDispatcher(SEND_URL, RECEIPTS_URL, concurrency=2, transport=httpx.MockTransport(expo), **kwargs)
+    dispatcher.pruned = []
+
+    async def prune(tokens):
+        dispatcher.pruned.extend(tokens)
+        return len(tokens)
+
+    dispatcher.prune = prune
+    return dispatcher
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(PushDispatcher, "retry_base_seconds", 0)
+
+
+def run(dispatcher, tokens):
+    async def go():
+        await dispatcher.start()
+        dispatcher.enqueue(tokens, "Accident", "Near you")
+        await dispatcher.stop()
+    asyncio.run(go())
+
+
+def test_tokens_are_sent_in_requests_of_100():
+    expo = FakeExpo()
+    tokens = [f"t{i}" for i in range(250)] + ["t0"]
+    run(make_dispatcher(expo, receipt_delay=0), tokens)
+    assert sorted(len(chunk) for chunk in expo.sent) == [50, 100, 100]
+    assert sorted(t for chunk in expo.sent for t in chunk) == sorted(set(tokens))
+
+
+def test_retryable_errors_are_retried_then_given_up():
+    expo = FakeExpo(failures=2)
+    run(make_dispatcher(expo, max_retries=2, receipt_delay=0), ["a"])
+    assert expo.sent == [["a"]]
+
+    expo = FakeExpo(failures=5)
+    run(make_dispatcher(expo, max_retries=2, receipt_delay=0), ["a"])
+    assert expo.sent == []
+
+
+def test_unregistered_tokens_from_tickets_and_receipts_are_pruned():
+    expo = FakeExpo(unregistered={"gone"}, unregistered_receipts={"uninstalled"})
+    dispatcher = make_dispatcher(expo, receipt_delay=900)
+    run(dispatcher, ["ok", "gone", "uninstalled"])
+    assert dispatcher.pruned == ["gone"]
+    assert len(dispatcher._pending_receipts) == 2
+
+    async def poll():
+        dispatcher.client = dispatcher._make_client()
+        assert await dispatcher.poll_receipts() == 0  # Not due yet
+        await dispatcher.poll_receipts(now=10 ** 10)
+        await dispatcher.client.aclose()
+
+    asyncio.run(poll())
+    assert sorted(expo.receipt_requests[0]) == ["id-ok", "id-uninstalled"]
+    assert dispatcher.pruned == ["gone", "uninstalled"]
+    assert dispatcher._pending_receipts == {}
@@ -0,0 +1,43 @@
+import pytest
+
+from app.core import geohash as geohash_utils
+from app.services import push_registry as push_registry_module
+from app.services.push_registry import PushRegistry
+
+
+class FakeRedis:
+    def __init__(self):
+        self.registered = []
+        self.queried = []
+
+    def register_push_location(self, user_id, token, cells=None):
+        self.registered.append((user_id, token, cells))
+        return True
+
+    def get_push_recipients(self, cells):
+        self.queried.append(cells)
+        return {"token"}
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    fake = FakeRedis()
+    monkeypatch.setattr(push_registry_module, "redis_service", fake)
+    return fake
+
+
+def test_location_registers_one_cell_per_geo_room_precision(redis):
+    PushRegistry().update_location("u1", "tok", 3.848, 11.502)
+    gh = geohash_utils.encode(3.848, 11.502)
+    assert redis.registered == [("u1", "tok", geohash_utils.subscription_cells(gh))]
+
+
+def test_users_without_a_token_are_skipped(redis):
+    assert not PushRegistry().update_location("u1", None, 3.848, 11.502)
+    assert redis.registered == []
+
+
+def test_incident_recipients_come_from_the_alert_area(redis):
+    assert PushRegistry().recipients_for_incident(3.848, 11.502, "accident") == {"token"}
+    center = geohash_utils.alert_geohash(3.848, 11.502, "accident")
+    assert redis.queried == [list(geohash_utils.area_cells(center))]
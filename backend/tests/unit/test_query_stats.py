@@ -0,0 +1,56 @@
+import pytest
+from sqlalchemy import create_engine, text
+from app.core.query_stats import assert_max_queries, fingerprint, track_queries
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT)"))
+    return engine
+
+
+def test_fingerprint_collapses_literals_and_in_lists():
+    assert fingerprint("SELECT * FROM users WHERE id = %(id_1)s") == \
+        fingerprint("SELECT *  FROM users\nWHERE id = %(id_2)s")
+    assert fingerprint("SELECT * FROM t WHERE id IN (%(p_1)s, %(p_2)s, %(p_3)s)") == \
+        "SELECT * FROM t WHERE id IN (?)"
+    assert fingerprint("SELECT * FROM t WHERE name = 'bob' LIMIT 10") == \
+        "SELECT * FROM t WHERE name = ? LIMIT ?"
+
+def test_track_queries_counts_statements_and_repeats(engine):
+    with track_queries() as stats:
+        with engine.connect() as conn:
+            for i in range(5):
+                conn.execute(text("SELECT name FROM items WHERE id = :id"), {"id": i})
+            conn.execute(text("SELECT count(*) FROM items"))
+    assert stats.count == 6
+    assert stats.total_ms >= 0
+    shape, count = stats.most_repeated()
+    assert count == 5 and "WHERE id = ?" in shape
+    assert stats.repeated(4) == [(shape, 5)]
+
+def test_queries_outside_tracking_are_ignored(engine):
+    with track_queries() as stats:
+        pass
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+    assert stats.count == 0
+
+def test_assert_max_queries(engine):
+    with assert_max_queries(2):
+        with track_queries("ok"), engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+
+    with pytest.raises(AssertionError, match="Query budget of 2 exceeded"):
+        with assert_max_queries(2):
+            with track_queries("GET /items"), engine.connect() as conn:
+                for _ in range(3):
+                    conn.execute(text("SELECT 1"))
+
+def test_assert_max_queries_fails_when_nothing_tracked(engine):
+    with pytest.raises(AssertionError, match="No tracked requests"):
+        with assert_max_queries(2):
+            with engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
@@ -0,0 +1,61 @@
+import time
+import pytest
+from starlette.requests import Request
+from app.core import database
+
+
+class FakeSession:
+    def close(self):
+        pass
+
+
+class ReplicaSession(FakeSession):
+    pass
+
+
+def make_request(headers=None):
+    raw = [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()]
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": raw})
+
+
+@pytest.fixture
+def replica(monkeypatch):
+    monkeypatch.setattr(database, "SessionLocal", FakeSession)
+    monkeypatch.setattr(database, "ReadSessionLocal", ReplicaSession)
+    health = database.ReplicaHealth()
+    health.lag_seconds, health.checked_at = 0.0, time.monotonic()
+    monkeypatch.setattr(database, "replica_health", health)
+    return health
+
+
+def session_for(request):
+    gen = database.get_read_db(request)
+    db = next(gen)
+    gen.close()
+    return db
+
+
+def test_reads_use_primary_without_replica(monkeypatch):
+    monkeypatch.setattr(database, "SessionLocal", FakeSession)
+    monkeypatch.setattr(database, "ReadSessionLocal", None)
+    assert type(session_for(make_request())) is FakeSession
+
+def test_reads_use_caught_up_replica(replica):
+    assert isinstance(session_for(make_request()), ReplicaSession)
+
+def test_consistency_header_forces_primary(replica):
+    db = session_for(make_request({"X-Read-Consistency": "primary"}))
+    assert type(db) is FakeSession
+
+def test_lagging_replica_falls_back_to_primary(replica):
+    replica.lag_seconds = database.settings.REPLICA_MAX_LAG_SECONDS + 1
+    assert type(session_for(make_request())) is FakeSession
+
+def test_recent_writer_reads_from_primary(replica, monkeypatch):
+    from app.core.auth import create_access_token
+    from app.services.redis_service import redis_service
+    monkeypatch.setattr(redis_service, "has_recent_write", lambda user_id: user_id == "writer")
+    writer = make_request({"Authorization": f"Bearer {create_access_token({'sub': 'writer'})}"})
+    reader = make_request({"Authorization": f"Bearer {create_access_token({'sub': 'reader'})}"})
+    assert type(session_for(writer)) is FakeSession
+    assert isinstance(session_for(reader), ReplicaSession)
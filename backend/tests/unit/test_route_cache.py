@@ -0,0 +1,97 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from app.schemas.route import RoutePreferences
+from app.services import route_cache as route_cache_module
+from app.services.incident_index import IncidentIndex, IndexedIncident
+from app.services.redis_service import redis_service
+from app.services.route_analysis import RouteAnalysisService
+from app.services.route_cache import RouteCache, route_cover, route_key
+
+ORIGIN, DESTINATION = (9.7000, 4.0500), (9.7600, 4.0500)  # (lon, lat), ~6.6km due east
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    stored = {}
+    monkeypatch.setattr(redis_service, "get_cached_routes", lambda key: stored.get(key))
+    monkeypatch.setattr(redis_service, "cache_routes", lambda key, routes, ttl=None: stored.setdefault(key, routes))
+    return stored
+
+
+@pytest.fixture
+def service(monkeypatch, fake_redis):
+    monkeypatch.setattr(route_cache_module, "route_cache", RouteCache(max_entries=100))
+    service = RouteAnalysisService()
+    service.mapbox_token = "pk.test-token"
+    service.calls = {"mapbox": 0, "incidents": 0}
+
+    async def fetch(origin, destination):
+        service.calls["mapbox"] += 1
+        return service._get_mock_routes(origin, destination)
+
+    def find(db, geometries, buffer_meters):
+        service.calls["incidents"] += 1
+        return [[] for _ in geometries]
+
+    service._fetch_routes_from_mapbox = fetch
+    service._find_incidents_on_routes = find
+    return service
+
+
+def analyze(service, origin=ORIGIN):
+    return asyncio.run(service.analyze_routes(origin, DESTINATION, "moto", RoutePreferences(), db=None))
+
+
+def test_nearby_points_share_a_key():
+    assert route_key((9.70001, 4.05002), DESTINATION) == route_key((9.70023, 4.04981), DESTINATION)
+    assert route_key((9.7010, 4.0500), DESTINATION) != route_key(ORIGIN, DESTINATION)
+
+
+def test_cover_samples_long_segments(service):
+    cells = route_cover(route["geometry"] for route in service._get_mock_routes(ORIGIN, DESTINATION))
+    from app.core import geohash as geohash_utils
+    assert geohash_utils.encode(4.0500, 9.7300, 6) in cells  # Midway along the direct route
+
+
+def test_repeat_requests_hit_the_cache(service, fake_redis):
+    analyze(service)
+    analyze(service, origin=(9.70012, 4.04995))  # Same snapped origin
+    assert service.calls == {"mapbox": 1, "incidents": 1}
+    assert len(fake_redis) == 1
+
+    # Another worker: base routes from Redis, its own incident overlay
+    route_cache_module.route_cache = RouteCache(max_entries=100)
+    analyze(service)
+    assert service.calls == {"mapbox": 1, "incidents": 2}
+    assert route_cache_module.route_cache.stats()["base"]["redis_hits"] >= 1
+
+
+def test_incident_near_route_drops_its_overlay(service):
+    index = IncidentIndex()
+    index.add_listener(route_cache_module.route_cache.invalidate)
+    analyze(service)
+
+    far = IndexedIncident("far", None, "accident", None, 3.8480, 11.5021, None, "active", False, 0, datetime.utcnow(), None)
+    index.upsert(far)
+    analyze(service)
+    assert service.calls["incidents"] == 1
+
+    near = IndexedIncident("near", None, "accident", None, 4.0505, 9.7300, None, "active", False, 0, datetime.utcnow(), None)
+    index.upsert(near)
+    analyze(service)
+    assert service.calls == {"mapbox": 1, "incidents": 2}
+
+
+def test_all_routes_are_matched_in_one_statement(service):
+    from sqlalchemy.dialects import postgresql
+
+    geometries = [route["geometry"] for route in service._get_mock_routes(ORIGIN, DESTINATION)]
+    sql = str(RouteAnalysisService().incidents_on_routes_query(geometries, 200).compile(dialect=postgresql.dialect()))
+
+    assert sql.count("ST_GeogFromText(") == 3  # Each route parsed once, in the VALUES list
+    assert "JOIN (VALUES" in sql and "ON ST_DWithin(incidents.location, routes.route" in sql
+    assert "ORDER BY routes.route_idx" in sql
+    assert "incidents.expires_at IS NULL OR incidents.expires_at >" in sql  # Expired-but-unswept rows are skipped
@@ -0,0 +1,52 @@
+from datetime import datetime
+
+from app.services.incident_index import IncidentIndex, IndexedIncident
+from app.services.tiles import BUFFER, EXTENT, TileCache, tile_bounds, tile_for
+
+
+def test_tile_math_round_trips():
+    x, y = tile_for(4.0511, 9.7679, 14)
+    west, south, east, north = tile_bounds(14, x, y)
+    assert west <= 9.7679 < east and south <= 4.0511 < north
+    assert tile_bounds(0, 0, 0)[0] == -180 and round(tile_bounds(0, 0, 0)[3], 4) == 85.0511
+
+
+def test_cache_expires_and_evicts():
+    cache = TileCache(max_tiles=2)
+    cache.put((1, 0, 0), b"a", ttl=60)
+    cache.put((1, 0, 1), b"b", ttl=-1)
+    assert cache.get((1, 0, 0)) == b"a"
+    assert cache.get((1, 0, 1)) is None  # Expired
+    cache.put((1, 1, 0), b"c", ttl=60)
+    cache.put((1, 1, 1), b"d", ttl=60)
+    assert len(cache) == 2 and cache.get((1, 0, 0)) is None
+
+
+def test_incident_changes_drop_tiles_holding_them():
+    cache, index = TileCache(max_tiles=100), IncidentIndex()
+    index.add_listener(cache.invalidate)
+    here = (14, *tile_for(4.0511, 9.7679, 14))
+    elsewhere = (14, *tile_for(3.8480, 11.5021, 14))
+    cache.put(here, b"here", ttl=60)
+    cache.put(elsewhere, b"elsewhere", ttl=60)
+
+    index.upsert(IndexedIncident("a", None, "accident", None, 4.0511, 9.7679, None, "active", False, 0, datetime.utcnow(), None))
+    assert cache.get(here) is None
+    assert cache.get(elsewhere) == b"elsewhere"
+
+    cache.put(here, b"here", ttl=60)
+    index.remove(["a"])
+    assert cache.get(here) is None
+
+
+def test_points_near_an_edge_drop_the_neighbouring_tile_too():
+    cache = TileCache(max_tiles=100)
+    x, y = tile_for(4.0511, 9.7679, 14)
+    west, south, east, north = tile_bounds(14, x, y)
+    inside_buffer = east - (east - west) * BUFFER / EXTENT / 2  # Drawn by the tile to the east as well
+    for key in ((14, x, y), (14, x + 1, y), (14, x - 1, y), (14, x, y - 1)):
+        cache.put(key, b"tile", ttl=60)
+
+    cache.invalidate([((south + north) / 2, inside_buffer)])
+    assert cache.get((14, x, y)) is None and cache.get((14, x + 1, y)) is None
+    assert cache.get((14, x - 1, y)) == b"tile" and cache.get((14, x, y - 1)) == b"tile"
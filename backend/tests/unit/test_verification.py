@@ -0,0 +1,34 @@
+from datetime import datetime
+from types import SimpleNamespace
+
+from sqlalchemy.dialects import postgresql
+
+from app.services.verification import VerificationService, vote_weight
+
+
+def test_vote_weight_follows_trust_score():
+    assert vote_weight(SimpleNamespace(trust_score=250)) == 2.5
+    assert vote_weight(SimpleNamespace(trust_score=None)) == 0.1
+
+
+def test_changed_vote_moves_between_tallies():
+    service = VerificationService()
+    assert service.tally_deltas("still_there", 1.5) == {
+        "confirmations": 1, "confirmation_weight": 1.5, "all_clear_count": 0
+    }
+    previous = SimpleNamespace(verification_type="still_there", weight=1.5)
+    assert service.tally_deltas("all_clear", 2.0, previous) == {
+        "confirmations": -1, "confirmation_weight": -1.5, "all_clear_count": 1
+    }
+
+
+def test_tallies_and_thresholds_are_one_update_returning_them():
+    service = VerificationService()
+    deltas = service.tally_deltas("still_there", 1.0)
+    statement = service.tally_update("incident", deltas, datetime(2024, 12, 1))
+    sql = str(statement.compile(dialect=postgresql.dialect()))
+
+    assert sql.startswith("UPDATE incidents SET")
+    assert "WHERE incidents.id = %(id_1)s AND incidents.status = %(status_1)s" in sql
+    assert "RETURNING incidents.confirmations, incidents.confirmation_weight, incidents.all_clear_count" in sql
+    assert "sum(" not in sql.lower() and "count(" not in sql.lower()
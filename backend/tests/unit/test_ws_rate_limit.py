@@ -0,0 +1,60 @@
+import asyncio
+from app.core.config import settings
+from app.core.ws_rate_limit import ConnectionRateLimiter, RateLimitVerdict, parse_rate
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_parse_rate():
+    assert parse_rate("5/second") == (5.0, 5.0)
+    assert parse_rate("30/minute") == (0.5, 30.0)
+
+def test_bucket_refills_over_time():
+    clock = FakeClock()
+    limiter = ConnectionRateLimiter(clock=clock)
+    capacity = int(parse_rate(settings.WS_RATE_LIMITS["ping"])[1])
+    assert all(limiter.check("ping") == RateLimitVerdict.ALLOW for _ in range(capacity))
+    assert limiter.check("ping") == RateLimitVerdict.DROP
+    clock.now += 1
+    assert limiter.check("ping") == RateLimitVerdict.ALLOW
+
+def test_unknown_types_share_default_bucket():
+    limiter = ConnectionRateLimiter(clock=FakeClock())
+    for i in range(50):
+        limiter.check(f"junk_{i}")
+    limiter.check(["not", "a", "string"])
+    assert set(limiter.buckets) == {"*"}
+
+def test_coalesce_dispatches_latest_only():
+    async def run():
+        clock = FakeClock()
+        limiter = ConnectionRateLimiter(clock=clock)
+        capacity = int(parse_rate(settings.WS_RATE_LIMITS["driver_location_update"])[1])
+        for _ in range(capacity):
+            limiter.check("driver_location_update")
+
+        dispatched = []
+
+        async def dispatch(message):
+            dispatched.append(message)
+
+        for i in range(3):
+            assert limiter.check("driver_location_update") == RateLimitVerdict.COALESCE
+            limiter.defer("driver_location_update", {"seq": i}, dispatch)
+        clock.now += 1
+        await asyncio.sleep(0.3)
+        return dispatched
+
+    assert asyncio.run(run()) == [{"seq": 2}]
+
+def test_flooding_marks_connection_abusive():
+    limiter = ConnectionRateLimiter(clock=FakeClock())
+    for _ in range(settings.WS_RATE_LIMIT_MAX_VIOLATIONS + 50):
+        limiter.check("ping")
+    assert limiter.is_abusive
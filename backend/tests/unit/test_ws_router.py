@@ -0,0 +1,71 @@
+import asyncio
+from pydantic import BaseModel
+from app.core.metrics import metrics
+from app.core.ws_router import MessageRouter, ConnectionContext
+from app.api.websocket import ws_router
+
+
+class RoomPayload(BaseModel):
+    room_id: str
+
+def _ctx():
+    return ConnectionContext(websocket=None, user=None, db=None)
+
+def test_dispatch_merges_top_level_and_data_fields():
+    router = MessageRouter()
+    received = []
+
+    @router.route("join", RoomPayload)
+    async def handle_join(ctx, payload):
+        received.append(payload.room_id)
+
+    assert asyncio.run(router.dispatch(_ctx(), {"type": "join", "room_id": "a"}))
+    assert asyncio.run(router.dispatch(_ctx(), {"type": "join", "data": {"room_id": "b"}}))
+    assert received == ["a", "b"]
+
+def test_dispatch_times_handlers_and_counts_rejects():
+    metrics.reset()
+    router = MessageRouter()
+
+    @router.route("join", RoomPayload)
+    async def handle_join(ctx, payload):
+        pass
+
+    asyncio.run(router.dispatch(_ctx(), {"type": "join", "room_id": "a"}))
+    assert not asyncio.run(router.dispatch(_ctx(), {"type": "join"}))
+    assert not asyncio.run(router.dispatch(_ctx(), {"type": "nope"}))
+    assert not asyncio.run(router.dispatch(_ctx(), ["not", "a", "dict"]))
+    assert not asyncio.run(router.dispatch(_ctx(), {"type": []}))
+
+    snapshot = metrics.snapshot(prefix="ws.")
+    assert snapshot["histograms"]["ws.handler.join"]["count"] == 1
+    assert snapshot["counters"]["ws.messages.invalid.join"] == 1
+    assert snapshot["counters"]["ws.messages.unknown"] == 3
+
+def test_connect_endpoint_routes_registered():
+    for message_type in ("ping", "join_ride", "leave_ride", "driver_online", "driver_offline",
+                         "driver_location_update", "subscribe_geohash", "join_chat", "leave_chat", "typing"):
+        assert message_type in ws_router.message_types
+
+def test_join_ride_refused_for_non_participants(monkeypatch):
+    import app.api.websocket as websocket_api
+    from types import SimpleNamespace
+
+    class FakeWebSocket:
+        def __init__(self):
+            self.sent = []
+
+        async def send_json(self, data):
+            self.sent.append(data)
+
+    joined = []
+    monkeypatch.setattr(websocket_api.manager, "join_ride_room", lambda ride_id, user_id: joined.append(user_id))
+    monkeypatch.setattr(websocket_api.redis_service, "get_events_since",
+                        lambda *args: (_ for _ in ()).throw(AssertionError("replayed to a stranger")))
+    monkeypatch.setattr(websocket_api, "is_ride_participant", lambda db, ride_id, user_id: user_id == "passenger")
+
+    ws = FakeWebSocket()
+    ctx = ConnectionContext(websocket=ws, user=SimpleNamespace(id="stranger"), db=None)
+    assert asyncio.run(ws_router.dispatch(ctx, {"type": "join_ride", "ride_id": "r1", "last_seq": 0}))
+    assert joined == []
+    assert [event["type"] for event in ws.sent] == ["error"]
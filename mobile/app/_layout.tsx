@@ -5,8 +5,11 @@ import { SocketProvider } from '../src/context/SocketContext';
 import NetworkErrorBanner from '../src/components/NetworkErrorBanner';
 import { useEffect, useRef } from 'react';
 import NetInfo from '@react-native-community/netinfo';
+import { AppState } from 'react-native';
 import { incidentService } from '../src/services/incident';
 import { notificationService } from '../src/services/NotificationService';
+import { locationService } from '../src/services/location';
+import { api } from '../src/services/api';
 import * as Notifications from 'expo-notifications';
 
 export default function RootLayout() {
@@ -30,6 +33,15 @@ export default function RootLayout() {
       }
     });
 
+    // 3. Foregrounding: tell the backend where this device is so incident pushes reach it
+    const appStateSub = AppState.addEventListener('change', async state => {
+      if (state !== 'active') return;
+      const coords = await locationService.getCurrentPosition();
+      if (coords) {
+        api.post('/users/location', coords).catch(() => {}); // Not logged in yet: ignore
+      }
+    });
+
     notificationListener.current = notificationService.addNotificationListener(notification => {
       console.log('Notification Received (Foreground):', notification);
     });
@@ -41,6 +53,7 @@ export default function RootLayout() {
 
     return () => {
       unsubscribeNet();
+      appStateSub.remove();
       if (notificationListener.current) notificationService.removeNotificationSubscription(notificationListener.current);
       if (responseListener.current) notificationService.removeNotificationSubscription(responseListener.current);
     };
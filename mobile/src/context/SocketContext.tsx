@@ -1,6 +1,7 @@
 import React, { createContext, useContext, useEffect, useState } from 'react';
 import { socketService } from '../services/socket';
 import { authService } from '../services/auth';
+import { rideService } from '../services/ride';
 import { useAuth } from './AuthContext';
 import { Alert } from 'react-native';
 
@@ -83,6 +84,17 @@ export const SocketProvider: React.FC<{ children: React.ReactNode }> = ({ childr
                 }
             }
             
+            if (data.type === 'resync_required') {
+                // The server could not replay everything we missed: reload the active ride
+                const rideId = passengerRideRef.current?.id;
+                if (rideId) {
+                    console.log('🔄 Event replay truncated. Refetching ride:', rideId);
+                    rideService.getRide(rideId)
+                        .then((ride: any) => setPassengerRide((prev: any) => (prev ? { ...prev, ...ride } : prev)))
+                        .catch((e: any) => console.error('❌ Ride resync failed:', e));
+                }
+            }
+
             if (data.type === 'auth_error') {
                 console.log('🔒 Auth Error received. Logging out...');
                 Alert.alert('Session Expired', 'Please log in again.');
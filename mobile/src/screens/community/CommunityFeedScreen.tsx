@@ -55,7 +55,7 @@ export default function CommunityFeedScreen() {
   const [items, setItems] = useState<FeedItem[]>([]);
   const [loading, setLoading] = useState(true);
   const [refreshing, setRefreshing] = useState(false);
-  const [page, setPage] = useState(1);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
   const [hasMore, setHasMore] = useState(true);
   const [loadingMore, setLoadingMore] = useState(false);
   const [showReportModal, setShowReportModal] = useState(false);
@@ -64,7 +64,7 @@ export default function CommunityFeedScreen() {
   const { socket } = useSocket();
 
   useEffect(() => {
-    loadFeed(1, true);
+    loadFeed(true);
   }, []);
 
   useEffect(() => {
@@ -97,11 +97,11 @@ export default function CommunityFeedScreen() {
     };
   }, [socket]);
 
-  const loadFeed = async (pageNum: number, reset: boolean = false) => {
+  const loadFeed = async (reset: boolean = false) => {
     try {
-      const response = await api.get('/incidents/feed', {
-        params: { page: pageNum, limit: 15 }
-      });
+      const params: any = { limit: 15 };
+      if (!reset && nextCursor) params.cursor = nextCursor;
+      const response = await api.get('/incidents/feed', { params });
       const data = response.data;
       
       if (reset) {
@@ -110,7 +110,7 @@ export default function CommunityFeedScreen() {
         setItems(prev => [...prev, ...data.items]);
       }
       setHasMore(data.has_more);
-      setPage(pageNum);
+      setNextCursor(data.next_cursor);
     } catch (error) {
       console.error('Failed to load feed:', error);
     } finally {
@@ -122,13 +122,13 @@ export default function CommunityFeedScreen() {
 
   const onRefresh = () => {
     setRefreshing(true);
-    loadFeed(1, true);
+    loadFeed(true);
   };
 
   const loadMore = () => {
     if (!hasMore || loadingMore) return;
     setLoadingMore(true);
-    loadFeed(page + 1, false);
+    loadFeed(false);
   };
 
   const getTimeAgo = (dateString: string): string => {
@@ -238,7 +238,7 @@ export default function CommunityFeedScreen() {
         {/* Verification Buttons */}
         <IncidentVerificationButtons 
           incidentId={item.id}
-          onVerified={() => loadFeed(1, true)}
+          onVerified={() => loadFeed(true)}
         />
 
         {/* Thanks Button */}
@@ -328,7 +328,7 @@ export default function CommunityFeedScreen() {
       <EnhancedIncidentReport
         visible={showReportModal}
         onClose={() => setShowReportModal(false)}
-        onSuccess={() => loadFeed(1, true)}
+        onSuccess={() => loadFeed(true)}
       />
 
       {/* Mini Profile Modal */}
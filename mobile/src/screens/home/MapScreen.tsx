@@ -126,6 +126,9 @@ export default function MapScreen() {
       const unsubscribe = socket.addListener((msg: any) => {
           if (msg.type === 'incident_alert') {
               handleIncidentAlert(msg.data);
+          } else if (msg.type === 'incidents_expired') {
+              const expired = new Set<string>(msg.data.incident_ids);
+              setIncidents(prev => prev.filter(inc => !expired.has(inc.id)));
           }
       });
       
@@ -42,9 +42,10 @@ export const chatService = {
   },
 
   // Messages
-  getMessages: async (roomId: string, limit: number = 50, before?: string): Promise<ChatMessage[]> => {
+  // Older pages: pass the X-Next-Cursor header of the previous response as `cursor`
+  getMessages: async (roomId: string, limit: number = 50, cursor?: string): Promise<ChatMessage[]> => {
     const params: any = { limit };
-    if (before) params.before = before;
+    if (cursor) params.cursor = cursor;
     const response = await api.get(`/chat/rooms/${roomId}/messages`, { params });
     return response.data;
   },
@@ -8,13 +8,16 @@ class SocketService {
   private listeners: Set<WebSocketListener> = new Set();
   private reconnectInterval: NodeJS.Timeout | null = null;
   private token: string | null = null;
+  // Highest event sequence number seen; sent on reconnect to replay missed events
+  private lastSeq: number | null = null;
 
   connect(token: string) {
     if (this.ws && (this.ws.readyState === WebSocket.OPEN || this.ws.readyState === WebSocket.CONNECTING)) return;
     
     this.token = token;
-    // Append token to URL query params
-    const wsUrl = `${WS_URL}?token=${token}`;
+    // Append token (and resume point, if any) to URL query params
+    const resume = this.lastSeq !== null ? `&last_seq=${this.lastSeq}` : '';
+    const wsUrl = `${WS_URL}?token=${token}${resume}`;
     console.log(`🔌 Connecting to WebSocket: ${WS_URL}`);
     console.log('🔑 Token being sent:', token ? `${token.substring(0, 10)}...` : 'None');
 
@@ -32,7 +35,7 @@ class SocketService {
       try {
         const data = JSON.parse(event.data);
         // console.log('📩 WS Message:', data.type);
-        this.notifyListeners(data);
+        this.handleMessage(data);
       } catch (e) {
         console.error('❌ WS Parse Error:', e);
       }
@@ -89,6 +92,32 @@ class SocketService {
     this.listeners.forEach((listener) => listener(data));
   }
 
+  private handleMessage(data: any) {
+    if (data.type === 'connected') {
+      // First connection: start tracking from the server's current position
+      if (this.lastSeq === null && typeof data.data?.last_seq === 'number') {
+        this.lastSeq = data.data.last_seq;
+      }
+      this.notifyListeners(data);
+      return;
+    }
+
+    if (data.type === 'events_replay') {
+      // Events missed while disconnected, delivered in order
+      (data.data?.events || []).forEach((missed: any) => this.handleMessage(missed));
+      if (data.data?.truncated) {
+        this.notifyListeners({ type: 'resync_required', data: {} });
+      }
+      return;
+    }
+
+    if (typeof data.seq === 'number') {
+      if (this.lastSeq !== null && data.seq <= this.lastSeq) return; // Already delivered
+      this.lastSeq = data.seq;
+    }
+    this.notifyListeners(data);
+  }
+
   private attemptReconnect() {
     if (!this.reconnectInterval && this.token) {
       console.log('🔄 Attempting to reconnect in 5s...');
@@ -0,0 +1,291 @@
+"""
+Mixed HTTP + WebSocket load test for the database-backed hot routes.
+
+Seeds benchmark passengers and verified drivers, then, against a running
+server, concurrently:
+  - keeps --ws-clients sockets open, each pinging once a second (pong RTT
+    shows how long the event loop was blocked)
+  - drives HTTP traffic on the hot routes: driver location updates, nearby
+    drivers, nearby incidents and full ride lifecycles
+    (request -> accept -> start -> complete)
+
+Reports p50/p95/p99 per route, WebSocket pong RTT and the server's event
+loop lag (`ws.event_loop_lag` from /api/v1/ws/metrics, delta over the run).
+
+To compare the sync and async database layers, run it against a server on
+each revision and compare the saved results:
+    python scripts/benchmark_async_db.py --label sync --output sync.json
+    python scripts/benchmark_async_db.py --label async --output async.json
+    python scripts/benchmark_async_db.py --compare sync.json async.json
+
+Needs PostgreSQL (PostGIS) and Redis as configured in backend/.env.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+
+import httpx
+import websockets
+
+# Add backend directory to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'backend')))
+
+from dotenv import load_dotenv
+load_dotenv(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'backend', '.env')))
+
+BENCH_PHONE_PREFIX = "+2376990"
+DOUALA = (4.0511, 9.7679)
+
+
+def seed_users(n_drivers: int, n_passengers: int):
+    """Create (or reuse) benchmark users and return (driver tokens, passenger tokens)"""
+    from geoalchemy2.elements import WKTElement
+    from app.core.auth import create_access_token
+    from app.core.database import SessionLocal
+    from app.models.driver import Driver
+    from app.models.user import User
+
+    db = SessionLocal()
+    try:
+        tokens = {"driver": [], "passenger": []}
+        for role, count in (("driver", n_drivers), ("passenger", n_passengers)):
+            for i in range(count):
+                phone = f"{BENCH_PHONE_PREFIX}{'1' if role == 'driver' else '2'}{i:04d}"
+                user = db.query(User).filter(User.phone_number == phone).first()
+                if not user:
+                    # Placeholder hash: bcrypt for hundreds of users would dominate seeding
+                    user = User(phone_number=phone, phone_hash=f"bench-{phone}", firebase_uid=f"bench_uid_{phone}",
+                                full_name=f"Bench {role} {i}", is_driver=role == "driver",
+                                is_active=True, is_verified=True)
+                    db.add(user)
+                    db.flush()
+                if role == "driver" and not db.query(Driver).filter(Driver.user_id == user.id).first():
+                    lat, lon = DOUALA
+                    db.add(Driver(
+                        user_id=user.id,
+                        driver_license_number=f"BENCH-{i:04d}",
+                        vehicle_type="moto",
+                        vehicle_plate_number=f"BN-{i:04d}",
+                        is_online=True,
+                        is_available=True,
+                        is_verified=True,
+                        verification_status="approved",
+                        current_location=WKTElement(f"POINT({lon} {lat})", srid=4326),
+                        current_latitude=lat,
+                        current_longitude=lon,
+                    ))
+                tokens[role].append(create_access_token({"sub": user.id}))
+        db.commit()
+        return tokens["driver"], tokens["passenger"]
+    finally:
+        db.close()
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))] if values else 0.0
+
+
+def summarize(values):
+    return {
+        "n": len(values),
+        "p50_ms": round(percentile(values, 0.50), 1),
+        "p95_ms": round(percentile(values, 0.95), 1),
+        "p99_ms": round(percentile(values, 0.99), 1),
+        "max_ms": round(max(values), 1) if values else 0.0,
+    }
+
+
+def lag_delta(before: dict, after: dict) -> dict:
+    """Percentiles of the server loop-lag histogram over the run (bucket deltas)"""
+    b = before.get("histograms", {}).get("ws.event_loop_lag")
+    a = after.get("histograms", {}).get("ws.event_loop_lag")
+    if not a:
+        return {}
+    counts = {k: v - (b["buckets"][k] if b else 0) for k, v in a["buckets"].items()}
+    total = sum(counts.values())
+    result = {"samples": total}
+    for name, q in (("p50_ms", 0.50), ("p99_ms", 0.99)):
+        seen = 0
+        for bucket, count in counts.items():
+            seen += count
+            if total and seen >= q * total:
+                result[name] = float("inf") if bucket == "le_inf" else float(bucket[3:])
+                break
+    return result
+
+
+async def timed(latencies, name, coro):
+    start = time.perf_counter()
+    resp, ok = None, False
+    try:
+        resp = await coro
+        ok = resp.status_code < 400
+    except httpx.HTTPError:
+        pass
+    latencies[name if ok else f"{name} (error)"].append((time.perf_counter() - start) * 1000)
+    return resp if ok else None
+
+
+async def ws_pinger(ws_url, token, rtts, stop):
+    try:
+        async with websockets.connect(f"{ws_url}?token={token}", ping_interval=None) as ws:
+            await ws.recv()  # connected
+            while not stop.is_set():
+                start = time.perf_counter()
+                await ws.send(json.dumps({"type": "ping"}))
+                while json.loads(await ws.recv()).get("type") != "pong":
+                    pass
+                rtts.append((time.perf_counter() - start) * 1000)
+                await asyncio.sleep(1)
+    except (websockets.WebSocketException, OSError):
+        rtts.append(float("nan"))
+
+
+async def driver_worker(http, token, latencies, stop, rng):
+    headers = {"Authorization": f"Bearer {token}"}
+    lat, lon = DOUALA
+    while not stop.is_set():
+        lat += rng.uniform(-1e-3, 1e-3)
+        lon += rng.uniform(-1e-3, 1e-3)
+        await timed(latencies, "POST /drivers/location", http.post(
+            "/drivers/location", headers=headers, json={"latitude": lat, "longitude": lon}))
+        await asyncio.sleep(rng.uniform(0.5, 1.5))
+
+
+async def reader_worker(http, token, latencies, stop, rng):
+    headers = {"Authorization": f"Bearer {token}"}
+    while not stop.is_set():
+        lat, lon = DOUALA[0] + rng.uniform(-0.05, 0.05), DOUALA[1] + rng.uniform(-0.05, 0.05)
+        await timed(latencies, "GET /incidents", http.get(
+            "/incidents/", params={"latitude": lat, "longitude": lon, "radius_km": 5}))
+        await timed(latencies, "GET /drivers/nearby", http.get(
+            "/drivers/nearby", headers=headers, params={"latitude": lat, "longitude": lon}))
+        await asyncio.sleep(rng.uniform(0.2, 0.6))
+
+
+async def lifecycle_worker(http, passenger_token, driver_token, latencies, stop, rng):
+    passenger = {"Authorization": f"Bearer {passenger_token}"}
+    driver = {"Authorization": f"Bearer {driver_token}"}
+    while not stop.is_set():
+        lat, lon = DOUALA
+        resp = await timed(latencies, "POST /rides/request", http.post("/rides/request", headers=passenger, json={
+            "ride_type": "moto",
+            "pickup_latitude": lat, "pickup_longitude": lon,
+            "dropoff_latitude": lat + 0.02, "dropoff_longitude": lon + 0.02,
+        }))
+        if resp is None:
+            await asyncio.sleep(1)
+            continue
+        ride_id = resp.json()["id"]
+        for step in ("accept", "start", "complete"):
+            if await timed(latencies, f"PATCH /rides/{{id}}/{step}",
+                           http.patch(f"/rides/{ride_id}/{step}", headers=driver)) is None:
+                break
+        await asyncio.sleep(rng.uniform(0.5, 1.5))
+
+
+async def run(args):
+    print(f"🌱 Seeding {args.drivers} drivers and {args.passengers} passengers...")
+    driver_tokens, passenger_tokens = seed_users(args.drivers, args.passengers)
+
+    base = args.url.rstrip("/")
+    ws_url = base.replace("http://", "ws://").replace("https://", "wss://") + "/api/v1/ws/connect"
+    limits = httpx.Limits(max_connections=args.http_concurrency)
+    latencies = defaultdict(list)
+    rtts = []
+    stop = asyncio.Event()
+    rng = random.Random(args.seed)
+
+    async with httpx.AsyncClient(base_url=f"{base}/api/v1", timeout=30, limits=limits) as http:
+        metrics_before = (await http.get("/ws/metrics")).json()
+
+        all_tokens = driver_tokens + passenger_tokens
+        tasks = [asyncio.create_task(ws_pinger(ws_url, all_tokens[i % len(all_tokens)], rtts, stop))
+                 for i in range(args.ws_clients)]
+        # Lifecycle pairs use their own drivers so accepts don't race
+        pairs = min(args.lifecycles, len(driver_tokens), len(passenger_tokens))
+        for i in range(pairs):
+            tasks.append(asyncio.create_task(lifecycle_worker(
+                http, passenger_tokens[i], driver_tokens[i], latencies, stop, random.Random(rng.random()))))
+        for token in driver_tokens[pairs:]:
+            tasks.append(asyncio.create_task(driver_worker(http, token, latencies, stop, random.Random(rng.random()))))
+        for token in passenger_tokens[pairs:]:
+            tasks.append(asyncio.create_task(reader_worker(http, token, latencies, stop, random.Random(rng.random()))))
+
+        print(f"🚗 Running mixed traffic for {args.duration}s ({args.ws_clients} sockets, {len(tasks)} tasks)...")
+        await asyncio.sleep(args.duration)
+        stop.set()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        metrics_after = (await http.get("/ws/metrics")).json()
+
+    return {
+        "label": args.label,
+        "routes": {name: summarize(values) for name, values in sorted(latencies.items())},
+        "ws_pong_rtt": summarize([r for r in rtts if r == r]),
+        "ws_failed": sum(1 for r in rtts if r != r),
+        "event_loop_lag": lag_delta(metrics_before, metrics_after),
+    }
+
+
+def print_results(results):
+    print(f"\n📊 {results['label']}")
+    for name, s in results["routes"].items():
+        print(f"  {name:<30} n={s['n']:>6} p50={s['p50_ms']:>7}ms p95={s['p95_ms']:>7}ms p99={s['p99_ms']:>7}ms")
+    s = results["ws_pong_rtt"]
+    print(f"  {'WS ping->pong':<30} n={s['n']:>6} p50={s['p50_ms']:>7}ms p95={s['p95_ms']:>7}ms p99={s['p99_ms']:>7}ms")
+    if results["ws_failed"]:
+        print(f"  ⚠️ {results['ws_failed']} sockets failed")
+    print(f"  ⏱️  Server event loop lag: {results['event_loop_lag'] or 'n/a (lag monitor disabled?)'}")
+
+
+def compare(before_path, after_path):
+    with open(before_path) as f:
+        before = json.load(f)
+    with open(after_path) as f:
+        after = json.load(f)
+    print(f"{'':<30} {before['label'] + ' p99':>14} {after['label'] + ' p99':>14}")
+    rows = [(name, before["routes"].get(name), after["routes"].get(name))
+            for name in sorted(set(before["routes"]) | set(after["routes"]))]
+    rows.append(("WS ping->pong", before["ws_pong_rtt"], after["ws_pong_rtt"]))
+    for name, b, a in rows:
+        fmt = lambda s: f"{s['p99_ms']:>12}ms" if s else f"{'-':>14}"
+        print(f"{name:<30} {fmt(b)} {fmt(a)}")
+    lag = lambda r: r["event_loop_lag"].get("p99_ms", "-")
+    print(f"{'Event loop lag p99':<30} {str(lag(before)):>12}ms {str(lag(after)):>12}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--duration", type=int, default=60)
+    parser.add_argument("--drivers", type=int, default=100)
+    parser.add_argument("--passengers", type=int, default=200)
+    parser.add_argument("--lifecycles", type=int, default=20, help="Concurrent ride lifecycle loops")
+    parser.add_argument("--ws-clients", type=int, default=300)
+    parser.add_argument("--http-concurrency", type=int, default=200)
+    parser.add_argument("--label", default="run")
+    parser.add_argument("--output", help="Save results as JSON")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"))
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    results = asyncio.run(run(args))
+    print_results(results)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"💾 Saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
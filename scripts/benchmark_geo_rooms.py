@@ -0,0 +1,80 @@
+"""
+Benchmark geo room recipient resolution.
+
+Subscribes N simulated users spread over Douala/Yaoundé to the in-memory
+geo rooms, then times `get_area_subscribers` for incident alerts of every
+configured type (i.e. every alert radius / precision).
+
+Usage:
+    python scripts/benchmark_geo_rooms.py [--users 100000] [--alerts 2000]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+# Add backend directory to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'backend')))
+
+from app.core import geohash as geohash_utils
+from app.core.config import settings
+from app.core.websocket import ConnectionManager
+
+# (lat, lon, spread in degrees)
+CITY_CENTRES = [
+    (4.0511, 9.7679, 0.08),   # Douala
+    (3.8667, 11.5167, 0.08),  # Yaoundé
+]
+
+
+def random_point(rng: random.Random):
+    lat, lon, spread = rng.choice(CITY_CENTRES)
+    return lat + rng.uniform(-spread, spread), lon + rng.uniform(-spread, spread)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--alerts", type=int, default=2_000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    manager = ConnectionManager()
+
+    start = time.perf_counter()
+    for i in range(args.users):
+        lat, lon = random_point(rng)
+        manager.update_geohash_subscription(f"user-{i}", geohash_utils.encode(lat, lon))
+    subscribe_s = time.perf_counter() - start
+
+    print(f"👥 Subscribed {args.users} users in {subscribe_s:.2f}s "
+          f"({len(manager.geo_rooms)} cells at precisions {geohash_utils.subscription_precisions()})")
+
+    incident_types = sorted(settings.INCIDENT_ALERT_RADIUS)
+    for incident_type in incident_types:
+        radius = geohash_utils.alert_radius_for_type(incident_type)
+        timings = []
+        recipients = []
+        for _ in range(args.alerts):
+            lat, lon = random_point(rng)
+            t0 = time.perf_counter()
+            users = manager.get_area_subscribers(geohash_utils.alert_geohash(lat, lon, incident_type))
+            timings.append((time.perf_counter() - t0) * 1_000_000)
+            recipients.append(len(users))
+
+        timings.sort()
+        p50 = timings[len(timings) // 2]
+        p99 = timings[int(len(timings) * 0.99) - 1]
+        print(f"  {incident_type:<12} radius={radius:>5}m precision={geohash_utils.precision_for_radius(radius)} "
+              f"recipients(avg)={statistics.mean(recipients):>8.0f} "
+              f"p50={p50:>8.1f}µs p99={p99:>8.1f}µs")
+
+    info = geohash_utils.area_cells.cache_info()
+    print(f"🧮 Neighbour cache: hits={info.hits} misses={info.misses} size={info.currsize}")
+
+
+if __name__ == "__main__":
+    main()
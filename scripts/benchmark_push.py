@@ -0,0 +1,91 @@
+"""
+Benchmark the push dispatcher against the local Expo stand-in.
+
+Queues --notifications alerts of --tokens recipients each through
+PushDispatcher, waits for the queue to drain, polls receipts, and reports
+tokens/s, send request latency (p50/p95/p99), retries and pruned tokens.
+
+By default the stand-in runs in-process (ASGI transport, no sockets). To go
+over the network (connection pooling, HTTP/2 if h2 is installed), start
+scripts/expo_push_standin.py and pass --url http://127.0.0.1:8099.
+Pruning is counted, not applied: the database is not touched.
+
+Usage:
+    python scripts/benchmark_push.py [--notifications 50] [--tokens 1000] [--concurrency 6]
+                                     [--latency-ms 50] [--error-rate 0.05] [--url URL]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+import httpx
+
+# Add backend directory to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'backend')))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.metrics import metrics
+from app.services.push_dispatcher import HTTP2_AVAILABLE, PushDispatcher
+from expo_push_standin import create_app
+
+
+async def run(args):
+    base_url = args.url or "http://expo-standin"
+    transport = None if args.url else httpx.ASGITransport(
+        app=create_app(args.latency_ms, args.error_rate, args.unregistered_rate, seed=args.seed)
+    )
+    dispatcher = PushDispatcher(
+        send_url=f"{base_url}/--/api/v2/push/send",
+        receipts_url=f"{base_url}/--/api/v2/push/getReceipts",
+        concurrency=args.concurrency,
+        receipt_delay=1,
+        transport=transport,
+    )
+    pruned = []
+
+    async def count_pruned(tokens):
+        pruned.extend(tokens)
+        return len(tokens)
+
+    dispatcher.prune = count_pruned
+    metrics.reset()
+
+    await dispatcher.start()
+    start = time.perf_counter()
+    for n in range(args.notifications):
+        tokens = [f"ExponentPushToken[bench-{n}-{i}]" for i in range(args.tokens)]
+        dispatcher.enqueue(tokens, "Accident reported", "Near you: benchmark", data={"n": n})
+    await dispatcher.queue.join()
+    elapsed = time.perf_counter() - start
+    await dispatcher.poll_receipts(now=time.time() + dispatcher.receipt_delay)
+    await dispatcher.stop()
+
+    total = args.notifications * args.tokens
+    counters = metrics.snapshot(prefix="push.")["counters"]
+    latency = metrics.histograms["push.request"].snapshot()
+    print(f"📨 {total} tokens in {elapsed:.2f}s -> {total / elapsed:,.0f} tokens/s "
+          f"({latency['count']} requests, concurrency={args.concurrency}, "
+          f"http2={HTTP2_AVAILABLE and bool(args.url)})")
+    print(f"⏱️  request latency p50={latency['p50_ms']:.1f}ms p95={latency['p95_ms']:.1f}ms "
+          f"p99={latency['p99_ms']:.1f}ms max={latency['max_ms']:.1f}ms")
+    print(f"   sent={counters.get('push.sent', 0)} failed={counters.get('push.failed', 0)} "
+          f"retries={counters.get('push.retries', 0)} pruned={len(pruned)}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--notifications", type=int, default=50)
+    parser.add_argument("--tokens", type=int, default=1000, help="Recipients per notification")
+    parser.add_argument("--concurrency", type=int, default=6)
+    parser.add_argument("--latency-ms", type=float, default=50, help="In-process stand-in only")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="In-process stand-in only")
+    parser.add_argument("--unregistered-rate", type=float, default=0.02, help="In-process stand-in only")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--url", help="Base URL of a running expo_push_standin.py")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
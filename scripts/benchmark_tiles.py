@@ -0,0 +1,150 @@
+"""
+Compare vector tiles with the JSON endpoints per map viewport.
+
+For random phone-sized viewports around Douala, loads the map data the two
+ways a client can:
+  - JSON: GET /incidents/ (radius covering the viewport) and
+    GET /drivers/nearby, in parallel
+  - MVT:  every 512px tile covering the viewport from /tiles/{z}/{x}/{y}.mvt,
+    in parallel
+and reports bytes on the wire (after gzip) and wall time per viewport,
+p50/p95. The viewports are loaded twice; the second pass shows the tile
+cache (TILE_CACHE_TTL) at work.
+
+Needs a running server with PostgreSQL (PostGIS 3+) and Redis as configured
+in backend/.env. --seed-incidents adds active incidents around Douala;
+benchmark drivers come from benchmark_async_db.seed_users.
+
+Usage:
+    python scripts/benchmark_tiles.py [--viewports 50] [--zoom 14] [--seed-incidents 2000]
+"""
+import argparse
+import asyncio
+import math
+import os
+import random
+import statistics
+import sys
+import time
+
+import httpx
+
+# Add backend directory to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'backend')))
+
+from dotenv import load_dotenv
+load_dotenv(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'backend', '.env')))
+
+from benchmark_async_db import DOUALA, seed_users
+
+TILE_SIZE = 512  # Mapbox GL vector tile size in pixels
+EARTH_CIRCUMFERENCE_KM = 40075.016686
+
+
+def seed_incidents(n: int, rng: random.Random):
+    from geoalchemy2.elements import WKTElement
+    from app.core.database import SessionLocal
+    from app.models.incident import Incident
+    from app.services.incident_expiry import expires_at_for
+
+    db = SessionLocal()
+    try:
+        for _ in range(n):
+            lat, lon = DOUALA[0] + rng.uniform(-0.1, 0.1), DOUALA[1] + rng.uniform(-0.1, 0.1)
+            incident_type = rng.choice(["accident", "traffic_jam", "police", "road_hazard"])
+            db.add(Incident(
+                type=incident_type, description="benchmark", latitude=lat, longitude=lon,
+                location=WKTElement(f"POINT({lon} {lat})", srid=4326),
+                expires_at=expires_at_for(incident_type)
+            ))
+        db.commit()
+    finally:
+        db.close()
+
+
+def viewport_tiles(lat: float, lon: float, zoom: int, width: int, height: int):
+    """Tiles (z, x, y) covering a width x height pixel viewport centred on (lat, lon)"""
+    world = TILE_SIZE * 2 ** zoom
+    px = (lon + 180) / 360 * world
+    py = (1 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2 * world
+    x0, x1 = int((px - width / 2) // TILE_SIZE), int((px + width / 2) // TILE_SIZE)
+    y0, y1 = int((py - height / 2) // TILE_SIZE), int((py + height / 2) // TILE_SIZE)
+    return [(zoom, x, y) for x in range(x0, x1 + 1) for y in range(y0, y1 + 1)]
+
+
+def viewport_radius_km(lat: float, zoom: int, width: int, height: int) -> float:
+    """Half the viewport diagonal"""
+    km_per_px = EARTH_CIRCUMFERENCE_KM * math.cos(math.radians(lat)) / (TILE_SIZE * 2 ** zoom)
+    return math.hypot(width, height) / 2 * km_per_px
+
+
+async def load(http, urls, headers):
+    start = time.perf_counter()
+    responses = await asyncio.gather(*(http.get(url, headers=headers) for url in urls))
+    elapsed = (time.perf_counter() - start) * 1000
+    for response in responses:
+        response.raise_for_status()
+    return sum(r.num_bytes_downloaded for r in responses), elapsed
+
+
+def summary(label, samples):
+    sizes = sorted(size for size, _ in samples)
+    times = sorted(ms for _, ms in samples)
+    p95 = lambda values: values[min(len(values) - 1, int(len(values) * 0.95))]
+    print(f"  {label:<10} bytes p50={statistics.median(sizes):>9,.0f} p95={p95(sizes):>9,.0f}   "
+          f"time p50={statistics.median(times):>7.1f}ms p95={p95(times):>7.1f}ms")
+
+
+async def run(args):
+    rng = random.Random(args.seed)
+    if args.seed_incidents:
+        seed_incidents(args.seed_incidents, rng)
+        print(f"🌱 Seeded {args.seed_incidents} incidents")
+    _, passenger_tokens = seed_users(args.drivers, 1)
+    headers = {"Authorization": f"Bearer {passenger_tokens[0]}"}
+
+    viewports = [
+        (DOUALA[0] + rng.uniform(-0.08, 0.08), DOUALA[1] + rng.uniform(-0.08, 0.08))
+        for _ in range(args.viewports)
+    ]
+    api = f"{args.base_url}/api/v1"
+    async with httpx.AsyncClient(timeout=30, headers={"Accept-Encoding": "gzip"}) as http:
+        for label in ("cold", "warm"):
+            json_samples, tile_samples, tile_counts = [], [], []
+            for lat, lon in viewports:
+                radius = min(50.0, viewport_radius_km(lat, args.zoom, args.width, args.height))
+                json_samples.append(await load(http, [
+                    f"{api}/incidents/?latitude={lat}&longitude={lon}&radius_km={radius:.3f}&limit=500",
+                    f"{api}/drivers/nearby?latitude={lat}&longitude={lon}&radius_km={max(radius, 0.1):.3f}&limit=50",
+                ], headers))
+                tiles = viewport_tiles(lat, lon, args.zoom, args.width, args.height)
+                tile_counts.append(len(tiles))
+                tile_samples.append(await load(http, [f"{api}/tiles/{z}/{x}/{y}.mvt" for z, x, y in tiles], headers))
+
+            print(f"🗺️  {label} pass: {len(viewports)} viewports at z{args.zoom} "
+                  f"({args.width}x{args.height}px, {statistics.mean(tile_counts):.1f} tiles each)")
+            summary("JSON", json_samples)
+            summary("MVT", tile_samples)
+
+        metrics = (await http.get(f"{api}/metrics?prefix=tiles.")).json()
+        render = metrics["histograms"].get("tiles.render", {})
+        print(f"🧱 Server tile render p50={render.get('p50_ms', 0)}ms p95={render.get('p95_ms', 0)}ms "
+              f"cache hits={metrics['counters'].get('tiles.cache.hit', 0)} "
+              f"misses={metrics['counters'].get('tiles.cache.miss', 0)} (this worker)")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--viewports", type=int, default=50)
+    parser.add_argument("--zoom", type=int, default=14)
+    parser.add_argument("--width", type=int, default=390, help="Viewport width in pixels")
+    parser.add_argument("--height", type=int, default=844, help="Viewport height in pixels")
+    parser.add_argument("--seed-incidents", type=int, default=0)
+    parser.add_argument("--drivers", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=42)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
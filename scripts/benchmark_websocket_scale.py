@@ -0,0 +1,421 @@
+"""
+WebSocket scale benchmark.
+
+Opens N authenticated `/ws/connect` sockets and drives a realistic mix of
+traffic against them:
+  - drivers stream GPS (`driver_location_update`) at --gps-hz; drivers paired
+    with a passenger have an active ride, so each fix fans out to the ride room
+  - passengers sit in ride rooms, chat rooms (`typing`) and geohash rooms
+  - incident alerts are broadcast to geohash areas at --alerts-per-sec
+
+Reports connect time, end-to-end fan-out latency per event type, server
+memory per connection and server event-loop lag.
+
+By default the server runs locally in a child process with stand-ins for its
+backing services so only the WebSocket layer is measured:
+  - PostgreSQL: token -> user lookup is served from memory, sessions are no-ops
+  - Redis: an in-memory fakeredis (`pip install fakeredis[lua]`) unless
+    --redis-url points at a real Redis
+
+Usage:
+    python scripts/benchmark_websocket_scale.py [--clients 5000] [--duration 30]
+    python scripts/benchmark_websocket_scale.py --url http://host:8000 --tokens tokens.txt
+
+With --url the sockets connect to a running server using the JWTs in --tokens
+(one per line, drivers first); server memory and area alerts are then taken
+from /api/v1/ws/metrics only.
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import random
+import resource
+import sys
+import time
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+
+import httpx
+import websockets
+
+# Add backend directory to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'backend')))
+
+# (lat, lon, spread in degrees)
+CITY_CENTRES = [
+    (4.0511, 9.7679, 0.08),   # Douala
+    (3.8667, 11.5167, 0.08),  # Yaoundé
+]
+INCIDENT_TYPES = ["accident", "traffic_jam", "police", "road_hazard"]
+
+
+def raise_fd_limit():
+    """Thousands of sockets need more than the default 1024 descriptors"""
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+
+def rss_bytes() -> int:
+    """Current resident set size of this process"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        # Peak RSS (kilobytes on Linux) where /proc is unavailable
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def random_point(rng: random.Random):
+    lat, lon, spread = rng.choice(CITY_CENTRES)
+    return lat + rng.uniform(-spread, spread), lon + rng.uniform(-spread, spread)
+
+
+def plan_clients(args):
+    """
+    Assign roles: the first --drivers fraction are drivers, the first --rides
+    of them are paired with a passenger, remaining passengers are grouped
+    into chat rooms of --chat-room-size.
+    """
+    n_drivers = int(args.clients * args.drivers)
+    rides = min(args.rides, n_drivers, args.clients - n_drivers)
+    clients = []
+    for i in range(args.clients):
+        is_driver = i < n_drivers
+        user_id = f"driver-{i}" if is_driver else f"passenger-{i}"
+        clients.append(SimpleNamespace(index=i, user_id=user_id, is_driver=is_driver,
+                                       ride_id=None, chat_room=None, token=user_id))
+    passengers = clients[n_drivers:]
+    for r in range(rides):
+        ride_id = f"bench-ride-{r}"
+        clients[r].ride_id = ride_id
+        passengers[r].ride_id = ride_id
+    for j, passenger in enumerate(passengers[rides:]):
+        passenger.chat_room = f"bench-chat-{j // args.chat_room_size}"
+    return clients
+
+
+# ===== IN-PROCESS SERVER (CHILD PROCESS) =====
+
+class StubSession:
+    """Stand-in for a SQLAlchemy session: every lookup misses, writes are no-ops"""
+
+    def query(self, *args, **kwargs):
+        return self
+
+    def filter(self, *args, **kwargs):
+        return self
+
+    def first(self):
+        return None
+
+    def commit(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def build_server_app(redis_url, ride_pairs):
+    """WebSocket router only, wired to stand-ins for PostgreSQL and Redis"""
+    from fastapi import FastAPI
+    from app.api import websocket as websocket_api
+    from app.core import geohash as geohash_utils
+    from app.core.database import get_db
+    from app.core.metrics import metrics, monitor_event_loop_lag
+    from app.core.websocket import manager, create_event
+    from app.services.redis_service import redis_service
+
+    if redis_url:
+        import redis
+        client = redis.from_url(redis_url, decode_responses=True)
+    else:
+        try:
+            import fakeredis
+        except ImportError:
+            sys.exit("❌ Install fakeredis[lua] or pass --redis-url for the in-process server")
+        client = fakeredis.FakeRedis(decode_responses=True)
+    redis_service.redis_client = client
+    redis_service._append_event = client.register_script(redis_service._APPEND_EVENT_SCRIPT)
+
+    for driver_id, ride_id in ride_pairs:
+        redis_service.set_driver_current_ride(driver_id, ride_id)
+
+    async def get_user_from_token(token, db):
+        # Tokens are user ids in the in-process setup
+        return SimpleNamespace(id=token, is_driver=token.startswith("driver-"),
+                               full_name=token, phone_number="+237600000000")
+
+    websocket_api.get_user_from_token = get_user_from_token
+    # Benchmark rides exist only in Redis; every client belongs to its ride
+    websocket_api.is_ride_participant = lambda db, ride_id, user_id: True
+
+    @asynccontextmanager
+    async def lifespan(app):
+        lag_monitor = asyncio.create_task(monitor_event_loop_lag(0.1))
+        yield
+        lag_monitor.cancel()
+
+    app = FastAPI(lifespan=lifespan)
+    app.include_router(websocket_api.router, prefix="/api/v1")
+    app.dependency_overrides[get_db] = StubSession
+
+    @app.post("/bench/alert")
+    async def broadcast_alert(latitude: float, longitude: float, incident_type: str):
+        center = geohash_utils.alert_geohash(latitude, longitude, incident_type)
+        recipients = manager.get_area_subscribers(center)
+        await manager.broadcast_to_area(center, create_event(
+            event_type="new_incident",
+            data={"type": incident_type, "sent_at": time.time()}
+        ))
+        return {"recipients": len(recipients)}
+
+    @app.get("/bench/stats")
+    async def stats():
+        return {
+            "rss_bytes": rss_bytes(),
+            "connections": len(manager.active_connections),
+            "metrics": metrics.snapshot(prefix="ws.")
+        }
+
+    return app
+
+
+def run_server(port, redis_url, ride_pairs):
+    import logging
+    import uvicorn
+
+    raise_fd_limit()
+    logging.disable(logging.INFO)  # Per-connection info logs would dominate
+    app = build_server_app(redis_url, ride_pairs)
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning",
+                ws="websockets", ws_ping_interval=None, backlog=4096)
+
+
+# ===== LOAD GENERATOR =====
+
+class Results:
+    def __init__(self):
+        self.connected = 0
+        self.failed = 0
+        self.closed = 0
+        self.received = defaultdict(int)
+        self.latencies_ms = defaultdict(list)
+        # (ride_id, latitude, longitude) -> send time, for matching GPS fan-out
+        self.gps_sent = {}
+        # (room_id, user_id) -> send time of that user's latest typing frame
+        self.typing_sent = {}
+
+    def record(self, kind, started):
+        self.latencies_ms[kind].append((time.time() - started) * 1000)
+
+
+async def client_session(client, args, ws_base, results, start_event, stop_event, connect_limit):
+    uri = f"{ws_base}/api/v1/ws/connect?token={client.token}"
+    async with connect_limit:
+        try:
+            ws = await websockets.connect(uri, ping_interval=None, max_queue=None, open_timeout=30)
+        except Exception:
+            results.failed += 1
+            return
+    results.connected += 1
+    rng = random.Random(client.index)
+
+    async def reader():
+        try:
+            async for raw in ws:
+                message = json.loads(raw)
+                kind = message.get("type")
+                data = message.get("data") or {}
+                results.received[kind] += 1
+                if kind == "driver_location_update":
+                    sent = results.gps_sent.get((data.get("ride_id"), data.get("latitude"), data.get("longitude")))
+                    if sent:
+                        results.record(kind, sent)
+                elif kind == "typing":
+                    sent = results.typing_sent.get((data.get("room_id"), data.get("user_id")))
+                    if sent:
+                        results.record(kind, sent)
+                elif kind == "new_incident" and "sent_at" in data:
+                    results.record(kind, data["sent_at"])
+        except websockets.ConnectionClosed:
+            results.closed += 1
+
+    read_task = asyncio.create_task(reader())
+    try:
+        lat, lon = random_point(rng)
+        await ws.send(json.dumps({"type": "subscribe_geohash", "data": {"latitude": lat, "longitude": lon}}))
+        if client.ride_id:
+            await ws.send(json.dumps({"type": "join_ride", "ride_id": client.ride_id}))
+        if client.chat_room:
+            await ws.send(json.dumps({"type": "join_chat", "data": {"room_id": client.chat_room}}))
+        if client.is_driver:
+            await ws.send(json.dumps({"type": "driver_online"}))
+
+        await start_event.wait()
+        # Spread clients across the send interval
+        interval = 1.0 / args.gps_hz
+        await asyncio.sleep(rng.uniform(0, interval))
+        while not stop_event.is_set():
+            if client.is_driver:
+                lat += rng.uniform(-1e-4, 1e-4)
+                lon += rng.uniform(-1e-4, 1e-4)
+                lat, lon = round(lat, 7), round(lon, 7)
+                if client.ride_id:
+                    results.gps_sent[(client.ride_id, lat, lon)] = time.time()
+                await ws.send(json.dumps({"type": "driver_location_update",
+                                          "data": {"latitude": lat, "longitude": lon}}))
+            elif client.chat_room and rng.random() < args.typing_ratio:
+                results.typing_sent[(client.chat_room, client.user_id)] = time.time()
+                await ws.send(json.dumps({"type": "typing",
+                                          "data": {"room_id": client.chat_room, "is_typing": True}}))
+            await asyncio.sleep(interval)
+    except websockets.ConnectionClosed:
+        pass
+    finally:
+        await ws.close()
+        read_task.cancel()
+
+
+async def alert_generator(args, http, results, start_event, stop_event):
+    """Broadcast incident alerts to random areas (in-process server only)"""
+    rng = random.Random(args.seed)
+    await start_event.wait()
+    while not stop_event.is_set():
+        lat, lon = random_point(rng)
+        resp = await http.post("/bench/alert", params={
+            "latitude": lat, "longitude": lon, "incident_type": rng.choice(INCIDENT_TYPES)
+        })
+        results.received["alert_recipients"] += resp.json()["recipients"]
+        await asyncio.sleep(1.0 / args.alerts_per_sec)
+
+
+async def fetch_server_stats(http, in_process):
+    if in_process:
+        return (await http.get("/bench/stats")).json()
+    return {"metrics": (await http.get("/api/v1/ws/metrics")).json()}
+
+
+async def wait_for_server(http, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            await http.get("/bench/stats")
+            return
+        except httpx.TransportError:
+            await asyncio.sleep(0.2)
+    sys.exit("❌ In-process server did not start")
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))] if values else 0.0
+
+
+async def run_load(args, clients, base_url, in_process):
+    ws_base = base_url.replace("http://", "ws://").replace("https://", "wss://")
+    results = Results()
+    start_event, stop_event = asyncio.Event(), asyncio.Event()
+    connect_limit = asyncio.Semaphore(args.connect_concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=60) as http:
+        if in_process:
+            await wait_for_server(http)
+        baseline = await fetch_server_stats(http, in_process)
+
+        print(f"🔌 Opening {len(clients)} sockets ({args.connect_concurrency} at a time)...")
+        t0 = time.perf_counter()
+        tasks = [asyncio.create_task(client_session(c, args, ws_base, results, start_event,
+                                                    stop_event, connect_limit)) for c in clients]
+        while results.connected + results.failed < len(clients):
+            await asyncio.sleep(0.1)
+        connect_s = time.perf_counter() - t0
+        await asyncio.sleep(1)  # Let room joins settle
+        connected = await fetch_server_stats(http, in_process)
+
+        print(f"✅ {results.connected} connected, {results.failed} failed in {connect_s:.1f}s "
+              f"({results.connected / connect_s:.0f}/s)")
+        print(f"🚗 Driving traffic for {args.duration}s...")
+
+        start_event.set()
+        alerts = None
+        if in_process and args.alerts_per_sec > 0:
+            alerts = asyncio.create_task(alert_generator(args, http, results, start_event, stop_event))
+        await asyncio.sleep(args.duration)
+        final = await fetch_server_stats(http, in_process)
+        stop_event.set()
+        if alerts:
+            await alerts
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    print("\n📊 Fan-out latency (send -> receive)")
+    for kind in sorted(results.latencies_ms):
+        values = results.latencies_ms[kind]
+        print(f"  {kind:<24} n={len(values):>8} p50={percentile(values, 0.50):>8.1f}ms "
+              f"p95={percentile(values, 0.95):>8.1f}ms p99={percentile(values, 0.99):>8.1f}ms "
+              f"max={max(values):>8.1f}ms")
+    print(f"  received: {dict(results.received)}")
+    if results.closed:
+        print(f"  ⚠️ {results.closed} sockets closed by the server")
+
+    server_metrics = final["metrics"]
+    lag = server_metrics.get("histograms", {}).get("ws.event_loop_lag")
+    if lag:
+        print(f"\n⏱️  Server event loop lag: p50={lag['p50_ms']}ms p99={lag['p99_ms']}ms max={lag['max_ms']}ms")
+    throttled = {k: v for k, v in server_metrics.get("counters", {}).items() if k.startswith("ws.ratelimit.")}
+    if throttled:
+        print(f"🚦 Rate limited: {throttled}")
+    if in_process and results.connected:
+        per_conn = (connected["rss_bytes"] - baseline["rss_bytes"]) / results.connected
+        print(f"💾 Server RSS: {baseline['rss_bytes'] / 2**20:.0f}MB idle -> "
+              f"{final['rss_bytes'] / 2**20:.0f}MB loaded (~{per_conn / 1024:.1f}KB per connection)")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=5_000)
+    parser.add_argument("--duration", type=int, default=30, help="Seconds of steady-state traffic")
+    parser.add_argument("--drivers", type=float, default=0.3, help="Fraction of clients that are drivers")
+    parser.add_argument("--rides", type=int, default=500, help="Driver/passenger pairs in an active ride")
+    parser.add_argument("--chat-room-size", type=int, default=5)
+    parser.add_argument("--gps-hz", type=float, default=1.0, help="Driver location updates per second")
+    parser.add_argument("--typing-ratio", type=float, default=0.1, help="Chance a chat member types each tick")
+    parser.add_argument("--alerts-per-sec", type=float, default=5.0)
+    parser.add_argument("--connect-concurrency", type=int, default=200)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--redis-url", help="Real Redis for the in-process server (default: fakeredis)")
+    parser.add_argument("--url", help="Benchmark a running server instead, e.g. http://127.0.0.1:8000")
+    parser.add_argument("--tokens", help="File of JWTs (one per line, drivers first) for --url")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    raise_fd_limit()
+    clients = plan_clients(args)
+
+    if args.url:
+        if not args.tokens:
+            sys.exit("❌ --url needs --tokens")
+        with open(args.tokens) as f:
+            tokens = [line.strip() for line in f if line.strip()]
+        if len(tokens) < len(clients):
+            sys.exit(f"❌ Need {len(clients)} tokens, got {len(tokens)}")
+        for client, token in zip(clients, tokens):
+            client.token = token
+        asyncio.run(run_load(args, clients, args.url.rstrip("/"), in_process=False))
+        return
+
+    ride_pairs = [(c.user_id, c.ride_id) for c in clients if c.is_driver and c.ride_id]
+    server = multiprocessing.Process(target=run_server, args=(args.port, args.redis_url, ride_pairs), daemon=True)
+    server.start()
+    try:
+        asyncio.run(run_load(args, clients, f"http://127.0.0.1:{args.port}", in_process=True))
+    finally:
+        server.terminate()
+        server.join()
+
+
+if __name__ == "__main__":
+    main()
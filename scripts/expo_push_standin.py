@@ -0,0 +1,95 @@
+"""
+Local stand-in for the Expo Push API.
+
+Implements POST /--/api/v2/push/send and /--/api/v2/push/getReceipts with
+Expo's request/response shapes and limits (100 messages per send request,
+1000 ids per receipts request), plus knobs to make it misbehave:
+  --latency-ms         added to every response
+  --error-rate         share of send requests answered with 503 (retried)
+  --unregistered-rate  share of tokens reported DeviceNotRegistered, half in
+                       the ticket and half in the receipt
+
+Point the backend at it with
+    EXPO_PUSH_API_URL=http://127.0.0.1:8099/--/api/v2/push/send
+    EXPO_PUSH_RECEIPTS_URL=http://127.0.0.1:8099/--/api/v2/push/getReceipts
+
+Usage:
+    python scripts/expo_push_standin.py [--port 8099] [--latency-ms 50] [--error-rate 0.05]
+"""
+import argparse
+import asyncio
+import random
+import uuid
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+
+def device_not_registered(token: str) -> dict:
+    return {
+        "status": "error",
+        "message": f"\"{token}\" is not a registered push notification recipient",
+        "details": {"error": "DeviceNotRegistered"},
+    }
+
+
+def create_app(latency_ms: float = 0, error_rate: float = 0, unregistered_rate: float = 0, seed: int = None) -> FastAPI:
+    rng = random.Random(seed)
+    app = FastAPI(title="Expo Push stand-in")
+    app.state.receipts = {}  # ticket id -> receipt
+    app.state.requests = 0
+
+    @app.post("/--/api/v2/push/send")
+    async def send(request: Request):
+        app.state.requests += 1
+        await asyncio.sleep(latency_ms / 1000)
+        if rng.random() < error_rate:
+            return JSONResponse({"errors": [{"code": "INTERNAL_SERVER_ERROR"}]}, status_code=503)
+
+        payload = await request.json()
+        messages = payload if isinstance(payload, list) else [payload]
+        tokens = [token for message in messages
+                  for token in (message["to"] if isinstance(message["to"], list) else [message["to"]])]
+        if len(tokens) > 100:
+            return JSONResponse({"errors": [{"code": "PUSH_TOO_MANY_NOTIFICATIONS"}]}, status_code=400)
+
+        tickets = []
+        for token in tokens:
+            roll = rng.random()
+            if roll < unregistered_rate / 2:
+                tickets.append(device_not_registered(token))
+                continue
+            ticket_id = str(uuid.uuid4())
+            app.state.receipts[ticket_id] = (
+                device_not_registered(token) if roll < unregistered_rate else {"status": "ok"}
+            )
+            tickets.append({"status": "ok", "id": ticket_id})
+        return {"data": tickets}
+
+    @app.post("/--/api/v2/push/getReceipts")
+    async def get_receipts(request: Request):
+        await asyncio.sleep(latency_ms / 1000)
+        ids = (await request.json())["ids"]
+        if len(ids) > 1000:
+            return JSONResponse({"errors": [{"code": "PUSH_TOO_MANY_RECEIPTS"}]}, status_code=400)
+        return {"data": {rid: app.state.receipts[rid] for rid in ids if rid in app.state.receipts}}
+
+    return app
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--unregistered-rate", type=float, default=0.02)
+    args = parser.parse_args()
+
+    uvicorn.run(create_app(args.latency_ms, args.error_rate, args.unregistered_rate),
+                host="127.0.0.1", port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
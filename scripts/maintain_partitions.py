@@ -0,0 +1,41 @@
+"""
+Partition maintenance job: create upcoming monthly partitions of incidents,
+chat_messages and rides, and archive the ones past retention.
+
+Run daily, e.g. cron: 15 3 * * * python scripts/maintain_partitions.py
+"""
+import sys
+import os
+
+# Add backend directory to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'backend')))
+
+from dotenv import load_dotenv
+load_dotenv(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'backend', '.env')))
+
+from app.core.database import SessionLocal
+from app.services.partitioning import partition_service
+
+
+def main():
+    db = SessionLocal()
+    try:
+        report = partition_service.run_maintenance(db)
+    finally:
+        db.close()
+
+    failed = False
+    for table, result in report.items():
+        if "error" in result:
+            failed = True
+            print(f"❌ {table}: {result['error']}")
+            continue
+        created = ", ".join(result["created"]) or "none"
+        archived = ", ".join(result["archived"]) or "none"
+        print(f"✅ {table}: created {created}; archived {archived}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()